@@ -0,0 +1,292 @@
+# asgi.py - ASGI entry point.
+#
+# Serves async versions of the ask/summary endpoints, in which one process can
+# keep hundreds of slow upstream calls (YouTube, websites, Gemini) in flight,
+# and mounts the existing Flask app for everything else:
+#
+#   uvicorn asgi:app --host 0.0.0.0 --port 5000
+#   gunicorn asgi:app -k uvicorn.workers.UvicornWorker --workers 3
+#
+#   POST /api/async/summary        same form fields and response as /api/summary
+#   POST /api/async/ask_question   same form fields and response as /api/ask_question
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from functools import wraps
+from types import SimpleNamespace
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+
+from config import MAX_SOURCE_WORKERS, SOURCE_TIMEOUT_SECONDS, REQUEST_TIMEOUT_SECONDS, UPLOAD_FOLDER
+from main import app as flask_app
+from routes.youtube_routes import (
+    read_form_sources,
+    read_page_ranges,
+    describe_sources,
+    collect_outcomes,
+    empty_unsupported,
+    loaded_sources,
+    cited_sources
+)
+from services.youtube_service import (
+    get_or_create_user_data,
+    extract_video_id,
+    get_conversation_context,
+    record_conversation,
+    single_pass_answer_prompt
+)
+from services.retrieval_service import get_index
+from services.async_service import (
+    run_blocking,
+    async_fetch_video_metadata,
+    async_get_transcript_text,
+    async_get_file_content,
+    async_get_website_content,
+    async_get_wikipedia_content,
+    async_generate_summary,
+    async_merge_summaries,
+    async_answer_question,
+    async_answer_multi_source,
+    async_merge_answers
+)
+from utils import async_http_client
+from utils.concurrency import SourceTimeoutError
+from utils.uploads import save_upload
+from utils.error_handling import error_response
+from utils.metrics import track_request_async
+
+
+def handle_errors_async(f):
+    @wraps(f)
+    async def decorated_function(*args, **kwargs):
+        try:
+            return await f(*args, **kwargs)
+        except Exception as e:
+            payload, status = error_response(e, f.__name__)
+            return JSONResponse(payload, status_code=status)
+    return decorated_function
+
+
+##############################################################################
+# Async sources. Form parsing and validation are shared with the Flask routes
+# (routes.youtube_routes.describe_sources); only loading differs: "load" is a
+# coroutine function returning (content_text, metadata).
+##############################################################################
+def youtube_source(username, link, allow_partial=False):
+    async def load_youtube():
+        video_id = extract_video_id(link)
+        metadata, content_text = await asyncio.gather(
+            async_fetch_video_metadata(video_id),
+            async_get_transcript_text(username, video_id, allow_partial)
+        )
+        return content_text, metadata
+    return {"type": "youtube", "label": link, "load": load_youtube}
+
+
+def website_source(username, url):
+    async def load_website():
+        return await async_get_website_content(username, url), {"title": url}
+    return {"type": "website", "label": url, "load": load_website}
+
+
+def wikipedia_source(username, wtitle):
+    async def load_wikipedia():
+        return await async_get_wikipedia_content(username, wtitle), {"title": wtitle}
+    return {"type": "wikipedia", "label": wtitle, "load": load_wikipedia}
+
+
+async def file_source(username, description, allow_partial=False):
+    try:
+        file_path, content_hash, _ = await run_blocking(
+            save_upload, SimpleNamespace(stream=description["upload"].file), UPLOAD_FOLDER, description["extension"]
+        )
+    except Exception as e:
+        logging.error(f"Error saving file {description['label']}: {e}")
+
+        async def load_failed(error=e):
+            raise error
+        return {"type": "file", "label": description["label"], "load": load_failed}
+
+    async def load_file():
+        content_text = await async_get_file_content(
+            username, description["filename"], description["extension"], file_path, content_hash,
+            description["page_range"], allow_partial
+        )
+        return content_text, {"title": description["filename"]}
+    return {"type": "file", "label": description["label"], "load": load_file}
+
+
+async def build_sources(username, youtube_links, uploaded_files, website_urls, wikipedia_titles, page_ranges=None,
+                        allow_partial=False):
+    """
+    Async counterpart of routes.youtube_routes.build_sources.
+    Returns (sources, rejected_files).
+    """
+    descriptions, rejected_files = describe_sources(
+        youtube_links, uploaded_files, website_urls, wikipedia_titles, page_ranges
+    )
+    sources = []
+    for description in descriptions:
+        if description["type"] == "youtube":
+            sources.append(youtube_source(username, description["value"], allow_partial))
+        elif description["type"] == "file":
+            sources.append(await file_source(username, description, allow_partial))
+        elif description["type"] == "website":
+            sources.append(website_source(username, description["value"]))
+        else:
+            sources.append(wikipedia_source(username, description["value"]))
+    return sources, rejected_files
+
+
+async def run_sources(sources, process):
+    """
+    Runs the coroutine process(content_text, metadata) for every source with
+    at most MAX_SOURCE_WORKERS running at once, SOURCE_TIMEOUT_SECONDS per
+    source and REQUEST_TIMEOUT_SECONDS overall.
+    Returns (result, error) tuples in the same order as sources.
+    """
+    semaphore = asyncio.Semaphore(MAX_SOURCE_WORKERS)
+
+    async def run_one(source):
+        async with semaphore:
+            async def work():
+                content_text, metadata = await source["load"]()
+                return await process(content_text, metadata)
+            try:
+                return await asyncio.wait_for(work(), SOURCE_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                raise SourceTimeoutError(f"Timed out after {SOURCE_TIMEOUT_SECONDS} seconds.")
+
+    tasks = [asyncio.ensure_future(run_one(source)) for source in sources]
+    if not tasks:
+        return []
+    _, pending = await asyncio.wait(tasks, timeout=REQUEST_TIMEOUT_SECONDS)
+    for task in pending:
+        task.cancel()
+
+    outcomes = []
+    for task in tasks:
+        if task in pending:
+            outcomes.append((None, SourceTimeoutError("Request deadline exceeded.")))
+        elif task.exception() is not None:
+            outcomes.append((None, task.exception()))
+        else:
+            outcomes.append((task.result(), None))
+    return outcomes
+
+
+# /api/async/summary
+@track_request_async("async_summary")
+@handle_errors_async
+async def generate_summary_endpoint(request):
+    form = await request.form()
+    username = form.get('username')
+
+    youtube_links, uploaded_files, website_urls, wikipedia_titles = read_form_sources(form, form)
+
+    if not username:
+        return JSONResponse({"error": "Username is required."}, status_code=400)
+    if not youtube_links and not uploaded_files and not website_urls and not wikipedia_titles:
+        return JSONResponse({"error": "No links, files, or titles provided."}, status_code=400)
+
+    get_or_create_user_data(username)
+    unsupported = empty_unsupported()
+
+    sources, rejected_files = await build_sources(
+        username, youtube_links, uploaded_files, website_urls, wikipedia_titles,
+        read_page_ranges(form, form)
+    )
+    unsupported["unsupported_files"].extend(rejected_files)
+
+    outcomes = await run_sources(
+        sources,
+        lambda content_text, metadata: async_generate_summary(content_text, metadata, username)
+    )
+
+    all_summaries = collect_outcomes(sources, outcomes, unsupported, with_reason=False)
+    if all_summaries:
+        combined_summary = await async_merge_summaries(*all_summaries)
+    else:
+        combined_summary = "No valid content to summarize."
+
+    return JSONResponse({"summary": combined_summary, **unsupported})
+
+
+# /api/async/ask_question
+@track_request_async("async_ask_question")
+@handle_errors_async
+async def ask_question_endpoint(request):
+    form = await request.form()
+    username = form.get('username')
+    question = form.get('question')
+
+    youtube_links, uploaded_files, website_urls, wikipedia_titles = read_form_sources(form, form)
+
+    if not username or not question:
+        return JSONResponse({"error": "Username and question are required."}, status_code=400)
+    if not youtube_links and not uploaded_files and not website_urls and not wikipedia_titles:
+        return JSONResponse({"error": "No links, files, or titles provided."}, status_code=400)
+
+    get_or_create_user_data(username)
+    unsupported = empty_unsupported()
+
+    sources, rejected_files = await build_sources(
+        username, youtube_links, uploaded_files, website_urls, wikipedia_titles,
+        read_page_ranges(form, form), allow_partial=form.get('allow_partial') == 'true'
+    )
+    unsupported["unsupported_files"].extend(f"{name}: Unsupported file type" for name in rejected_files)
+
+    history_snapshot = get_conversation_context(username)
+
+    async def load_for_answering(content_text, metadata):
+        await run_blocking(get_index, content_text)
+        return content_text, metadata
+
+    outcomes = await run_sources(sources, load_for_answering)
+    documents = collect_outcomes(sources, outcomes, unsupported, with_reason=True)
+
+    # Passage ranking across sources is CPU-bound
+    prompt = await run_blocking(single_pass_answer_prompt, documents, question, history_snapshot)
+    final_answer = "No valid information available to answer the question."
+    citations = []
+    if prompt:
+        final_answer = await async_answer_multi_source(prompt)
+        citations = cited_sources(loaded_sources(sources, outcomes))
+    elif documents:
+        # Each loaded document becomes a source again, so the answers share its limits and deadlines
+        answering = loaded_sources(sources, outcomes)
+
+        async def loaded(document):
+            return document
+        answer_outcomes = await run_sources(
+            [dict(source, load=lambda document=document: loaded(document))
+             for source, document in zip(answering, documents)],
+            lambda content_text, metadata: async_answer_question(
+                content_text, metadata, question, history_snapshot, username
+            )
+        )
+        all_answers = collect_outcomes(answering, answer_outcomes, unsupported, with_reason=True)
+        if all_answers:
+            final_answer = await async_merge_answers(*all_answers, question=question)
+
+    record_conversation(username, question, final_answer)
+
+    return JSONResponse({"answer": final_answer, "sources": citations, **unsupported})
+
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    await async_http_client.aclose()
+
+
+app = Starlette(
+    routes=[
+        Route('/api/async/summary', generate_summary_endpoint, methods=['POST']),
+        Route('/api/async/ask_question', ask_question_endpoint, methods=['POST']),
+        Mount('/', app=WSGIMiddleware(flask_app)),
+    ],
+    lifespan=lifespan,
+)
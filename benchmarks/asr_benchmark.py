@@ -0,0 +1,166 @@
+##############################################################################
+# Speech recognition benchmark: real-time factor and word error rate of ASR
+# backends (services/asr_backends.py) on the sample audio listed in a manifest.
+#
+#   python -m benchmarks.asr_benchmark
+#   python -m benchmarks.asr_benchmark --config openai-whisper:base --config faster-whisper:base:int8
+#   python -m benchmarks.asr_benchmark --config faster-whisper:small:int8 --beam-size 5 --output asr.json
+#
+# A --config is backend:model_size[:compute_type]. The manifest (default
+# benchmarks/asr_samples/manifest.json, about 25 s of bundled public-domain
+# LibriVox speech; see asr_samples/ATTRIBUTION.md) lists samples as
+#   {"audio": "<file>", "reference": "<exact transcript>"}
+# with paths relative to the manifest. Any format ffmpeg reads will do; audio
+# is decoded to 16 kHz mono first, as in production, and decoding is not timed.
+#
+# RTF = transcription seconds / audio seconds (lower is faster; 0.1 means ten
+# minutes of audio take one minute). WER = (substitutions + deletions +
+# insertions) / reference words, after lowercasing and dropping punctuation.
+# Totals are weighted by audio length and reference words. Model loading is
+# reported separately, and the first sample is transcribed once untimed to
+# warm up. Numbers depend heavily on the CPU and thread count, so compare
+# configurations on the same machine.
+##############################################################################
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import tempfile
+import platform
+
+from services.asr_backends import load_backend
+from utils.audio import decode_audio, read_wav_window
+
+MANIFEST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "asr_samples", "manifest.json")
+
+DEFAULT_CONFIGS = ["openai-whisper:base", "faster-whisper:base:int8"]
+
+WORD_PATTERN = re.compile(r"[\w']+")
+
+
+def normalize_words(text):
+    return WORD_PATTERN.findall(text.lower())
+
+
+def word_errors(reference, hypothesis):
+    """
+    Returns the word-level edit distance between two word lists.
+    """
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hypothesis, 1):
+            current.append(min(
+                previous[j] + 1,  # deletion
+                current[j - 1] + 1,  # insertion
+                previous[j - 1] + (ref_word != hyp_word),  # substitution
+            ))
+        previous = current
+    return previous[-1]
+
+
+def load_samples(manifest_path):
+    """
+    Decodes every sample of the manifest once. Returns dicts with the name,
+    the 16 kHz samples, the duration and the reference words.
+    """
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    samples = []
+    for entry in manifest.get("samples", []):
+        fd, wav_path = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        try:
+            duration, _ = decode_audio(os.path.join(base_dir, entry["audio"]), wav_path)
+            audio, _ = read_wav_window(wav_path)
+        finally:
+            os.remove(wav_path)
+        samples.append({
+            "name": entry["audio"],
+            "audio": audio,
+            "seconds": duration,
+            "reference": normalize_words(entry["reference"]),
+        })
+    return samples
+
+
+def run_config(config, samples, beam_size, threads):
+    backend_name, model_size, *rest = config.split(":")
+    compute_type = rest[0] if rest else None
+
+    started = time.perf_counter()
+    backend = load_backend(backend_name, model_size, compute_type, beam_size, threads)
+    load_seconds = time.perf_counter() - started
+    backend.transcribe(samples[0]["audio"])  # warm-up
+
+    results = []
+    for sample in samples:
+        started = time.perf_counter()
+        segments = backend.transcribe(sample["audio"])
+        elapsed = time.perf_counter() - started
+        hypothesis = normalize_words(" ".join(text for _, _, text in segments))
+        errors = word_errors(sample["reference"], hypothesis)
+        results.append({
+            "sample": sample["name"],
+            "audio_seconds": round(sample["seconds"], 2),
+            "seconds": round(elapsed, 3),
+            "rtf": round(elapsed / sample["seconds"], 4) if sample["seconds"] else None,
+            "errors": errors,
+            "reference_words": len(sample["reference"]),
+            "wer": round(errors / len(sample["reference"]), 4) if sample["reference"] else None,
+        })
+
+    audio_seconds = sum(sample["seconds"] for sample in samples)
+    reference_words = sum(len(sample["reference"]) for sample in samples)
+    return {
+        "config": config,
+        "load_seconds": round(load_seconds, 2),
+        "rtf": round(sum(r["seconds"] for r in results) / audio_seconds, 4) if audio_seconds else None,
+        "wer": round(sum(r["errors"] for r in results) / reference_words, 4) if reference_words else None,
+        "samples": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ASR backend real-time factor and word error rate.")
+    parser.add_argument("--config", action="append", help="backend:model_size[:compute_type], repeatable")
+    parser.add_argument("--manifest", default=MANIFEST_PATH)
+    parser.add_argument("--beam-size", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=os.cpu_count())
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    samples = load_samples(args.manifest)
+    if not samples:
+        print(f"No samples in {args.manifest}; add audio files and their reference transcripts to it.")
+        return 1
+    print(f"{len(samples)} samples, {sum(s['seconds'] for s in samples):.0f}s of audio")
+
+    reports = []
+    for config in args.config or DEFAULT_CONFIGS:
+        try:
+            report = run_config(config, samples, args.beam_size, args.threads)
+        except ImportError as e:
+            print(f"{config:32s} skipped: {e}")
+            continue
+        reports.append(report)
+        print(f"{config:32s} RTF {report['rtf'] or 0:7.3f}   WER {report['wer'] or 0:6.1%}   load {report['load_seconds']:6.1f}s")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "cpu_count": os.cpu_count(),
+                "threads": args.threads,
+                "beam_size": args.beam_size,
+                "configs": reports,
+            }, f, indent=2, sort_keys=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+##############################################################################
+# Deterministic fixture generators for the benchmark suite.
+# Every generator writes into the given directory and returns the file path.
+##############################################################################
+import os
+import csv
+import random
+
+WORDS = (
+    "model data video transcript summary question answer source page document "
+    "network latency cache memory worker process thread request response token "
+    "science history music language research market energy climate health policy"
+).split()
+
+
+def make_text(n_words, seed=0):
+    """
+    Returns n_words pseudo-random words grouped into sentences and paragraphs.
+    """
+    rng = random.Random(seed)
+    sentences = []
+    written = 0
+    while written < n_words:
+        length = rng.randint(6, 18)
+        sentence = " ".join(rng.choice(WORDS) for _ in range(length))
+        sentences.append(sentence.capitalize() + ".")
+        written += length
+    paragraphs = [" ".join(sentences[i:i + 6]) for i in range(0, len(sentences), 6)]
+    return "\n\n".join(paragraphs)
+
+
+def make_txt(directory, n_words=50000):
+    path = os.path.join(directory, "fixture.txt")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(make_text(n_words, seed=1))
+    return path
+
+
+def make_html(directory, n_words=50000):
+    path = os.path.join(directory, "fixture.html")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(make_html_page(n_words))
+    return path
+
+
+def make_html_page(n_words=50000):
+    paragraphs = make_text(n_words, seed=2).split("\n\n")
+    body = "\n".join(f"<p>{p}</p>" for p in paragraphs)
+    return (
+        "<html><head><title>Fixture</title><style>p { color: black; }</style>"
+        "<script>var x = 1;</script></head>"
+        f"<body><h1>Fixture page</h1>{body}</body></html>"
+    )
+
+
+def make_csv(directory, n_rows=50000):
+    path = os.path.join(directory, "fixture.csv")
+    rng = random.Random(3)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "category", "value", "comment"])
+        for i in range(n_rows):
+            writer.writerow([i, rng.choice(WORDS), rng.choice(WORDS), round(rng.random() * 1000, 2),
+                             " ".join(rng.choice(WORDS) for _ in range(5))])
+    return path
+
+
+def make_xlsx(directory, n_rows=20000, n_sheets=2):
+    import openpyxl
+    path = os.path.join(directory, "fixture.xlsx")
+    rng = random.Random(4)
+    workbook = openpyxl.Workbook(write_only=True)
+    for s in range(n_sheets):
+        sheet = workbook.create_sheet(f"Sheet{s + 1}")
+        sheet.append(["id", "name", "value"])
+        for i in range(n_rows):
+            sheet.append([i, rng.choice(WORDS), rng.random() * 1000])
+    workbook.save(path)
+    return path
+
+
+def make_xls(directory, n_rows=20000):
+    """
+    Requires xlwt; returns None when it is not installed.
+    """
+    try:
+        import xlwt
+    except ImportError:
+        return None
+    path = os.path.join(directory, "fixture.xls")
+    rng = random.Random(5)
+    workbook = xlwt.Workbook()
+    sheet = workbook.add_sheet("Sheet1")
+    for i in range(min(n_rows, 65535)):
+        sheet.write(i, 0, i)
+        sheet.write(i, 1, rng.choice(WORDS))
+        sheet.write(i, 2, rng.random() * 1000)
+    workbook.save(path)
+    return path
+
+
+def make_docx(directory, n_paragraphs=2000):
+    import docx
+    path = os.path.join(directory, "fixture.docx")
+    document = docx.Document()
+    for i, paragraph in enumerate(make_text(n_paragraphs * 60, seed=6).split("\n\n")[:n_paragraphs]):
+        document.add_paragraph(paragraph)
+    document.save(path)
+    return path
+
+
+def _pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(directory, n_pages=200, lines_per_page=40):
+    """
+    Writes a minimal multi-page PDF with Helvetica text, without any PDF library.
+    """
+    path = os.path.join(directory, "fixture.pdf")
+    words = make_text(n_pages * lines_per_page * 10, seed=7).split()
+    objects = []
+
+    def add(obj):
+        objects.append(obj)
+        return len(objects)
+
+    catalog_id = add(None)
+    pages_id = add(None)
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    page_ids = []
+    position = 0
+    for _ in range(n_pages):
+        lines = []
+        for _ in range(lines_per_page):
+            lines.append(" ".join(words[position:position + 10]))
+            position += 10
+        stream = "BT /F1 10 Tf 40 800 Td 12 TL " + " ".join(f"({_pdf_escape(line)}) '" for line in lines) + " ET"
+        stream_bytes = stream.encode("latin-1")
+        content_id = add(b"<< /Length %d >>\nstream\n" % len(stream_bytes) + stream_bytes + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (pages_id, font_id, content_id)
+        ))
+    objects[catalog_id - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id
+    kids = b" ".join(b"%d 0 R" % pid for pid in page_ids)
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, obj in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n" % number + obj + b"\nendobj\n")
+        xref_offset = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%EOF\n" % (
+            len(objects) + 1, catalog_id, xref_offset))
+    return path
+
+
+FILE_FIXTURES = {
+    "pdf": make_pdf,
+    "docx": make_docx,
+    "txt": make_txt,
+    "csv": make_csv,
+    "xls": make_xls,
+    "xlsx": make_xlsx,
+    "html": make_html,
+}
@@ -0,0 +1,244 @@
+##############################################################################
+# Offline micro-benchmarks for the ingestion and prompt pipeline.
+#
+#   python -m benchmarks.run_benchmarks                  # run and compare to the baseline
+#   python -m benchmarks.run_benchmarks --save-baseline  # run and record a new baseline
+#   python -m benchmarks.run_benchmarks --only process_file.pdf --repeat 5
+#
+# Stages:
+#   process_file.<ext>       every supported document extension, on generated fixtures
+#   get_website_content      against a local http.server stub
+#   extract_video_id         10 000 URL variants
+#   generate_summary.prompt  map-reduce + prompt construction with a fake Gemini model
+#   answer_question.prompt   passage retrieval + prompt construction with a fake Gemini model
+#
+# Each stage reports the median wall time over --repeat runs and the peak
+# Python allocation (tracemalloc) of one extra run. Caches are cleared before
+# every run so the cold path is measured. Nothing leaves the machine: Gemini
+# is replaced by a local function and the artifact store lives in a temp dir.
+# The exit status is 1 when a stage is slower or uses more memory than the
+# baseline by more than --tolerance, and 2 when there is no baseline.
+#
+# Baselines are machine-specific, so none is committed. Workflow:
+#   1. on the machine that will run the comparisons (a dev box or the CI
+#      runner), check out the reference commit and run with --save-baseline;
+#      benchmarks/baseline.json records the timings along with the Python
+#      version, machine and CPU count;
+#   2. after a change, run without flags on the same machine; a baseline
+#      recorded on a different machine is reported before the comparison;
+#   3. re-record the baseline when a slowdown is accepted or the machine changes.
+##############################################################################
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import platform
+import statistics
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Must be set before config is imported. Spawned worker processes re-import
+# this module and pick up the same directory from the environment. Only a
+# directory created here is deleted afterwards, never one passed in POPPY_BENCH_DIR.
+OWNS_WORK_DIR = not os.environ.get("POPPY_BENCH_DIR")
+WORK_DIR = tempfile.mkdtemp(prefix="poppy-bench-") if OWNS_WORK_DIR else os.environ["POPPY_BENCH_DIR"]
+os.environ["POPPY_BENCH_DIR"] = WORK_DIR
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-offline")
+os.environ["LLM_CACHE_ENABLED"] = "false"
+os.environ["ARTIFACT_STORE_DIR"] = os.path.join(WORK_DIR, "artifacts")
+os.environ["UPLOAD_FOLDER"] = os.path.join(WORK_DIR, "uploads")
+
+from benchmarks import fixtures  # noqa: E402
+from utils.memory import measure_peak_memory  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def fake_model(prompt, model_name):
+    """
+    Stands in for Gemini: returns the last 150 words of the prompt, so
+    downstream steps get realistically sized responses.
+    """
+    return " ".join(prompt.split()[-150:])
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    page = b""
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(self.page)))
+        self.end_headers()
+        self.wfile.write(self.page)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server():
+    StubHandler.page = fixtures.make_html_page(20000).encode("utf-8")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def clear_caches():
+    from services import youtube_service, retrieval_service, summarization_service
+    youtube_service.content_cache.clear()
+    retrieval_service.index_cache.clear()
+    summarization_service.chunk_summary_cache.clear()
+
+
+def build_stages(server, only=None):
+    """
+    Returns {stage name: callable}.
+    """
+    from services import llm_service
+    from services.history_service import render_history
+    from services.pdf_service import process_file
+    from services.youtube_service import (
+        extract_video_id,
+        get_website_content,
+        generate_summary,
+        answer_question
+    )
+
+    llm_service._call_model = fake_model
+
+    stages = {}
+    fixture_dir = os.path.join(WORK_DIR, "fixtures")
+    os.makedirs(fixture_dir, exist_ok=True)
+    for ext, make in fixtures.FILE_FIXTURES.items():
+        name = f"process_file.{ext}"
+        if only and name not in only:
+            continue
+        try:
+            path = make(fixture_dir)
+        except ImportError as e:
+            path = None
+            print(f"skipping {name}: {e}")
+        if path is None:
+            continue
+        stages[name] = lambda path=path, ext=ext: process_file(path, ext)
+
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/page"
+    counter = iter(range(10 ** 9))
+    # A fresh query string per run bypasses the artifact store as well
+    stages["get_website_content"] = lambda: get_website_content("bench", f"{base_url}?run={next(counter)}")
+
+    video_urls = [
+        f"https://www.youtube.com/watch?v=abcdefghij{i % 10}&t={i}" if i % 2 else f"https://youtu.be/abcdefghij{i % 10}"
+        for i in range(10000)
+    ]
+    stages["extract_video_id"] = lambda: [extract_video_id(url) for url in video_urls]
+
+    long_text = fixtures.make_text(60000, seed=8)
+    metadata = {"title": "Benchmark document", "author_name": "bench"}
+    history = render_history("", [{"question": f"Question {i}?", "answer": fixtures.make_text(60, seed=i)} for i in range(5)])
+    stages["generate_summary.prompt"] = lambda: generate_summary(long_text, metadata, "bench")
+    stages["answer_question.prompt"] = lambda: answer_question(
+        long_text, metadata, "How does cache memory affect request latency?", history, "bench"
+    )
+
+    if only:
+        stages = {name: func for name, func in stages.items() if name in only}
+    return stages
+
+
+def run_stage(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        clear_caches()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    clear_caches()
+    with measure_peak_memory(trace=True) as memory:
+        func()
+    return {
+        "seconds": statistics.median(timings),
+        "min_seconds": min(timings),
+        "peak_traced_bytes": memory.get("peak_traced_bytes"),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Returns a list of regression messages (empty if none).
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get("stages", {}).get(name)
+        if not base:
+            continue
+        for metric in ("seconds", "peak_traced_bytes"):
+            if not base.get(metric) or result.get(metric) is None:
+                continue
+            ratio = result[metric] / base[metric]
+            if ratio > 1 + tolerance:
+                regressions.append(f"{name}: {metric} {result[metric]:.4g} vs baseline {base[metric]:.4g} (x{ratio:.2f})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline ingestion and prompt pipeline benchmarks.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", nargs="*", help="stage names to run")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown / memory growth")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+    if not args.save_baseline and not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline first (see the header of this script).")
+        return 2
+
+    server = start_stub_server()
+    try:
+        stages = build_stages(server, set(args.only) if args.only else None)
+        results = {}
+        for name, func in stages.items():
+            results[name] = run_stage(func, args.repeat)
+            r = results[name]
+            print(f"{name:28s} {r['seconds'] * 1000:10.1f} ms   peak {(r['peak_traced_bytes'] or 0) / 1e6:8.2f} MB")
+    finally:
+        server.shutdown()
+        if OWNS_WORK_DIR:
+            shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "repeat": args.repeat,
+        "stages": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    for key in ("python", "machine", "cpu_count"):
+        if baseline.get(key) != report[key]:
+            print(f"WARNING baseline {key} {baseline.get(key)} differs from this run's {report[key]}")
+    regressions = compare(results, baseline, args.tolerance)
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    if not regressions:
+        print(f"No regressions beyond {args.tolerance:.0%} of the baseline.")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -26,13 +26,196 @@ except Exception as e:
     raise RuntimeError("Error configuring Google Gemini API. Check your API key and configuration.")
 
 # Other constants
+GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL_NAME", "gemini-pro")
 VIDEO_ID_PATTERN = r'(?:https?:\/\/)?(?:www\.)?(?:youtube\.com\/(?:[^\/\n\s]+\/\S+\/|(?:v|e(?:mbed)?)\/|\S*?[?&]v=)|youtu\.be\/)([a-zA-Z0-9_-]{11})'
 CONVERSATION_HISTORY_LIMIT = 5
 SUMMARY_WORD_LIMIT = 500
 MAX_TRANSCRIPT_LENGTH = 10000  # Adjust as per the model's input capacity
 
+# Uploaded files are stored here as <sha256>.<extension>
+UPLOAD_FOLDER = os.getenv("UPLOAD_FOLDER", "uploads")
+
+# PDF extraction: documents with at least PDF_PARALLEL_MIN_PAGES selected pages
+# are extracted in batches of PDF_PAGES_PER_TASK pages on a process pool
+PDF_EXTRACTION_WORKERS = int(os.getenv("PDF_EXTRACTION_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_PAGES_PER_TASK = 25
+PDF_PARALLEL_MIN_PAGES = 50
+
+# CSV/XLS/XLSX ingestion: rows are streamed and rendered with "[Rows a-b]"
+# markers, stopping at whichever cap is hit first
+SPREADSHEET_ROWS_PER_CHUNK = 500
+SPREADSHEET_MAX_ROWS = int(os.getenv("SPREADSHEET_MAX_ROWS", "100000"))
+SPREADSHEET_MAX_BYTES = int(os.getenv("SPREADSHEET_MAX_BYTES", str(8 * 1024 * 1024)))
+SPREADSHEET_TRACE_MEMORY = os.getenv("SPREADSHEET_TRACE_MEMORY", "false").lower() == "true"
+
+# Concurrency limits for processing the sources of a single request
+MAX_SOURCE_WORKERS = int(os.getenv("MAX_SOURCE_WORKERS", "5"))
+SOURCE_TIMEOUT_SECONDS = float(os.getenv("SOURCE_TIMEOUT_SECONDS", "300"))
+REQUEST_TIMEOUT_SECONDS = float(os.getenv("REQUEST_TIMEOUT_SECONDS", "600"))
+
+# JSON bulk endpoint (/api/summary/bulk): sources per request and the deadline for all of them
+BULK_MAX_SOURCES = int(os.getenv("BULK_MAX_SOURCES", "200"))
+BULK_REQUEST_TIMEOUT_SECONDS = float(os.getenv("BULK_REQUEST_TIMEOUT_SECONDS", "7200"))
+
+# ASGI (asgi.py): threads for blocking/CPU-bound work awaited by async endpoints
+ASYNC_BLOCKING_WORKERS = int(os.getenv("ASYNC_BLOCKING_WORKERS", "16"))
+
+# Shared HTTP client used for all outbound fetches
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+HTTP_BACKOFF_SECONDS = 0.5  # base of the exponential backoff (with full jitter)
+HTTP_MAX_RESPONSE_BYTES = int(os.getenv("HTTP_MAX_RESPONSE_BYTES", str(20 * 1024 * 1024)))
+HTTP_POOL_HOSTS = 32  # number of per-host connection pools kept alive
+HTTP_POOL_MAXSIZE = 16  # connections kept alive per host
+TRANSCRIPT_SERVICE_READ_TIMEOUT = float(os.getenv("TRANSCRIPT_SERVICE_READ_TIMEOUT", "120"))
+
+# Shared ingestion cache (transcripts, file text, website text, Wikipedia pages)
+CONTENT_CACHE_MAX_BYTES = int(os.getenv("CONTENT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+CONTENT_CACHE_TTL_SECONDS = float(os.getenv("CONTENT_CACHE_TTL_SECONDS", str(6 * 60 * 60)))
+
+# Persistent on-disk store for extracted text, shared by all workers and restarts
+ARTIFACT_STORE_DIR = os.getenv("ARTIFACT_STORE_DIR", "artifacts")
+ARTIFACT_STORE_MAX_BYTES = int(os.getenv("ARTIFACT_STORE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+# Bump a version when its extractor changes so stale artifacts are ignored
+EXTRACTOR_VERSIONS = {
+    "transcript": 1,
+    "file": 1,
+    "website": 1,
+    "wikipedia": 1,
+}
+# Artifacts of kinds that change upstream expire; None means never
+ARTIFACT_MAX_AGE_SECONDS = {
+    "transcript": None,
+    "file": None,
+    "website": 24 * 60 * 60,
+    "wikipedia": 7 * 24 * 60 * 60,
+}
+
+# Memoization of Gemini responses, keyed by model name + rendered prompt
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+LLM_CACHE_PERSIST = os.getenv("LLM_CACHE_PERSIST", "false").lower() == "true"
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", os.path.join(ARTIFACT_STORE_DIR, "llm"))
+LLM_CACHE_DISK_MAX_BYTES = int(os.getenv("LLM_CACHE_DISK_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Passage retrieval used to pick the parts of long content relevant to a question
+RETRIEVAL_CHUNK_SIZE = 1500  # characters per chunk
+RETRIEVAL_CHUNK_OVERLAP = 200  # characters shared by consecutive chunks
+RETRIEVAL_TOP_K = 6
+RETRIEVAL_INDEX_CACHE_MAX_BYTES = int(os.getenv("RETRIEVAL_INDEX_CACHE_MAX_BYTES", str(128 * 1024 * 1024)))
+
+# Questions over several sources: answer in one call from the passages ranked best across all of them
+# (falling back to one call per source plus a merge when they do not fit the "answer" budget)
+QA_SINGLE_PASS = os.getenv("QA_SINGLE_PASS", "true").lower() == "true"
+MULTI_SOURCE_TOP_K = int(os.getenv("MULTI_SOURCE_TOP_K", "12"))
+
+# Speech recognition in the transcription workers (see services/asr_backends.py):
+# "openai-whisper" (PyTorch, float32 on CPU) or "faster-whisper" (CTranslate2, int8-quantized on CPU)
+ASR_BACKEND = os.getenv("ASR_BACKEND", "openai-whisper")
+# Model size/speed knobs: tiny, base, small, medium, large-v3 (larger is slower and more accurate);
+# beam size 1 is greedy decoding, the fastest. WHISPER_MODEL_NAME is still read for the model size.
+ASR_MODEL_SIZE = os.getenv("ASR_MODEL_SIZE", os.getenv("WHISPER_MODEL_NAME", "base"))
+ASR_COMPUTE_TYPE = os.getenv("ASR_COMPUTE_TYPE", "int8")  # faster-whisper only: int8, int8_float32, float32
+ASR_BEAM_SIZE = int(os.getenv("ASR_BEAM_SIZE", "1"))
+
+# Transcription worker pool (per web worker process)
+# Worker processes, each with its own copy of the model; the windows of one file are spread over them
+TRANSCRIPTION_WORKERS = int(os.getenv("TRANSCRIPTION_WORKERS", str(max(1, min(4, (os.cpu_count() or 2) // 2)))))
+TRANSCRIPTION_QUEUE_SIZE = int(os.getenv("TRANSCRIPTION_QUEUE_SIZE", "8"))  # files waiting for a worker
+TRANSCRIPTION_TIMEOUT_SECONDS = float(os.getenv("TRANSCRIPTION_TIMEOUT_SECONDS", "1800"))
+# Audio is transcribed in windows of about this length, cut at a silence within the search distance
+# where there is one, and overlapping their neighbours by a little so no word is lost at a cut
+TRANSCRIPTION_WINDOW_SECONDS = float(os.getenv("TRANSCRIPTION_WINDOW_SECONDS", "120"))
+TRANSCRIPTION_OVERLAP_SECONDS = float(os.getenv("TRANSCRIPTION_OVERLAP_SECONDS", "2"))
+TRANSCRIPTION_SILENCE_SEARCH_SECONDS = float(os.getenv("TRANSCRIPTION_SILENCE_SEARCH_SECONDS", "15"))
+
+# Per-user session data (source references, conversation history). Users idle
+# for USER_IDLE_TTL_SECONDS are dropped; past USER_DATA_TOTAL_MAX_BYTES the
+# least recently active users are dropped first
+USER_DATA_MAX_BYTES = int(os.getenv("USER_DATA_MAX_BYTES", str(1024 * 1024)))
+USER_DATA_TOTAL_MAX_BYTES = int(os.getenv("USER_DATA_TOTAL_MAX_BYTES", str(64 * 1024 * 1024)))
+USER_IDLE_TTL_SECONDS = float(os.getenv("USER_IDLE_TTL_SECONDS", str(2 * 60 * 60)))
+USER_REAPER_INTERVAL_SECONDS = 60
+
+# Prompt token budgets per call type (estimated tokens, see utils/tokens.py),
+# overridable with PROMPT_TOKEN_BUDGET_<CALL_TYPE>
+PROMPT_TOKEN_BUDGETS = {
+    call_type: int(os.getenv(f"PROMPT_TOKEN_BUDGET_{call_type.upper()}", str(default)))
+    for call_type, default in {
+        "summary": 12000,
+        "answer": 12000,
+        "merge_summaries": 12000,
+        "merge_answers": 12000,
+        "chunk_summary": 6000,
+        "content_summary": 12000,
+        "history_fold": 4000,
+    }.items()
+}
+PROMPT_MIN_SECTION_TOKENS = 64  # optional sections with less room left are dropped
+
+# Conversation history: the last CONVERSATION_HISTORY_LIMIT turns stay verbatim,
+# older ones are folded into a rolling summary; the history section of a
+# prompt is capped at HISTORY_TOKEN_BUDGET (estimated) tokens
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "1500"))
+HISTORY_SUMMARY_WORD_LIMIT = 250
+HISTORY_COMPACTION_WORKERS = int(os.getenv("HISTORY_COMPACTION_WORKERS", "2"))
+
+# Request diagnostics: ?trace=1 returns per-source stage timings; ?profile=1
+# (with the X-Admin-Token header) also records a sampling profile. Profiling
+# is disabled while ADMIN_TOKEN is unset.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+PROFILE_SAMPLE_INTERVAL_SECONDS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_SECONDS", "0.01"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(ARTIFACT_STORE_DIR, "profiles"))
+PROFILE_MAX_STORED = int(os.getenv("PROFILE_MAX_STORED", "50"))
+
+# Background ingestion jobs (/api/ingest, /api/jobs/<job_id>)
+INGEST_JOB_WORKERS = int(os.getenv("INGEST_JOB_WORKERS", "2"))
+INGEST_SOURCE_TIMEOUT_SECONDS = float(os.getenv("INGEST_SOURCE_TIMEOUT_SECONDS", "3600"))
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "3600"))  # keep finished jobs pollable
+# Job status is kept in SQLite so every gunicorn worker can answer the polls
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", os.path.join(ARTIFACT_STORE_DIR, "jobs.sqlite3"))
+# Running jobs are refreshed this often; unfinished jobs not refreshed for JOB_ORPHAN_SECONDS lost their process
+JOB_HEARTBEAT_SECONDS = 30
+JOB_ORPHAN_SECONDS = float(os.getenv("JOB_ORPHAN_SECONDS", "150"))
+
+# Map-reduce summarization of content over the "summary" prompt token budget
+SUMMARY_CHUNK_SIZE = 8000  # target characters per chunk
+CHUNK_SUMMARY_WORD_LIMIT = 200
+SUMMARY_MAP_WORKERS = int(os.getenv("SUMMARY_MAP_WORKERS", "4"))
+CHUNK_SUMMARY_CACHE_MAX_BYTES = int(os.getenv("CHUNK_SUMMARY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Tree-reduce merging of per-source summaries/answers: results per merge call, and merge calls run at once per level
+MERGE_FANOUT = max(2, int(os.getenv("MERGE_FANOUT", "4")))
+MERGE_WORKERS = int(os.getenv("MERGE_WORKERS", "4"))
+
 # Log the constants to ensure they are loaded properly
+logging.info(f"GEMINI_MODEL_NAME: {GEMINI_MODEL_NAME}")
 logging.info(f"VIDEO_ID_PATTERN: {VIDEO_ID_PATTERN}")
 logging.info(f"CONVERSATION_HISTORY_LIMIT: {CONVERSATION_HISTORY_LIMIT}")
 logging.info(f"SUMMARY_WORD_LIMIT: {SUMMARY_WORD_LIMIT}")
 logging.info(f"MAX_TRANSCRIPT_LENGTH: {MAX_TRANSCRIPT_LENGTH}")
+logging.info(f"PDF_EXTRACTION_WORKERS: {PDF_EXTRACTION_WORKERS}")
+logging.info(f"SPREADSHEET_MAX_ROWS: {SPREADSHEET_MAX_ROWS}, SPREADSHEET_MAX_BYTES: {SPREADSHEET_MAX_BYTES}")
+logging.info(f"MAX_SOURCE_WORKERS: {MAX_SOURCE_WORKERS}")
+logging.info(f"SOURCE_TIMEOUT_SECONDS: {SOURCE_TIMEOUT_SECONDS}")
+logging.info(f"REQUEST_TIMEOUT_SECONDS: {REQUEST_TIMEOUT_SECONDS}")
+logging.info(f"BULK_MAX_SOURCES: {BULK_MAX_SOURCES}, BULK_REQUEST_TIMEOUT_SECONDS: {BULK_REQUEST_TIMEOUT_SECONDS}")
+logging.info(f"HTTP_CONNECT_TIMEOUT: {HTTP_CONNECT_TIMEOUT}, HTTP_READ_TIMEOUT: {HTTP_READ_TIMEOUT}, HTTP_MAX_RETRIES: {HTTP_MAX_RETRIES}")
+logging.info(f"CONTENT_CACHE_MAX_BYTES: {CONTENT_CACHE_MAX_BYTES}")
+logging.info(f"CONTENT_CACHE_TTL_SECONDS: {CONTENT_CACHE_TTL_SECONDS}")
+logging.info(f"ASR_BACKEND: {ASR_BACKEND}, ASR_MODEL_SIZE: {ASR_MODEL_SIZE}, ASR_COMPUTE_TYPE: {ASR_COMPUTE_TYPE}, ASR_BEAM_SIZE: {ASR_BEAM_SIZE}")
+logging.info(f"TRANSCRIPTION_WORKERS: {TRANSCRIPTION_WORKERS}")
+logging.info(f"TRANSCRIPTION_WINDOW_SECONDS: {TRANSCRIPTION_WINDOW_SECONDS}, TRANSCRIPTION_OVERLAP_SECONDS: {TRANSCRIPTION_OVERLAP_SECONDS}")
+logging.info(f"INGEST_JOB_WORKERS: {INGEST_JOB_WORKERS}, JOB_STORE_PATH: {JOB_STORE_PATH}")
+logging.info(f"SUMMARY_CHUNK_SIZE: {SUMMARY_CHUNK_SIZE}, SUMMARY_MAP_WORKERS: {SUMMARY_MAP_WORKERS}")
+logging.info(f"MERGE_FANOUT: {MERGE_FANOUT}, MERGE_WORKERS: {MERGE_WORKERS}")
+logging.info(f"ARTIFACT_STORE_DIR: {ARTIFACT_STORE_DIR}, ARTIFACT_STORE_MAX_BYTES: {ARTIFACT_STORE_MAX_BYTES}")
+logging.info(f"LLM_CACHE_ENABLED: {LLM_CACHE_ENABLED}, LLM_CACHE_PERSIST: {LLM_CACHE_PERSIST}")
+logging.info(f"RETRIEVAL_CHUNK_SIZE: {RETRIEVAL_CHUNK_SIZE}, RETRIEVAL_TOP_K: {RETRIEVAL_TOP_K}")
+logging.info(f"QA_SINGLE_PASS: {QA_SINGLE_PASS}, MULTI_SOURCE_TOP_K: {MULTI_SOURCE_TOP_K}")
+logging.info(f"USER_DATA_MAX_BYTES: {USER_DATA_MAX_BYTES}, USER_DATA_TOTAL_MAX_BYTES: {USER_DATA_TOTAL_MAX_BYTES}, USER_IDLE_TTL_SECONDS: {USER_IDLE_TTL_SECONDS}")
+logging.info(f"PROMPT_TOKEN_BUDGETS: {PROMPT_TOKEN_BUDGETS}")
+logging.info(f"HISTORY_TOKEN_BUDGET: {HISTORY_TOKEN_BUDGET}, HISTORY_SUMMARY_WORD_LIMIT: {HISTORY_SUMMARY_WORD_LIMIT}")
+logging.info(f"Profiling enabled: {bool(ADMIN_TOKEN)}, PROFILE_SAMPLE_INTERVAL_SECONDS: {PROFILE_SAMPLE_INTERVAL_SECONDS}")
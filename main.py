@@ -1,10 +1,14 @@
 # main.py inside the package "poppy_ai"
 from flask import Flask, render_template
 from routes.youtube_routes import youtube_bp  # note the dot before youtube_routes
+from routes.metrics_routes import metrics_bp
+from routes.admin_routes import admin_bp
 
 app = Flask(__name__)
 
 app.register_blueprint(youtube_bp)
+app.register_blueprint(metrics_bp)
+app.register_blueprint(admin_bp)
 
 @app.route('/')
 def landing():
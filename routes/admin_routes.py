@@ -0,0 +1,24 @@
+from flask import Blueprint, Response, request, jsonify
+from utils.error_handling import handle_errors
+from utils.profiling import is_admin, load_profile
+
+admin_bp = Blueprint('admin_bp', __name__)
+
+
+# /api/admin/profiles/<profile_id>
+@admin_bp.route('/api/admin/profiles/<profile_id>', methods=['GET'])
+@handle_errors
+def download_profile_endpoint(profile_id):
+    """
+    Downloads a request profile (folded stacks) recorded with ?profile=1.
+    """
+    if not is_admin(request.headers.get("X-Admin-Token")):
+        return jsonify({"error": "A valid admin token is required."}), 403
+    profile = load_profile(profile_id)
+    if profile is None:
+        return jsonify({"error": "Profile not found."}), 404
+    return Response(
+        profile,
+        mimetype="text/plain",
+        headers={"Content-Disposition": f"attachment; filename=profile-{profile_id}.folded"}
+    )
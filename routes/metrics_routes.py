@@ -0,0 +1,13 @@
+from flask import Blueprint, Response
+from utils.error_handling import handle_errors
+from utils.metrics import render_metrics
+
+metrics_bp = Blueprint('metrics_bp', __name__)
+
+
+# /metrics (Prometheus scrape target)
+@metrics_bp.route('/metrics', methods=['GET'])
+@handle_errors
+def metrics_endpoint():
+    body, content_type = render_metrics()
+    return Response(body, content_type=content_type)
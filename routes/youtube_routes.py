@@ -1,12 +1,29 @@
-import os
-import time
+import json
+import queue
 import logging
 import threading
-from flask import Blueprint, request, jsonify, send_file
+from urllib.parse import urlencode
+from flask import Blueprint, Response, request, jsonify, send_file, stream_with_context
 from werkzeug.utils import secure_filename
 
+from config import (
+    MAX_SOURCE_WORKERS,
+    SOURCE_TIMEOUT_SECONDS,
+    REQUEST_TIMEOUT_SECONDS,
+    BULK_MAX_SOURCES,
+    BULK_REQUEST_TIMEOUT_SECONDS,
+    UPLOAD_FOLDER
+)
 from utils.error_handling import handle_errors
+from utils.concurrency import run_bounded, iter_bounded
+from utils.progress import progress_reporter, report_stage
+from utils.metrics import track_request, count_unsupported
+from utils.tracing import span
+from utils.diagnostics import with_diagnostics
+from utils.uploads import save_upload
+from services.job_service import create_ingest_job, get_job
 from services.pdf_service import process_file, summarize_content
+from services.retrieval_service import get_index
 from services.youtube_service import (
     get_or_create_user_data,
     extract_video_id,
@@ -16,10 +33,19 @@ from services.youtube_service import (
     answer_question,
     merge_summaries,
     merge_answers,
+    stream_answer_question,
+    stream_summary,
+    stream_merge_summaries,
+    stream_merge_answers,
+    single_pass_answer_prompt,
+    answer_multi_source,
+    stream_answer_multi_source,
     prepare_summary_content,
     get_file_content,
     get_website_content,
     get_wikipedia_content,
+    get_conversation_context,
+    record_conversation,
     end_conversation
 )
 
@@ -35,22 +61,373 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 ##############################################################################
-# In-memory only. No database. We'll store everything in user_data_cache
-# accessed via get_or_create_user_data(username).
+# In-memory only. No database. Per-user state lives in user_data_cache
+# (bounded, idle users expire) accessed via get_or_create_user_data(username).
 ##############################################################################
 
+# Keys under which failed sources of each type are reported back to the client
+UNSUPPORTED_KEYS = {
+    "youtube": "unsupported_youtube_links",
+    "file": "unsupported_files",
+    "website": "unsupported_websites",
+    "wikipedia": "unsupported_wikipedia_titles",
+}
+# Key of the bulk endpoint for entries whose type is not one of the above
+UNKNOWN_UNSUPPORTED_KEY = "unsupported_sources"
+
+
+def form_upload(files, i):
+    """
+    Returns the uploaded_file<i> upload of the form, or None if the field is
+    missing or empty. Works on Flask's request.files and Starlette's form.
+    """
+    upload = files.get(f'uploaded_file{i}')
+    if upload is None or isinstance(upload, str) or not upload.filename:
+        return None
+    return upload
+
+
+def read_form_sources(data, files):
+    """
+    Reads the up-to-5-per-type source fields from the submitted form.
+    """
+    youtube_links = [data.get(f'youtube_link{i}') for i in range(1, 6) if data.get(f'youtube_link{i}')]
+    website_urls = [data.get(f'website_url{i}') for i in range(1, 6) if data.get(f'website_url{i}')]
+    wikipedia_titles = [data.get(f'wikipedia_title{i}') for i in range(1, 6) if data.get(f'wikipedia_title{i}')]
+    uploaded_files = [form_upload(files, i) for i in range(1, 6) if form_upload(files, i)]
+    return youtube_links, uploaded_files, website_urls, wikipedia_titles
+
+
+def read_page_ranges(data, files):
+    """
+    Reads the optional page_range<i> field of every present uploaded_file<i>,
+    aligned with the uploaded_files list returned by read_form_sources.
+    """
+    return [data.get(f'page_range{i}') for i in range(1, 6) if form_upload(files, i)]
+
+
+def describe_sources(youtube_links, uploaded_files, website_urls, wikipedia_titles, page_ranges=None):
+    """
+    Lists the submitted resources in the order their results are merged
+    (YouTube, files, websites, Wikipedia), as dicts with a "type", a "label"
+    used for error reporting and what loading them takes: the link, URL or
+    title in "value", or for files the "upload" itself, a safe "filename",
+    the "extension" and the optional PDF "page_range".
+    Shared by build_sources here and its async counterpart in asgi.py.
+    Returns (descriptions, rejected_files) where rejected_files are uploads
+    with a disallowed extension.
+    """
+    descriptions, rejected_files = [], []
+    descriptions.extend({"type": "youtube", "label": link, "value": link} for link in youtube_links)
+
+    page_ranges = page_ranges or [None] * len(uploaded_files)
+    for upfile, page_range in zip(uploaded_files, page_ranges):
+        if not allowed_file(upfile.filename):
+            rejected_files.append(upfile.filename)
+            count_unsupported("file")
+            continue
+        descriptions.append({
+            "type": "file",
+            "label": upfile.filename,
+            "upload": upfile,
+            "filename": secure_filename(upfile.filename),
+            "extension": upfile.filename.rsplit('.', 1)[1].lower(),
+            "page_range": page_range,
+        })
+
+    descriptions.extend({"type": "website", "label": url, "value": url} for url in website_urls)
+    descriptions.extend({"type": "wikipedia", "label": wtitle, "value": wtitle} for wtitle in wikipedia_titles)
+    return descriptions, rejected_files
+
+
+def build_sources(username, youtube_links, uploaded_files, website_urls, wikipedia_titles, page_ranges=None,
+                  allow_partial=False):
+    """
+    Turns the submitted resources (see describe_sources) into a list of
+    sources, each a dict with a "type", a "label" and a "load" callable
+    returning (content_text, metadata).
+    page_ranges optionally holds a PDF page range spec per uploaded file.
+    allow_partial uses the transcript so far of media still being transcribed
+    (e.g. by an ingest job) instead of waiting for all of it.
+    Returns (sources, rejected_files).
+    """
+    descriptions, rejected_files = describe_sources(
+        youtube_links, uploaded_files, website_urls, wikipedia_titles, page_ranges
+    )
+    sources = []
+    for description in descriptions:
+        if description["type"] == "youtube":
+            sources.append(youtube_source(username, description["value"], allow_partial))
+        elif description["type"] == "file":
+            sources.append(file_source(username, description, allow_partial))
+        else:
+            sources.append(JSON_SOURCE_BUILDERS[description["type"]](username, description["value"]))
+    return sources, rejected_files
+
+
+def file_source(username, description, allow_partial=False):
+    """
+    Saves the upload of a file description and returns its source. Saving
+    happens here, on the request thread, because the upload stream cannot be
+    read once the request has moved on to worker threads.
+    """
+    try:
+        # Stored under its content hash, so equal bytes are extracted only once
+        file_path, content_hash, _ = save_upload(description["upload"], UPLOAD_FOLDER, description["extension"])
+    except Exception as e:
+        logging.error(f"Error saving file {description['label']}: {e}")
+        return {"type": "file", "label": description["label"], "load": _raise(e)}
+
+    def load_file():
+        content_text = get_file_content(
+            username, description["filename"], description["extension"], file_path, content_hash,
+            description["page_range"], allow_partial
+        )
+        return content_text, {"title": description["filename"]}
+    return {"type": "file", "label": description["label"], "load": load_file}
+
+
+def youtube_source(username, link, allow_partial=False):
+    def load_youtube():
+        video_id = extract_video_id(link)
+        metadata = fetch_video_metadata(video_id)
+        return get_transcript_text(username, video_id, allow_partial), metadata
+    return {"type": "youtube", "label": link, "load": load_youtube}
+
+
+def website_source(username, url):
+    def load_website():
+        return get_website_content(username, url), {"title": url}
+    return {"type": "website", "label": url, "load": load_website}
+
+
+def wikipedia_source(username, wtitle):
+    def load_wikipedia():
+        return get_wikipedia_content(username, wtitle), {"title": wtitle}
+    return {"type": "wikipedia", "label": wtitle, "load": load_wikipedia}
+
+
+# Source builders of the JSON bulk endpoint, keyed by "type"
+JSON_SOURCE_BUILDERS = {
+    "youtube": youtube_source,
+    "website": website_source,
+    "wikipedia": wikipedia_source,
+}
+
+
+def read_json_sources(username, items):
+    """
+    Turns the "sources" list of a JSON request - objects like
+    {"type": "youtube", "value": "<link>"} - into sources, keeping their order.
+    Returns (sources, invalid) where invalid lists (index, type, label, reason)
+    for entries that cannot be processed; label falls back to
+    "sources[<index>]" when the entry has no value.
+    """
+    sources, invalid = [], []
+    for index, item in enumerate(items):
+        item = item if isinstance(item, dict) else {}
+        source_type, value = item.get("type"), item.get("value")
+        if not isinstance(source_type, str) or source_type not in JSON_SOURCE_BUILDERS:
+            invalid.append((index, source_type, str(value or f"sources[{index}]"), f"Unsupported source type: {source_type}"))
+        elif not isinstance(value, str) or not value.strip():
+            invalid.append((index, source_type, f"sources[{index}]", "Missing value"))
+        else:
+            sources.append((index, JSON_SOURCE_BUILDERS[source_type](username, value.strip())))
+    return sources, invalid
+
+
+def _raise(error):
+    def load():
+        raise error
+    return load
+
+
+def make_source_task(source, process, stage, reporter=None):
+    """
+    Builds the zero-argument task that loads a source and runs
+    process(content_text, metadata) on it, reporting stages to reporter.
+    """
+    def task():
+        with progress_reporter(reporter), span("source", source=source["label"], type=source["type"]):
+            report_stage("loading")
+            with span("loading"):
+                content_text, metadata = source["load"]()
+            report_stage(stage)
+            with span(stage):
+                return process(content_text, metadata)
+    return task
+
+
+def run_sources(sources, process, stage="processing"):
+    """
+    Runs process(content_text, metadata) for every source with bounded
+    concurrency and per-source / per-request deadlines.
+    Returns a list of (result, error) tuples in the same order as sources.
+    """
+    return run_bounded(
+        [make_source_task(source, process, stage) for source in sources],
+        max_workers=MAX_SOURCE_WORKERS,
+        task_timeout=SOURCE_TIMEOUT_SECONDS,
+        overall_timeout=REQUEST_TIMEOUT_SECONDS,
+    )
+
+
+def stream_sources(sources, process, stage="processing"):
+    """
+    Streaming counterpart of run_sources. Yields ("progress", event) tuples
+    while sources are loaded and processed, ("source_done", event) as each
+    source finishes, and finally ("results", outcomes) with the same ordered
+    (result, error) list run_sources returns.
+    """
+    events = queue.Queue()
+
+    def reporter_for(index, source):
+        def reporter(stage_name, details):
+            events.put(("progress", {
+                "index": index, "type": source["type"], "source": source["label"],
+                "stage": stage_name, **details
+            }))
+        return reporter
+
+    tasks = [
+        make_source_task(source, process, stage, reporter_for(index, source))
+        for index, source in enumerate(sources)
+    ]
+
+    def run():
+        outcomes = [(None, None)] * len(tasks)
+        try:
+            for index, result, error in iter_bounded(
+                tasks,
+                max_workers=MAX_SOURCE_WORKERS,
+                task_timeout=SOURCE_TIMEOUT_SECONDS,
+                overall_timeout=REQUEST_TIMEOUT_SECONDS,
+            ):
+                outcomes[index] = (result, error)
+                source = sources[index]
+                events.put(("source_done", {
+                    "index": index, "type": source["type"], "source": source["label"],
+                    "ok": error is None, **({"error": str(error)} if error else {})
+                }))
+        finally:
+            events.put(("results", outcomes))
+
+    threading.Thread(target=run, daemon=True).start()
+    while True:
+        kind, payload = events.get()
+        yield kind, payload
+        if kind == "results":
+            return
+
+
+def collect_outcomes(sources, outcomes, unsupported, with_reason):
+    """
+    Splits ordered outcomes into successful results and unsupported_* entries.
+    with_reason appends the error message to the reported label.
+    """
+    results = []
+    for source, (result, error) in zip(sources, outcomes):
+        if error:
+            logging.error(f"Error processing {source['type']} source {source['label']}: {error}")
+            label = f"{source['label']}: {str(error)}" if with_reason else source["label"]
+            unsupported[UNSUPPORTED_KEYS[source["type"]]].append(label)
+            count_unsupported(source["type"])
+        else:
+            results.append(result)
+    return results
+
+
+def load_for_answering(content_text, metadata):
+    """
+    Source process of the ask endpoints: builds the retrieval index while the
+    sources load in parallel, so ranking passages across them only scores.
+    """
+    get_index(content_text)
+    return content_text, metadata
+
+
+def answer_per_source(sources, documents, question, history_snapshot, username, unsupported):
+    """
+    Answers the question from each loaded (content_text, metadata) document
+    separately; sources are the ones the documents were loaded from.
+    Returns the answers in order, reporting failures in unsupported.
+    """
+    def answer_task(source, document):
+        def task():
+            with span("answering", source=source["label"]):
+                return answer_question(*document, question, history_snapshot, username)
+        return task
+
+    outcomes = run_bounded(
+        [answer_task(source, document) for source, document in zip(sources, documents)],
+        max_workers=MAX_SOURCE_WORKERS,
+        task_timeout=SOURCE_TIMEOUT_SECONDS,
+        overall_timeout=REQUEST_TIMEOUT_SECONDS,
+    )
+    return collect_outcomes(sources, outcomes, unsupported, with_reason=True)
+
+
+def loaded_sources(sources, outcomes):
+    return [source for source, (_, error) in zip(sources, outcomes) if error is None]
+
+
+def cited_sources(sources):
+    """
+    Lists the loaded sources of a single-pass answer with the number N it
+    cites them by ([Source N]), so clients can attribute each point.
+    """
+    return [
+        {"n": number, "type": source["type"], "label": source["label"]}
+        for number, source in enumerate(sources, 1)
+    ]
+
+
+def empty_unsupported():
+    return {key: [] for key in UNSUPPORTED_KEYS.values()}
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def sse_response(events):
+    return Response(
+        stream_with_context(events),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def ndjson_line(data):
+    return json.dumps(data) + "\n"
+
+
+def stream_error_message(e):
+    """
+    Logs an error raised mid-stream and returns the message shown to the client.
+    """
+    if isinstance(e, RuntimeError):
+        logging.error(f"RuntimeError while streaming: {str(e)}")
+        return str(e)
+    logging.exception(f"Exception while streaming: {str(e)}")
+    return "An unexpected error occurred."
+
+
+def sse_error(e):
+    return sse_event("error", {"error": stream_error_message(e)})
+
+
 # /api/summary
 @youtube_bp.route('/api/summary', methods=['POST'])
+@track_request("summary")
+@with_diagnostics
 @handle_errors
 def generate_summary_endpoint():
     data = request.form
     username = data.get('username')
 
     # Up to 5 YouTube links, websites, Wikipedia titles, or files
-    youtube_links = [data.get(f'youtube_link{i}') for i in range(1, 6) if data.get(f'youtube_link{i}')]
-    website_urls = [data.get(f'website_url{i}') for i in range(1, 6) if data.get(f'website_url{i}')]
-    wikipedia_titles = [data.get(f'wikipedia_title{i}') for i in range(1, 6) if data.get(f'wikipedia_title{i}')]
-    uploaded_files = [request.files.get(f'uploaded_file{i}') for i in range(1, 6) if request.files.get(f'uploaded_file{i}')]
+    youtube_links, uploaded_files, website_urls, wikipedia_titles = read_form_sources(data, request.files)
 
     if not username:
         return jsonify({"error": "Username is required."}), 400
@@ -58,166 +435,354 @@ def generate_summary_endpoint():
         return jsonify({"error": "No links, files, or titles provided."}), 400
 
     get_or_create_user_data(username)  # ensure we have a user structure
-    unsupported_youtube_links, unsupported_files = [], []
-    unsupported_websites, unsupported_wikipedia_titles = [], []
+    unsupported = empty_unsupported()
+
+    sources, rejected_files = build_sources(
+        username, youtube_links, uploaded_files, website_urls, wikipedia_titles,
+        read_page_ranges(data, request.files)
+    )
+    unsupported["unsupported_files"].extend(rejected_files)
+
+    outcomes = run_sources(
+        sources,
+        lambda content_text, metadata: generate_summary(content_text, metadata, username),
+        stage="summarizing"
+    )
+
+    # Combine all summaries (in submission order)
+    all_summaries = collect_outcomes(sources, outcomes, unsupported, with_reason=False)
+    if all_summaries:
+        combined_summary = merge_summaries(*all_summaries)
+    else:
+        combined_summary = "No valid content to summarize."
+
+    return jsonify({"summary": combined_summary, **unsupported})
 
-    youtube_summaries = []
-    for link in youtube_links:
-        try:
-            video_id = extract_video_id(link)
-            metadata = fetch_video_metadata(video_id)
-            content_text = get_transcript_text(username, video_id)
-            youtube_summaries.append(generate_summary(content_text, metadata, username))
-        except Exception as e:
-            logging.error(f"Error processing YouTube link {link}: {e}")
-            unsupported_youtube_links.append(link)
 
-    file_summaries = []
-    for upfile in uploaded_files:
+# /api/summary/stream
+@youtube_bp.route('/api/summary/stream', methods=['POST'])
+@track_request("summary_stream")
+@handle_errors
+def generate_summary_stream_endpoint():
+    """
+    Same inputs as /api/summary. Responds with server-sent events:
+    "progress" and "source_done" per source, "token" pieces of the summary
+    (of the only source, or the merged one) as Gemini generates them, then
+    "done" with the full payload of /api/summary (or "error").
+    """
+    data = request.form
+    username = data.get('username')
+
+    youtube_links, uploaded_files, website_urls, wikipedia_titles = read_form_sources(data, request.files)
+
+    if not username:
+        return jsonify({"error": "Username is required."}), 400
+    if not youtube_links and not uploaded_files and not website_urls and not wikipedia_titles:
+        return jsonify({"error": "No links, files, or titles provided."}), 400
+
+    get_or_create_user_data(username)
+    unsupported = empty_unsupported()
+
+    sources, rejected_files = build_sources(
+        username, youtube_links, uploaded_files, website_urls, wikipedia_titles,
+        read_page_ranges(data, request.files)
+    )
+    unsupported["unsupported_files"].extend(rejected_files)
+
+    # A single source has nothing to merge, so its summary itself is streamed
+    single = len(sources) == 1
+
+    def summarize(content_text, metadata):
+        if single:
+            return content_text, metadata
+        return generate_summary(content_text, metadata, username)
+
+    def events():
         try:
-            if allowed_file(upfile.filename):
-                file_extension = upfile.filename.rsplit('.', 1)[1].lower()
-                filename = secure_filename(upfile.filename)
-                file_path = os.path.join('uploads', filename)
-                upfile.save(file_path)
-
-                content_text = get_file_content(username, filename, file_extension, file_path)
-                file_summaries.append(generate_summary(content_text, {"title": filename}, username))
+            outcomes = []
+            for kind, payload in stream_sources(sources, summarize, stage="summarizing"):
+                if kind == "results":
+                    outcomes = payload
+                else:
+                    yield sse_event(kind, payload)
+
+            results = collect_outcomes(sources, outcomes, unsupported, with_reason=False)
+            if single and results:
+                pieces = stream_summary(*results[0], username)
+            elif results:
+                yield sse_event("progress", {"stage": "merging"})
+                pieces = stream_merge_summaries(*results)
             else:
-                unsupported_files.append(upfile.filename)
-        except Exception as e:
-            logging.error(f"Error processing file {upfile.filename}: {e}")
-            unsupported_files.append(upfile.filename)
+                pieces = iter(["No valid content to summarize."])
 
-    website_summaries = []
-    for url in website_urls:
-        try:
-            content_text = get_website_content(username, url)
-            website_summaries.append(generate_summary(content_text, {"title": url}, username))
+            collected = []
+            for piece in pieces:
+                collected.append(piece)
+                yield sse_event("token", {"text": piece})
+            combined_summary = "".join(collected).strip()
+
+            yield sse_event("done", {"summary": combined_summary, **unsupported})
         except Exception as e:
-            logging.error(f"Error processing website {url}: {e}")
-            unsupported_websites.append(url)
+            yield sse_error(e)
+
+    return sse_response(events())
+
+
+# /api/summary/bulk
+@youtube_bp.route('/api/summary/bulk', methods=['POST'])
+@track_request("summary_bulk")
+@handle_errors
+def generate_summary_bulk_endpoint():
+    """
+    JSON body: {"username": ..., "sources": [{"type": "youtube" | "website" |
+    "wikipedia", "value": <link, URL or title>}, ...]}, up to BULK_MAX_SOURCES
+    entries. Sources are ingested and summarized MAX_SOURCE_WORKERS at a time.
+    Responds with NDJSON: one {"event": "source", ...} line per source as it
+    finishes (with its "summary" or "error"), then {"event": "done"} with the
+    merged summary and the unsupported_* lists of /api/summary, which also
+    hold the invalid entries; entries of an unknown type go to
+    "unsupported_sources" (or {"event": "error"}).
+    """
+    data = request.get_json(silent=True) or {}
+    username = data.get('username')
+    items = data.get('sources')
+
+    if not username:
+        return jsonify({"error": "Username is required."}), 400
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "No sources provided."}), 400
+    if len(items) > BULK_MAX_SOURCES:
+        return jsonify({"error": f"At most {BULK_MAX_SOURCES} sources per request."}), 400
+
+    get_or_create_user_data(username)
+    indexed_sources, invalid = read_json_sources(username, items)
+    sources = [source for _, source in indexed_sources]
+
+    def summarize(content_text, metadata):
+        return generate_summary(content_text, metadata, username)
 
-    wikipedia_summaries = []
-    for wtitle in wikipedia_titles:
+    def events():
         try:
-            content_text = get_wikipedia_content(username, wtitle)
-            wikipedia_summaries.append(generate_summary(content_text, {"title": wtitle}, username))
+            unsupported = {**empty_unsupported(), UNKNOWN_UNSUPPORTED_KEY: []}
+            for index, source_type, label, reason in invalid:
+                known = isinstance(source_type, str) and source_type in UNSUPPORTED_KEYS
+                unsupported[UNSUPPORTED_KEYS[source_type] if known else UNKNOWN_UNSUPPORTED_KEY].append(label)
+                count_unsupported(source_type if known else "unknown")
+                yield ndjson_line({"event": "source", "index": index, "source": label, "ok": False, "error": reason})
+
+            summaries = [None] * len(sources)
+            for position, summary, error in iter_bounded(
+                [make_source_task(source, summarize, "summarizing") for source in sources],
+                max_workers=MAX_SOURCE_WORKERS,
+                task_timeout=SOURCE_TIMEOUT_SECONDS,
+                overall_timeout=BULK_REQUEST_TIMEOUT_SECONDS,
+            ):
+                index, source = indexed_sources[position]
+                line = {"event": "source", "index": index, "type": source["type"], "source": source["label"]}
+                if error:
+                    logging.error(f"Error processing {source['type']} source {source['label']}: {error}")
+                    unsupported[UNSUPPORTED_KEYS[source["type"]]].append(source["label"])
+                    count_unsupported(source["type"])
+                    line.update(ok=False, error=str(error))
+                else:
+                    summaries[position] = summary
+                    line.update(ok=True, summary=summary)
+                yield ndjson_line(line)
+
+            # Merged in submission order, like /api/summary
+            all_summaries = [summary for summary in summaries if summary]
+            if all_summaries:
+                combined_summary = merge_summaries(*all_summaries)
+            else:
+                combined_summary = "No valid content to summarize."
+            yield ndjson_line({"event": "done", "summary": combined_summary, **unsupported})
         except Exception as e:
-            logging.error(f"Error processing Wikipedia title {wtitle}: {e}")
-            unsupported_wikipedia_titles.append(wtitle)
+            yield ndjson_line({"event": "error", "error": stream_error_message(e)})
 
-    # Combine all summaries
-    all_summaries = youtube_summaries + file_summaries + website_summaries + wikipedia_summaries
-    if all_summaries:
-        combined_summary = merge_summaries(*all_summaries)
-    else:
-        combined_summary = "No valid content to summarize."
-
-    return jsonify({
-        "summary": combined_summary,
-        "unsupported_youtube_links": unsupported_youtube_links,
-        "unsupported_files": unsupported_files,
-        "unsupported_websites": unsupported_websites,
-        "unsupported_wikipedia_titles": unsupported_wikipedia_titles
-    })
+    return Response(
+        stream_with_context(events()),
+        mimetype="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 # /api/ask_question
 @youtube_bp.route('/api/ask_question', methods=['POST'])
+@track_request("ask_question")
+@with_diagnostics
 @handle_errors
 def ask_question_endpoint():
     data = request.form
     username = data.get('username')
     question = data.get('question')
 
-    youtube_links = [data.get(f'youtube_link{i}') for i in range(1, 6) if data.get(f'youtube_link{i}')]
-    website_urls = [data.get(f'website_url{i}') for i in range(1, 6) if data.get(f'website_url{i}')]
-    wikipedia_titles = [data.get(f'wikipedia_title{i}') for i in range(1, 6) if data.get(f'wikipedia_title{i}')]
-    uploaded_files = [request.files.get(f'uploaded_file{i}') for i in range(1, 6) if request.files.get(f'uploaded_file{i}')]
+    youtube_links, uploaded_files, website_urls, wikipedia_titles = read_form_sources(data, request.files)
 
     if not username or not question:
         return jsonify({"error": "Username and question are required."}), 400
     if not youtube_links and not uploaded_files and not website_urls and not wikipedia_titles:
         return jsonify({"error": "No links, files, or titles provided."}), 400
 
-    user_data = get_or_create_user_data(username)
-    youtube_answers, file_answers, website_answers, wikipedia_answers = [], [], [], []
-    unsupported_youtube_links, unsupported_files, unsupported_websites, unsupported_wikipedia_titles = [], [], [], []
+    get_or_create_user_data(username)
+    unsupported = empty_unsupported()
 
-    # We can handle concurrency, but let's do straightforward processing for clarity
-    # conversation_history is user_data["conversation_history"]
-    conversation_history = user_data["conversation_history"]
+    sources, rejected_files = build_sources(
+        username, youtube_links, uploaded_files, website_urls, wikipedia_titles,
+        read_page_ranges(data, request.files), allow_partial=data.get('allow_partial') == 'true'
+    )
+    unsupported["unsupported_files"].extend(f"{name}: Unsupported file type" for name in rejected_files)
 
-    # Process YouTube
-    for link in youtube_links:
-        try:
-            video_id = extract_video_id(link)
-            metadata = fetch_video_metadata(video_id)
-            content_text = get_transcript_text(username, video_id)
-            ans = answer_question(content_text, metadata, question, conversation_history, username)
-            youtube_answers.append(ans)
-        except Exception as e:
-            logging.error(f"Error processing YouTube link {link}: {e}")
-            unsupported_youtube_links.append(f"{link}: {str(e)}")
+    # Every source sees the same snapshot of the history
+    history_snapshot = get_conversation_context(username)
+    outcomes = run_sources(sources, load_for_answering, stage="indexing")
+    documents = collect_outcomes(sources, outcomes, unsupported, with_reason=True)
+
+    # One call over the passages ranked best across all sources when they fit
+    prompt = single_pass_answer_prompt(documents, question, history_snapshot)
+    final_answer = "No valid information available to answer the question."
+    citations = []
+    if prompt:
+        final_answer = answer_multi_source(prompt)
+        citations = cited_sources(loaded_sources(sources, outcomes))
+    elif documents:
+        # Merge answers (in submission order)
+        all_answers = answer_per_source(
+            loaded_sources(sources, outcomes), documents, question, history_snapshot, username, unsupported
+        )
+        if all_answers:
+            final_answer = merge_answers(*all_answers, question=question)
+
+    # Save Q&A in conversation_history
+    record_conversation(username, question, final_answer)
+
+    return jsonify({"answer": final_answer, "sources": citations, **unsupported})
+
+
+# /api/ask_question/stream
+@youtube_bp.route('/api/ask_question/stream', methods=['POST'])
+@track_request("ask_question_stream")
+@handle_errors
+def ask_question_stream_endpoint():
+    """
+    Same inputs as /api/ask_question. Responds with server-sent events:
+    "progress" and "source_done" per source, "token" pieces of the answer as
+    Gemini generates them, then "done" with the full payload of
+    /api/ask_question (or "error").
+    "done" also lists the sources cited as [Source N] (see cited_sources).
+    The answer over all sources (or the single source) is streamed directly;
+    when sources are answered one by one, the per-source answers are computed
+    concurrently and the merge is streamed.
+    """
+    data = request.form
+    username = data.get('username')
+    question = data.get('question')
+
+    youtube_links, uploaded_files, website_urls, wikipedia_titles = read_form_sources(data, request.files)
+
+    if not username or not question:
+        return jsonify({"error": "Username and question are required."}), 400
+    if not youtube_links and not uploaded_files and not website_urls and not wikipedia_titles:
+        return jsonify({"error": "No links, files, or titles provided."}), 400
+
+    get_or_create_user_data(username)
+    unsupported = empty_unsupported()
+
+    sources, rejected_files = build_sources(
+        username, youtube_links, uploaded_files, website_urls, wikipedia_titles,
+        read_page_ranges(data, request.files), allow_partial=data.get('allow_partial') == 'true'
+    )
+    unsupported["unsupported_files"].extend(f"{name}: Unsupported file type" for name in rejected_files)
 
-    # Process Files
-    for upfile in uploaded_files:
+    history_snapshot = get_conversation_context(username)
+
+    def events():
         try:
-            if allowed_file(upfile.filename):
-                file_extension = upfile.filename.rsplit('.', 1)[1].lower()
-                filename = secure_filename(upfile.filename)
-                file_path = os.path.join('uploads', filename)
-                upfile.save(file_path)
-
-                content_text = get_file_content(username, filename, file_extension, file_path)
-                ans = answer_question(content_text, {"title": filename}, question, conversation_history, username)
-                file_answers.append(ans)
+            # Only load here; the answer itself is streamed below
+            outcomes = []
+            for kind, payload in stream_sources(sources, load_for_answering, stage="indexing"):
+                if kind == "results":
+                    outcomes = payload
+                else:
+                    yield sse_event(kind, payload)
+
+            documents = collect_outcomes(sources, outcomes, unsupported, with_reason=True)
+            prompt = single_pass_answer_prompt(documents, question, history_snapshot)
+            citations = cited_sources(loaded_sources(sources, outcomes)) if prompt else []
+            if not documents:
+                pieces = iter(["No valid information available to answer the question."])
+            elif prompt:
+                yield sse_event("progress", {"stage": "answering"})
+                pieces = stream_answer_multi_source(prompt)
+            elif len(documents) == 1:
+                content_text, metadata = documents[0]
+                pieces = stream_answer_question(content_text, metadata, question, history_snapshot, username)
             else:
-                unsupported_files.append(f"{upfile.filename}: Unsupported file type")
+                yield sse_event("progress", {"stage": "answering"})
+                all_answers = answer_per_source(
+                    loaded_sources(sources, outcomes), documents, question, history_snapshot, username, unsupported
+                )
+                yield sse_event("progress", {"stage": "merging"})
+                pieces = stream_merge_answers(*all_answers, question=question)
+
+            collected = []
+            for piece in pieces:
+                collected.append(piece)
+                yield sse_event("token", {"text": piece})
+            final_answer = "".join(collected).strip()
+
+            record_conversation(username, question, final_answer)
+
+            yield sse_event("done", {"answer": final_answer, "sources": citations, **unsupported})
         except Exception as e:
-            logging.error(f"Error processing file {upfile.filename}: {e}")
-            unsupported_files.append(f"{upfile.filename}: {str(e)}")
+            yield sse_error(e)
 
-    # Process Websites
-    for url in website_urls:
-        try:
-            content_text = get_website_content(username, url)
-            ans = answer_question(content_text, {"title": url}, question, conversation_history, username)
-            website_answers.append(ans)
-        except Exception as e:
-            logging.error(f"Error processing website {url}: {e}")
-            unsupported_websites.append(f"{url}: {str(e)}")
+    return sse_response(events())
 
-    # Process Wikipedia
-    for wtitle in wikipedia_titles:
-        try:
-            content_text = get_wikipedia_content(username, wtitle)
-            ans = answer_question(content_text, {"title": wtitle}, question, conversation_history, username)
-            wikipedia_answers.append(ans)
-        except Exception as e:
-            logging.error(f"Error processing Wikipedia title '{wtitle}': {e}")
-            unsupported_wikipedia_titles.append(f"{wtitle}: {str(e)}")
 
-    # Merge answers
-    all_answers = youtube_answers + file_answers + website_answers + wikipedia_answers
-    final_answer = "No valid information available to answer the question."
-    if all_answers:
-        final_answer = all_answers[0] if len(all_answers) == 1 else merge_answers(*all_answers, question=question)
+# /api/ingest
+@youtube_bp.route('/api/ingest', methods=['POST'])
+@track_request("ingest")
+@handle_errors
+def ingest_endpoint():
+    """
+    Accepts the same source fields as /api/summary and starts downloading,
+    extracting and transcribing them in the background. Returns a job id at
+    once; poll /api/jobs/<job_id>?username=... for stage-level progress. Once the job is
+    done, ask/summary calls for the same sources are served from the cache.
+    """
+    data = request.form
+    username = data.get('username')
 
-    # Save Q&A in conversation_history
-    conversation_history.append({
-        "question": question,
-        "answer": final_answer
-    })
-
-    return jsonify({
-        "answer": final_answer,
-        "unsupported_youtube_links": unsupported_youtube_links,
-        "unsupported_files": unsupported_files,
-        "unsupported_websites": unsupported_websites,
-        "unsupported_wikipedia_titles": unsupported_wikipedia_titles
-    })
+    youtube_links, uploaded_files, website_urls, wikipedia_titles = read_form_sources(data, request.files)
+
+    if not username:
+        return jsonify({"error": "Username is required."}), 400
+    if not youtube_links and not uploaded_files and not website_urls and not wikipedia_titles:
+        return jsonify({"error": "No links, files, or titles provided."}), 400
+
+    get_or_create_user_data(username)
+    sources, rejected_files = build_sources(
+        username, youtube_links, uploaded_files, website_urls, wikipedia_titles,
+        read_page_ranges(data, request.files)
+    )
+    job_id = create_ingest_job(username, sources, rejected_files)
+
+    status_url = f"/api/jobs/{job_id}?{urlencode({'username': username})}"
+    return jsonify({"job_id": job_id, "status_url": status_url}), 202
+
+
+# /api/jobs/<job_id>
+@youtube_bp.route('/api/jobs/<job_id>', methods=['GET'])
+@handle_errors
+def job_status_endpoint(job_id):
+    username = request.args.get('username')
+    if not username:
+        return jsonify({"error": "Username is required."}), 400
+    # Jobs of other users are reported as missing
+    job = get_job(job_id, username)
+    if job is None:
+        return jsonify({"error": "Job not found."}), 404
+    return jsonify(job)
 
 
 # /api/end_conversation
@@ -8,11 +8,20 @@ from pytube import YouTube
 from youtube_transcript_api import YouTubeTranscriptApi
 from youtube_transcript_api._errors import NoTranscriptFound, TranscriptsDisabled
 import google.generativeai as genai
-import whisper
-from config import VIDEO_ID_PATTERN, CONVERSATION_HISTORY_LIMIT, SUMMARY_WORD_LIMIT, MAX_TRANSCRIPT_LENGTH
-
-# Initialize Whisper model for speech-to-text
-whisper_model = whisper.load_model("base")
+from config import (
+    VIDEO_ID_PATTERN,
+    CONVERSATION_HISTORY_LIMIT,
+    SUMMARY_WORD_LIMIT,
+    MAX_TRANSCRIPT_LENGTH,
+    ASR_BACKEND,
+    ASR_MODEL_SIZE,
+    ASR_COMPUTE_TYPE,
+    ASR_BEAM_SIZE
+)
+from services.asr_backends import load_backend
+
+# Initialize the speech-to-text backend selected in config
+asr_backend = load_backend(ASR_BACKEND, ASR_MODEL_SIZE, ASR_COMPUTE_TYPE, ASR_BEAM_SIZE)
 
 # Temporary variable to store YouTube transcripts instead of Redis
 transcript_cache = {}
@@ -52,9 +61,8 @@ def download_audio(video_id):
 
 def transcribe_audio(audio_file_path):
     try:
-        logging.info("Transcribing audio with Whisper model...")
-        result = whisper_model.transcribe(audio_file_path)
-        transcript = result['text']
+        logging.info(f"Transcribing audio with {ASR_BACKEND}...")
+        transcript = " ".join(text for _, _, text in asr_backend.transcribe(audio_file_path))
         logging.info("Audio transcription successful.")
         return transcript
     except Exception as e:
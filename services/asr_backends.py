@@ -0,0 +1,60 @@
+##############################################################################
+# Speech recognition backends. Each one loads a Whisper model once and
+# transcribes 16 kHz mono float32 audio (or a media file path) into timed
+# segments (start, end, text), in seconds.
+#
+#   openai-whisper   reference PyTorch implementation; float32 on CPU
+#   faster-whisper   CTranslate2 re-implementation; int8-quantized weights on
+#                    CPU (compute_type), typically several times faster at
+#                    about the same accuracy
+#
+# The library is imported when a backend is loaded, so only the selected one
+# needs to be installed. Like transcription_worker, this module is imported in
+# the worker processes and must not import config or the app.
+##############################################################################
+
+
+class OpenAIWhisperBackend:
+    def __init__(self, model_size, beam_size=None, threads=None, **_):
+        import torch
+        import whisper
+        if threads:
+            torch.set_num_threads(threads)
+        self.model = whisper.load_model(model_size)
+        # beam_size 1 is openai-whisper's own default (greedy decoding)
+        self.options = {"beam_size": beam_size} if beam_size and beam_size > 1 else {}
+
+    def transcribe(self, audio):
+        result = self.model.transcribe(audio, fp16=False, **self.options)
+        return [(s["start"], s["end"], s["text"].strip()) for s in result["segments"]]
+
+
+class FasterWhisperBackend:
+    def __init__(self, model_size, compute_type="int8", beam_size=None, threads=None, **_):
+        from faster_whisper import WhisperModel
+        self.model = WhisperModel(model_size, device="cpu", compute_type=compute_type, cpu_threads=threads or 0)
+        self.beam_size = beam_size or 1
+
+    def transcribe(self, audio):
+        segments, _ = self.model.transcribe(audio, beam_size=self.beam_size)
+        # segments is lazy; decoding happens while it is consumed
+        return [(s.start, s.end, s.text.strip()) for s in segments]
+
+
+ASR_BACKENDS = {
+    "openai-whisper": OpenAIWhisperBackend,
+    "faster-whisper": FasterWhisperBackend,
+}
+
+
+def load_backend(backend, model_size, compute_type=None, beam_size=None, threads=None):
+    """
+    Loads the named backend with the given model size ("tiny", "base",
+    "small", ...). compute_type only applies to faster-whisper.
+    """
+    if backend not in ASR_BACKENDS:
+        raise ValueError(f"Unknown ASR backend '{backend}'; expected one of {', '.join(ASR_BACKENDS)}.")
+    options = {"beam_size": beam_size, "threads": threads}
+    if compute_type:
+        options["compute_type"] = compute_type
+    return ASR_BACKENDS[backend](model_size, **options)
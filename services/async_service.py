@@ -0,0 +1,296 @@
+import asyncio
+import logging
+import functools
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+from config import (
+    ASYNC_BLOCKING_WORKERS,
+    TRANSCRIPTION_WORKERS,
+    TRANSCRIPTION_QUEUE_SIZE,
+    HTTP_CONNECT_TIMEOUT,
+    TRANSCRIPT_SERVICE_READ_TIMEOUT,
+    EXTRACTOR_VERSIONS,
+    ARTIFACT_MAX_AGE_SECONDS
+)
+from services.youtube_service import (
+    user_data_cache,
+    content_cache,
+    artifact_store,
+    normalize_url,
+    extract_html_text,
+    download_audio,
+    transcribe_audio,
+    get_partial_content,
+    get_file_content,
+    get_wikipedia_content,
+    MEDIA_EXTENSIONS,
+    build_summary_prompt,
+    build_merge_summaries_prompt,
+    build_answer_prompt,
+    build_merge_answers_prompt,
+    merge_group_tokens
+)
+from services.summarization_service import async_tree_reduce
+from services.llm_service import async_generate_text
+from utils import async_http_client
+from utils.progress import report_stage
+from utils.metrics import time_stage
+
+##############################################################################
+# asyncio versions of the ingestion and Gemini calls used by the ASGI
+# endpoints (asgi.py). Network I/O (YouTube oEmbed, transcript service,
+# websites, Gemini) is awaited without holding a thread; blocking or
+# CPU-bound work (audio download, file extraction, Wikipedia client, prompt
+# packing, SQLite) runs on blocking_executor. Transcriptions wait on the
+# transcription pool for minutes while holding a thread, so they run on
+# their own transcription_executor and cannot starve the other blocking work.
+# Results share content_cache / artifact_store with the sync code paths.
+##############################################################################
+
+blocking_executor = ThreadPoolExecutor(max_workers=ASYNC_BLOCKING_WORKERS, thread_name_prefix="asgi-blocking")
+# As many threads as files the transcription pool runs or queues at once; more would only wait
+transcription_executor = ThreadPoolExecutor(
+    max_workers=TRANSCRIPTION_WORKERS + TRANSCRIPTION_QUEUE_SIZE, thread_name_prefix="asgi-transcription"
+)
+
+# Per-key locks so concurrent requests for the same source load it once:
+# cache_key -> [lock, users], users counting the holder and the waiters
+_load_locks = {}
+
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Runs func on the blocking executor, carrying over contextvars (progress, tracing).
+    """
+    return await _run_in(blocking_executor, func, *args, **kwargs)
+
+
+async def run_transcription(func, *args, **kwargs):
+    """
+    run_blocking for calls that transcribe audio (see transcription_executor).
+    """
+    return await _run_in(transcription_executor, func, *args, **kwargs)
+
+
+async def _run_in(executor, func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(executor, functools.partial(ctx.run, func, *args, **kwargs))
+
+
+async def async_load_content(cache_key, loader):
+    """
+    Async counterpart of youtube_service.load_content: memory cache, then
+    artifact store, then await loader() and persist its result.
+    """
+    cached = content_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    # No await between taking the entry and counting in, so the count is exact
+    entry = _load_locks.setdefault(cache_key, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            cached = content_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+            kind = cache_key[0]
+            source_id = "|".join(str(part) for part in cache_key[1:])
+            version = EXTRACTOR_VERSIONS[kind]
+            try:
+                stored = await run_blocking(artifact_store.get, kind, source_id, version, ARTIFACT_MAX_AGE_SECONDS.get(kind))
+            except Exception as e:
+                logging.error(f"Error reading artifact {kind}/{source_id}: {e}")
+                stored = None
+            if stored is not None:
+                content_cache.put(cache_key, stored)
+                return stored
+
+            content = await loader()
+            try:
+                await run_blocking(artifact_store.put, kind, source_id, version, content)
+            except Exception as e:
+                logging.error(f"Error storing artifact {kind}/{source_id}: {e}")
+            content_cache.put(cache_key, content)
+            return content
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            del _load_locks[cache_key]
+
+
+async def async_fetch_video_metadata(video_id):
+    try:
+        metadata_url = f"https://www.youtube.com/oembed?url=http://www.youtube.com/watch?v={video_id}&format=json"
+        with time_stage("metadata"):
+            response = await async_http_client.get(metadata_url)
+            response.raise_for_status()
+        logging.info(f"Fetched metadata for video ID {video_id}.")
+        return response.json()
+    except (httpx.HTTPError, ValueError) as e:
+        logging.error(f"Error fetching metadata: {e}")
+        raise RuntimeError("Failed to fetch video metadata.")
+
+
+async def async_fetch_transcript_from_external_service(video_id):
+    transcript_url = "http://13.61.100.173:5000/get_transcript"
+    try:
+        logging.info(f"Attempting to fetch transcript for video ID: {video_id} from external service.")
+        with time_stage("transcript_service"):
+            response = await async_http_client.post(
+                transcript_url,
+                json={"video_url": f"https://www.youtube.com/watch?v={video_id}"},
+                timeout=httpx.Timeout(TRANSCRIPT_SERVICE_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+                # Not retried: the POST starts a remote transcription job, and one slow attempt
+                # already takes most of SOURCE_TIMEOUT_SECONDS
+                max_retries=0
+            )
+            response.raise_for_status()
+        transcript_paragraph = response.json().get("transcript")
+        if not transcript_paragraph:
+            logging.warning(f"No transcript available from external service for video ID {video_id}.")
+        return transcript_paragraph or None
+    except Exception as e:
+        logging.error(f"Error fetching transcript for video ID {video_id}: {e}")
+        return None
+
+
+async def async_get_transcript_text(username, video_id, allow_partial=False):
+    cache_key = ("transcript", video_id)
+    partial = await run_blocking(get_partial_content, cache_key) if allow_partial else None
+    if partial is not None:
+        user_data_cache.add_reference(username, "transcripts", video_id, cache_key)
+        return partial
+
+    async def load_transcript():
+        report_stage("fetching_transcript")
+        transcript_text = await async_fetch_transcript_from_external_service(video_id)
+        if transcript_text:
+            return transcript_text
+        report_stage("downloading_audio")
+        audio_file_path = await run_blocking(download_audio, video_id)
+        report_stage("transcribing")
+        return await run_transcription(transcribe_audio, audio_file_path, cache_key=cache_key)
+
+    transcript_text = await async_load_content(cache_key, load_transcript)
+    user_data_cache.add_reference(username, "transcripts", video_id, cache_key)
+    return transcript_text
+
+
+async def async_get_website_content(username, website_url):
+    cache_key = ("website", normalize_url(website_url))
+
+    async def load_website():
+        report_stage("fetching")
+        try:
+            with time_stage("website_fetch"):
+                response = await async_http_client.get(website_url)
+                response.raise_for_status()
+                return await run_blocking(extract_html_text, response.text)
+        except Exception as e:
+            logging.error(f"Error fetching website content from {website_url}: {e}")
+            raise RuntimeError(f"Failed to fetch website content from {website_url}")
+
+    text = await async_load_content(cache_key, load_website)
+    user_data_cache.add_reference(username, "website_contents", website_url, cache_key)
+    return text
+
+
+async def async_get_wikipedia_content(username, wiki_title):
+    # The wikipedia client is synchronous
+    return await run_blocking(get_wikipedia_content, username, wiki_title)
+
+
+async def async_get_file_content(username, file_name, file_extension, file_path, content_hash=None, page_ranges=None,
+                                 allow_partial=False):
+    # Extraction is CPU-bound (and may itself use the PDF/Whisper pools)
+    run = run_transcription if file_extension.lower() in MEDIA_EXTENSIONS else run_blocking
+    return await run(
+        get_file_content, username, file_name, file_extension, file_path, content_hash, page_ranges, allow_partial
+    )
+
+
+async def async_generate_summary(content_text, metadata, username):
+    try:
+        # Long content goes through map-reduce summarization, which is blocking
+        prompt = await run_blocking(build_summary_prompt, content_text, metadata)
+        with time_stage("gemini_summary"):
+            return await async_generate_text(prompt)
+    except Exception as e:
+        logging.error(f"Error generating summary: {e}")
+        raise RuntimeError("Failed to generate summary.")
+
+
+async def async_merge_summary_group(summaries):
+    with time_stage("gemini_merge"):
+        return await async_generate_text(build_merge_summaries_prompt(summaries))
+
+
+async def async_merge_summaries(*summaries):
+    try:
+        summaries = await async_tree_reduce(
+            summaries, async_merge_summary_group, merge_group_tokens("merge_summaries")
+        )
+        if not summaries:
+            return "No valid content to summarize."
+        if len(summaries) == 1:
+            return summaries[0]
+        return await async_merge_summary_group(summaries)
+    except Exception as e:
+        logging.error(f"Error merging summaries: {e}")
+        raise RuntimeError("Failed to merge summaries.")
+
+
+async def async_answer_question(content_text, metadata, user_question, conversation_context, username):
+    try:
+        # Passage retrieval over long content is CPU-bound
+        prompt, fallback_prompt = await run_blocking(
+            build_answer_prompt, content_text, metadata, user_question, conversation_context
+        )
+        with time_stage("gemini_answer"):
+            answer = await async_generate_text(prompt)
+            if not answer:
+                logging.info("No meaningful answer found, retrying with a fallback prompt.")
+                answer = await async_generate_text(fallback_prompt)
+        return answer
+    except Exception as e:
+        logging.error(f"Error generating answer: {e}")
+        raise RuntimeError("Failed to generate answer.")
+
+
+async def async_answer_multi_source(prompt):
+    try:
+        with time_stage("gemini_answer"):
+            answer = await async_generate_text(prompt)
+        if not answer:
+            raise RuntimeError("Empty answer.")
+        return answer
+    except Exception as e:
+        logging.error(f"Error generating answer: {e}")
+        raise RuntimeError("Failed to generate answer.")
+
+
+async def async_merge_answer_group(answers, question):
+    with time_stage("gemini_merge"):
+        return await async_generate_text(build_merge_answers_prompt(answers, question))
+
+
+async def async_merge_answers(*answers, question):
+    try:
+        valid_answers = await async_tree_reduce(
+            answers, lambda group: async_merge_answer_group(group, question), merge_group_tokens("merge_answers")
+        )
+        if not valid_answers:
+            return "No valid information available to answer the question."
+        if len(valid_answers) == 1:
+            return valid_answers[0]
+        combined_answer = await async_merge_answer_group(valid_answers, question)
+        if not combined_answer:
+            raise RuntimeError("Empty combined answer.")
+        return combined_answer
+    except Exception as e:
+        logging.error(f"Error merging answers: {e}")
+        raise RuntimeError("Failed to merge answers.")
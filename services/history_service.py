@@ -0,0 +1,130 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import (
+    CONVERSATION_HISTORY_LIMIT,
+    HISTORY_TOKEN_BUDGET,
+    HISTORY_SUMMARY_WORD_LIMIT,
+    HISTORY_COMPACTION_WORKERS
+)
+from services.llm_service import generate_text
+from services.prompt_service import section, pack_prompt, fair_share
+from utils.tokens import estimate_tokens, truncate_to_tokens
+
+##############################################################################
+# Rolling conversation history. The last CONVERSATION_HISTORY_LIMIT turns are
+# kept verbatim; older turns are folded, in the background after each answer,
+# into a rolling summary that is updated incrementally (previous summary +
+# folded turns -> new summary). The history section rendered into prompts is
+# capped at HISTORY_TOKEN_BUDGET tokens, so prompt size stays flat however
+# long the conversation gets.
+##############################################################################
+
+compaction_executor = ThreadPoolExecutor(max_workers=HISTORY_COMPACTION_WORKERS, thread_name_prefix="history")
+
+# Users with a compaction queued or running
+_compacting = set()
+_compacting_lock = threading.Lock()
+
+
+def render_turn(entry):
+    return f"User: {entry['question']}\nAssistant: {entry['answer']}"
+
+
+def render_history(summary, turns, token_budget=HISTORY_TOKEN_BUDGET):
+    """
+    Renders the rolling summary and the most recent turns that fit in
+    token_budget. Newer turns win; the newest is truncated if it alone
+    does not fit.
+    """
+    parts = []
+    remaining = token_budget
+    if summary:
+        summary_text = truncate_to_tokens(f"Summary of the earlier conversation:\n{summary}", token_budget // 2)
+        parts.append(summary_text)
+        remaining -= estimate_tokens(summary_text)
+
+    recent = []
+    for entry in reversed(turns):
+        text = render_turn(entry)
+        tokens = estimate_tokens(text)
+        if tokens > remaining:
+            if not recent and remaining > 0:
+                recent.append(truncate_to_tokens(text, remaining))
+            break
+        recent.append(text)
+        remaining -= tokens
+
+    parts.extend(reversed(recent))
+    return "\n\n".join(parts)
+
+
+def turns_to_fold(turns, token_budget=HISTORY_TOKEN_BUDGET):
+    """
+    Returns the oldest turns that should move into the rolling summary: all but
+    the last CONVERSATION_HISTORY_LIMIT, and more while the turns kept verbatim
+    would take over half the budget (the newest turn is always kept).
+    """
+    count = max(0, len(turns) - CONVERSATION_HISTORY_LIMIT)
+    kept_tokens = sum(estimate_tokens(render_turn(entry)) for entry in turns[count:])
+    while count < len(turns) - 1 and kept_tokens > token_budget // 2:
+        kept_tokens -= estimate_tokens(render_turn(turns[count]))
+        count += 1
+    return turns[:count]
+
+
+def build_fold_prompt(summary, turns):
+    # Long answers are clipped; the summary only needs their gist
+    folded = [truncate_to_tokens(render_turn(entry), HISTORY_TOKEN_BUDGET) for entry in turns]
+    prompt, _ = pack_prompt("history_fold", [
+        section("instructions", (
+            f"You maintain a running summary of a conversation between a user and an assistant. "
+            f"Update the summary with the new turns below. Keep the user's goals, the questions asked, "
+            f"and the key facts, names and numbers from the answers. Use at most {HISTORY_SUMMARY_WORD_LIMIT} words."
+        ), required=True),
+        section("summary", summary or "(none)", heading="Current summary:", required=True),
+        section("turns", "\n\n".join(folded), heading="New turns:", priority=1,
+                fit=lambda _, max_tokens: "\n\n".join(fair_share(folded, max_tokens - 2 * len(folded)))),
+        section("answer_cue", "Updated summary:", required=True),
+    ])
+    return prompt
+
+
+def compact_history(store, username):
+    """
+    Folds the turns that no longer fit into the user's rolling summary.
+    """
+    session, summary, turns = store.conversation_session(username)
+    folded = turns_to_fold(turns)
+    if not folded:
+        return
+    new_summary = generate_text(build_fold_prompt(summary, folded))
+    if not new_summary:
+        raise RuntimeError("Empty history summary.")
+    # Skipped if the conversation was ended (and maybe restarted) meanwhile
+    store.fold_history(username, folded, new_summary, session)
+    logging.info(f"Folded {len(folded)} turns into the history summary of {username}.")
+
+
+def schedule_compaction(store, username):
+    """
+    Queues compact_history for the user unless one is already pending.
+    """
+    _, turns = store.conversation(username)
+    if not turns_to_fold(turns):
+        return
+    with _compacting_lock:
+        if username in _compacting:
+            return
+        _compacting.add(username)
+
+    def run():
+        try:
+            compact_history(store, username)
+        except Exception as e:
+            logging.error(f"Error compacting history of {username}: {e}")
+        finally:
+            with _compacting_lock:
+                _compacting.discard(username)
+
+    compaction_executor.submit(run)
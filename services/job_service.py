@@ -0,0 +1,246 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import (
+    MAX_SOURCE_WORKERS,
+    INGEST_JOB_WORKERS,
+    INGEST_SOURCE_TIMEOUT_SECONDS,
+    JOB_RETENTION_SECONDS,
+    JOB_STORE_PATH,
+    JOB_HEARTBEAT_SECONDS,
+    JOB_ORPHAN_SECONDS
+)
+from utils.concurrency import run_bounded
+from utils.progress import progress_reporter, report_stage
+
+##############################################################################
+# Background ingestion jobs.
+# job = {
+#     "job_id": "...", "username": "...", "status": "queued|running|done|failed",
+#     "created_at": 0.0, "updated_at": 0.0, "finished_at": None,
+#     "sources": [ { "type": "youtube", "source": "<label>",
+#                    "stage": "transcribing", "status": "running", "error": None }, ... ]
+# }
+# A job runs in the process that created it, which keeps the dict in memory
+# and saves a JSON copy to an SQLite table (JOB_STORE_PATH) on every change,
+# so /api/jobs/<job_id> answers from any gunicorn worker. While a process
+# has unfinished jobs it refreshes their heartbeat_at every
+# JOB_HEARTBEAT_SECONDS; an unfinished job whose heartbeat is older than
+# JOB_ORPHAN_SECONDS lost its process (worker recycled, deploy, OOM) and is
+# marked failed the next time it is read or purged.
+# Ingesting a source simply loads it, which stores the extracted text in the
+# shared content cache; later ask/summary calls for the same sources hit it.
+##############################################################################
+JOBS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        job_id TEXT PRIMARY KEY,
+        username TEXT NOT NULL,
+        data TEXT NOT NULL,
+        owner_pid INTEGER NOT NULL,
+        heartbeat_at REAL NOT NULL,
+        finished_at REAL
+    );
+    CREATE INDEX IF NOT EXISTS idx_jobs_finished_at ON jobs (finished_at);
+"""
+
+ORPHANED_JOB_ERROR = "Interrupted: the process running this job stopped."
+
+jobs_lock = threading.Lock()
+job_executor = ThreadPoolExecutor(max_workers=INGEST_JOB_WORKERS, thread_name_prefix="ingest-job")
+_local = threading.local()
+_active_jobs = set()  # ids of the unfinished jobs of this process
+_heartbeat = None
+
+
+def _connect():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(os.path.abspath(JOB_STORE_PATH)), exist_ok=True)
+        conn = sqlite3.connect(JOB_STORE_PATH, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(JOBS_SCHEMA)
+        _local.conn = conn
+    return conn
+
+
+def _save(job):
+    """
+    Writes the job to the shared table. Callers hold jobs_lock.
+    """
+    conn = _connect()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO jobs (job_id, username, data, owner_pid, heartbeat_at, finished_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (job["job_id"], job["username"], json.dumps(job), os.getpid(), time.time(), job["finished_at"])
+        )
+
+
+def _heartbeat_forever():
+    while True:
+        time.sleep(JOB_HEARTBEAT_SECONDS)
+        try:
+            with jobs_lock:
+                job_ids = list(_active_jobs)
+            if job_ids:
+                conn = _connect()
+                with conn:
+                    conn.executemany(
+                        "UPDATE jobs SET heartbeat_at = ? WHERE job_id = ?",
+                        [(time.time(), job_id) for job_id in job_ids]
+                    )
+        except Exception as e:
+            logging.error(f"Error refreshing ingestion job heartbeats: {e}")
+
+
+def _fail_orphan(conn, data):
+    """
+    Marks an orphaned job (see the module comment) failed and returns it.
+    """
+    job = json.loads(data)
+    job["status"] = "failed"
+    job["finished_at"] = job["updated_at"] = time.time()
+    for source in job["sources"]:
+        if source["status"] not in ("done", "failed"):
+            source.update(status="failed", stage="failed", error=ORPHANED_JOB_ERROR)
+    with conn:
+        conn.execute(
+            "UPDATE jobs SET data = ?, finished_at = ? WHERE job_id = ? AND finished_at IS NULL",
+            (json.dumps(job), job["finished_at"], job["job_id"])
+        )
+    logging.warning(f"Ingestion job {job['job_id']} lost its process; marked failed.")
+    return job
+
+
+def _purge_finished_jobs():
+    conn = _connect()
+    orphans = conn.execute(
+        "SELECT data FROM jobs WHERE finished_at IS NULL AND heartbeat_at < ?",
+        (time.time() - JOB_ORPHAN_SECONDS,)
+    ).fetchall()
+    for (data,) in orphans:
+        _fail_orphan(conn, data)
+    with conn:
+        conn.execute("DELETE FROM jobs WHERE finished_at < ?", (time.time() - JOB_RETENTION_SECONDS,))
+
+
+def _update_source(job, index, **changes):
+    with jobs_lock:
+        job["sources"][index].update(changes)
+        job["updated_at"] = time.time()
+        _save(job)
+
+
+def _run_job(job, sources):
+    with jobs_lock:
+        job["status"] = "running"
+        job["updated_at"] = time.time()
+        _save(job)
+
+    def make_task(index, source):
+        def reporter(stage, details):
+            # details carry e.g. transcription progress (transcribed_seconds, total_seconds)
+            _update_source(job, index, stage=stage, **details)
+
+        def task():
+            _update_source(job, index, status="running")
+            with progress_reporter(reporter):
+                report_stage("loading")
+                source["load"]()
+        return task
+
+    outcomes = run_bounded(
+        [make_task(i, source) for i, source in enumerate(sources)],
+        max_workers=MAX_SOURCE_WORKERS,
+        task_timeout=INGEST_SOURCE_TIMEOUT_SECONDS,
+    )
+
+    for index, (_, error) in enumerate(outcomes):
+        if error:
+            logging.error(f"Ingestion job {job['job_id']}: error processing {sources[index]['label']}: {error}")
+            _update_source(job, index, status="failed", stage="failed", error=str(error))
+        else:
+            _update_source(job, index, status="done", stage="done")
+
+    with jobs_lock:
+        ok = any(s["status"] == "done" for s in job["sources"])
+        job["status"] = "done" if ok else "failed"
+        job["finished_at"] = job["updated_at"] = time.time()
+        _save(job)
+    logging.info(f"Ingestion job {job['job_id']} finished with status {job['status']}.")
+
+
+def create_ingest_job(username, sources, rejected=()):
+    """
+    Starts ingesting the given sources (see routes.youtube_routes.build_sources)
+    in the background and returns the new job id. rejected lists labels of
+    sources refused up front, which are recorded as failed.
+    """
+    _purge_finished_jobs()
+    now = time.time()
+    job_id = uuid.uuid4().hex
+    job = {
+        "job_id": job_id,
+        "username": username,
+        "status": "queued",
+        "created_at": now,
+        "updated_at": now,
+        "finished_at": None,
+        "sources": [
+            {"type": source["type"], "source": source["label"], "stage": "queued", "status": "queued", "error": None}
+            for source in sources
+        ] + [
+            {"type": "file", "source": label, "stage": "failed", "status": "failed", "error": "Unsupported file type"}
+            for label in rejected
+        ],
+    }
+    global _heartbeat
+    with jobs_lock:
+        _save(job)
+        _active_jobs.add(job_id)
+        if _heartbeat is None:
+            _heartbeat = threading.Thread(target=_heartbeat_forever, name="ingest-job-heartbeat", daemon=True)
+            _heartbeat.start()
+
+    def run():
+        try:
+            _run_job(job, sources)
+        except Exception as e:
+            logging.exception(f"Ingestion job {job_id} crashed: {e}")
+            with jobs_lock:
+                job["status"] = "failed"
+                job["finished_at"] = job["updated_at"] = time.time()
+                _save(job)
+        finally:
+            with jobs_lock:
+                _active_jobs.discard(job_id)
+
+    job_executor.submit(run)
+    return job_id
+
+
+def get_job(job_id, username):
+    """
+    Returns a snapshot of the job, or None if it does not exist (or expired)
+    or belongs to another user. An orphaned job is reported failed.
+    """
+    conn = _connect()
+    row = conn.execute(
+        "SELECT username, data, heartbeat_at, finished_at FROM jobs WHERE job_id = ?", (job_id,)
+    ).fetchone()
+    if row is None or row[0] != username:
+        return None
+    _, data, heartbeat_at, finished_at = row
+    if finished_at is None and heartbeat_at < time.time() - JOB_ORPHAN_SECONDS:
+        snapshot = _fail_orphan(conn, data)
+    else:
+        snapshot = json.loads(data)
+    done = sum(1 for s in snapshot["sources"] if s["status"] in ("done", "failed"))
+    snapshot["progress"] = {"completed": done, "total": len(snapshot["sources"])}
+    return snapshot
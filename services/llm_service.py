@@ -0,0 +1,175 @@
+import asyncio
+import hashlib
+import logging
+import threading
+import google.generativeai as genai
+from config import (
+    GEMINI_MODEL_NAME,
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_MAX_BYTES,
+    LLM_CACHE_TTL_SECONDS,
+    LLM_CACHE_PERSIST,
+    LLM_CACHE_DIR,
+    LLM_CACHE_DISK_MAX_BYTES
+)
+from utils.content_cache import ContentCache
+from utils.artifact_store import ArtifactStore
+from utils.metrics import llm_tokens
+
+##############################################################################
+# Every Gemini call goes through generate_text/stream_text. Responses are
+# memoized by a hash of (model name, fully rendered prompt) in a size-bounded
+# LRU with TTL, optionally backed by an on-disk artifact store so identical
+# prompts are answered without a model call after restarts too.
+# Empty responses are never cached.
+##############################################################################
+
+llm_cache = ContentCache(LLM_CACHE_MAX_BYTES, LLM_CACHE_TTL_SECONDS, name="llm")
+llm_disk_cache = ArtifactStore(LLM_CACHE_DIR, LLM_CACHE_DISK_MAX_BYTES) if (LLM_CACHE_ENABLED and LLM_CACHE_PERSIST) else None
+
+disk_stats = {"hits": 0, "misses": 0}
+disk_stats_lock = threading.Lock()
+
+
+def prompt_key(prompt, model_name):
+    return hashlib.sha256(f"{model_name}\0{prompt}".encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def _disk_get(key):
+    if llm_disk_cache is None:
+        return None
+    try:
+        text = llm_disk_cache.get("llm", key, 1, LLM_CACHE_TTL_SECONDS)
+    except Exception as e:
+        logging.error(f"Error reading LLM disk cache: {e}")
+        text = None
+    with disk_stats_lock:
+        disk_stats["hits" if text is not None else "misses"] += 1
+    return text
+
+
+def _disk_put(key, text):
+    if llm_disk_cache is None:
+        return
+    try:
+        llm_disk_cache.put("llm", key, 1, text)
+    except Exception as e:
+        logging.error(f"Error writing LLM disk cache: {e}")
+
+
+def _record_usage(response):
+    """
+    Counts the prompt/completion tokens Gemini reports for a response, if any.
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    prompt_count = getattr(usage, "prompt_token_count", 0) or 0
+    completion_count = getattr(usage, "candidates_token_count", 0) or 0
+    llm_tokens.labels("prompt").inc(prompt_count)
+    llm_tokens.labels("completion").inc(completion_count)
+    logging.info(f"Gemini usage: {prompt_count} prompt tokens, {completion_count} completion tokens.")
+
+
+def _call_model(prompt, model_name):
+    model = genai.GenerativeModel(model_name)
+    response = model.generate_content(prompt)
+    _record_usage(response)
+    return response.text.strip()
+
+
+def generate_text(prompt, model_name=GEMINI_MODEL_NAME):
+    """
+    Sends the prompt to Gemini and returns the stripped response text,
+    serving identical (model, prompt) pairs from the response cache.
+    """
+    if not LLM_CACHE_ENABLED:
+        return _call_model(prompt, model_name)
+
+    key = prompt_key(prompt, model_name)
+
+    def compute():
+        text = _disk_get(key)
+        if text is not None:
+            return text
+        text = _call_model(prompt, model_name)
+        if text:
+            _disk_put(key, text)
+        return text
+
+    text = llm_cache.get_or_compute(key, compute)
+    if not text:
+        llm_cache.discard(key)
+    return text
+
+
+async def async_generate_text(prompt, model_name=GEMINI_MODEL_NAME):
+    """
+    asyncio variant of generate_text for the ASGI endpoints; shares its
+    response cache. The disk cache (SQLite) is only consulted via a thread.
+    """
+    key = prompt_key(prompt, model_name) if LLM_CACHE_ENABLED else None
+    if key is not None:
+        cached = llm_cache.get(key)
+        if cached is None and llm_disk_cache is not None:
+            cached = await asyncio.to_thread(_disk_get, key)
+            if cached is not None:
+                llm_cache.put(key, cached)
+        if cached is not None:
+            return cached
+
+    model = genai.GenerativeModel(model_name)
+    response = await model.generate_content_async(prompt)
+    _record_usage(response)
+    text = response.text.strip()
+
+    if key is not None and text:
+        llm_cache.put(key, text)
+        if llm_disk_cache is not None:
+            await asyncio.to_thread(_disk_put, key, text)
+    return text
+
+
+def stream_text(prompt, model_name=GEMINI_MODEL_NAME):
+    """
+    Sends the prompt to Gemini with streaming enabled and yields text pieces as
+    they arrive. A cached response is yielded in one piece.
+    """
+    key = prompt_key(prompt, model_name) if LLM_CACHE_ENABLED else None
+    if key is not None:
+        cached = llm_cache.get(key)
+        if cached is None:
+            cached = _disk_get(key)
+            if cached is not None:
+                llm_cache.put(key, cached)
+        if cached is not None:
+            yield cached
+            return
+
+    model = genai.GenerativeModel(model_name)
+    response = model.generate_content(prompt, stream=True)
+    pieces = []
+    for chunk in response:
+        try:
+            text = chunk.text
+        except ValueError:
+            # Chunks without text parts (e.g. safety metadata only)
+            logging.info("Skipping streamed chunk without text.")
+            continue
+        if text:
+            pieces.append(text)
+            yield text
+
+    _record_usage(response)
+    full_text = "".join(pieces).strip()
+    if key is not None and full_text:
+        llm_cache.put(key, full_text)
+        _disk_put(key, full_text)
+
+
+def get_llm_cache_stats():
+    stats = llm_cache.stats()
+    with disk_stats_lock:
+        stats["disk_hits"] = disk_stats["hits"]
+        stats["disk_misses"] = disk_stats["misses"]
+    return stats
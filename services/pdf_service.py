@@ -1,25 +1,106 @@
 import PyPDF2
 import docx
 import csv
-import pandas as pd
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import openpyxl
+import xlrd
 from bs4 import BeautifulSoup
 import logging
-import google.generativeai as genai
-from config import SUMMARY_WORD_LIMIT
+from config import (
+    SUMMARY_WORD_LIMIT,
+    PDF_EXTRACTION_WORKERS,
+    PDF_PAGES_PER_TASK,
+    PDF_PARALLEL_MIN_PAGES,
+    SPREADSHEET_ROWS_PER_CHUNK,
+    SPREADSHEET_MAX_ROWS,
+    SPREADSHEET_MAX_BYTES,
+    SPREADSHEET_TRACE_MEMORY
+)
+from services.pdf_worker import extract_pages
+from services.summarization_service import condense_content
+from services.prompt_service import section, pack_prompt
+from services.llm_service import generate_text
+from utils.memory import measure_peak_memory
+from utils.metrics import time_stage
 
 # Process PDF Files
-def process_pdf_file(pdf_file_path):
+pdf_executor = None
+pdf_executor_lock = threading.Lock()
+
+
+def get_pdf_executor():
+    global pdf_executor
+    with pdf_executor_lock:
+        if pdf_executor is None:
+            pdf_executor = ProcessPoolExecutor(
+                max_workers=PDF_EXTRACTION_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return pdf_executor
+
+
+def parse_page_ranges(spec, page_count):
+    """
+    Parses a 1-based page range spec such as "1-5, 8, 10-" into a list of
+    0-based [start, end) ranges, clamped to the document length.
+    """
+    ranges = []
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            if '-' in part:
+                first, last = part.split('-', 1)
+                start = int(first) if first.strip() else 1
+                end = int(last) if last.strip() else page_count
+            else:
+                start = end = int(part)
+        except ValueError:
+            raise ValueError(f"Invalid page range: '{part}'")
+        if start < 1 or end < start:
+            raise ValueError(f"Invalid page range: '{part}'")
+        if start <= page_count:
+            ranges.append((start - 1, min(end, page_count)))
+    if not ranges:
+        raise ValueError(f"Page range '{spec}' selects no pages (document has {page_count} pages).")
+    return ranges
+
+
+def process_pdf_file(pdf_file_path, page_ranges=None):
     """
     Processes the given PDF file and extracts the text.
+    page_ranges optionally limits extraction to e.g. "1-5, 8".
+    Large documents are split into page batches extracted in parallel worker
+    processes; page texts are joined once at the end.
     """
     try:
         with open(pdf_file_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            text = ''
-            for page in reader.pages:
-                text += page.extract_text()
-            logging.info(f"Successfully extracted text from {pdf_file_path}")
-            return text
+            page_count = len(PyPDF2.PdfReader(file).pages)
+
+        ranges = parse_page_ranges(page_ranges, page_count) if page_ranges else [(0, page_count)]
+        batches = [
+            (start, min(start + PDF_PAGES_PER_TASK, end))
+            for range_start, end in ranges
+            for start in range(range_start, end, PDF_PAGES_PER_TASK)
+        ]
+        selected_pages = sum(end - start for start, end in ranges)
+
+        if selected_pages < PDF_PARALLEL_MIN_PAGES or PDF_EXTRACTION_WORKERS <= 1:
+            page_texts = [extract_pages(pdf_file_path, start, end) for start, end in batches]
+        else:
+            executor = get_pdf_executor()
+            futures = [executor.submit(extract_pages, pdf_file_path, start, end) for start, end in batches]
+            page_texts = [future.result() for future in futures]
+
+        text = "\n".join(page for batch in page_texts for page in batch)
+        logging.info(f"Successfully extracted text from {selected_pages} of {page_count} pages of {pdf_file_path}")
+        return text
+    except ValueError as e:
+        logging.error(f"Error processing PDF file {pdf_file_path}: {e}")
+        raise RuntimeError(str(e))
     except Exception as e:
         logging.error(f"Error processing PDF file {pdf_file_path}: {e}")
         raise RuntimeError(f"Failed to process PDF file: {e}")
@@ -52,29 +133,115 @@ def process_txt_file(txt_file_path):
         logging.error(f"Error processing TXT file {txt_file_path}: {e}")
         raise RuntimeError(f"Failed to process TXT file: {e}")
 
+# Spreadsheet/CSV rendering shared by the streaming readers below
+def _format_cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def render_table_rows(sheets, source_path):
+    """
+    Renders rows from one or more sheets as compact text without holding
+    more than the output in memory.
+
+    sheets yields (sheet_name, rows) pairs; sheet_name may be None (CSV).
+    Every SPREADSHEET_ROWS_PER_CHUNK rows a "[Rows a-b]" marker is emitted so
+    chunks can be located later; empty rows and trailing empty cells are
+    dropped. Output stops at SPREADSHEET_MAX_ROWS rows or
+    SPREADSHEET_MAX_BYTES bytes, with a note saying so.
+    """
+    parts = []
+    total_rows = 0
+    total_bytes = 0
+    truncated = False
+
+    with measure_peak_memory(SPREADSHEET_TRACE_MEMORY) as memory:
+        for sheet_name, rows in sheets:
+            if truncated:
+                break
+            if sheet_name is not None:
+                parts.append(f"[Sheet: {sheet_name}]")
+            sheet_rows = 0
+            for row in rows:
+                cells = [_format_cell(v) for v in row]
+                while cells and not cells[-1]:
+                    cells.pop()
+                if not cells:
+                    continue
+                line = ", ".join(cells)
+                line_bytes = len(line.encode("utf-8", "surrogatepass")) + 1
+                if total_rows >= SPREADSHEET_MAX_ROWS or total_bytes + line_bytes > SPREADSHEET_MAX_BYTES:
+                    truncated = True
+                    break
+                if sheet_rows % SPREADSHEET_ROWS_PER_CHUNK == 0:
+                    parts.append(f"[Rows {sheet_rows + 1}-{sheet_rows + SPREADSHEET_ROWS_PER_CHUNK}]")
+                parts.append(line)
+                total_rows += 1
+                sheet_rows += 1
+                total_bytes += line_bytes
+
+        if truncated:
+            parts.append(f"[Truncated after {total_rows} rows / {total_bytes} bytes]")
+        text = "\n".join(parts)
+
+    logging.info(
+        f"Extracted {total_rows} rows ({total_bytes} bytes{', truncated' if truncated else ''}) from {source_path}; "
+        f"peak memory: {memory}"
+    )
+    return text
+
+
 # Process CSV Files
 def process_csv_file(csv_file_path):
     """
-    Processes the given CSV file and extracts the text as a comma-separated string.
+    Processes the given CSV file and extracts the text as comma-separated rows,
+    reading it row by row.
     """
     try:
         with open(csv_file_path, newline='', encoding='utf-8') as csvfile:
-            reader = csv.reader(csvfile)
-            text = "\n".join([", ".join(row) for row in reader])
+            text = render_table_rows([(None, csv.reader(csvfile))], csv_file_path)
         logging.info(f"Successfully extracted text from {csv_file_path}")
         return text
     except Exception as e:
         logging.error(f"Error processing CSV file {csv_file_path}: {e}")
         raise RuntimeError(f"Failed to process CSV file: {e}")
 
+
+def _xlsx_sheets(workbook):
+    for worksheet in workbook.worksheets:
+        yield worksheet.title, worksheet.iter_rows(values_only=True)
+
+
+def _xls_sheets(workbook):
+    for index in range(workbook.nsheets):
+        sheet = workbook.sheet_by_index(index)
+        yield sheet.name, (sheet.row_values(r) for r in range(sheet.nrows))
+        workbook.unload_sheet(index)
+
+
 # Process XLS/XLSX Files
 def process_xls_xlsx_file(xls_xlsx_file_path):
     """
-    Processes the given XLS/XLSX file and extracts the data as a string.
+    Processes every sheet of the given XLS/XLSX file and extracts the data as
+    a string. XLSX is streamed in read-only mode; XLS sheets are loaded one
+    at a time.
     """
     try:
-        df = pd.read_excel(xls_xlsx_file_path)
-        text = df.to_string()
+        if xls_xlsx_file_path.lower().endswith('.xls'):
+            workbook = xlrd.open_workbook(xls_xlsx_file_path, on_demand=True)
+            try:
+                text = render_table_rows(_xls_sheets(workbook), xls_xlsx_file_path)
+            finally:
+                workbook.release_resources()
+        else:
+            workbook = openpyxl.load_workbook(xls_xlsx_file_path, read_only=True, data_only=True)
+            try:
+                text = render_table_rows(_xlsx_sheets(workbook), xls_xlsx_file_path)
+            finally:
+                workbook.close()
         logging.info(f"Successfully extracted text from {xls_xlsx_file_path}")
         return text
     except Exception as e:
@@ -102,25 +269,24 @@ def summarize_content(content):
     Summarizes the provided content using Google Gemini API.
     """
     try:
-        model = genai.GenerativeModel("gemini-pro")
-        prompt = (
-            f"Summarize the following content in approximately {SUMMARY_WORD_LIMIT} words:\n\n"
-            f"{content[:10000]}"  # Limit input if needed
-        )
-        response = model.generate_content(prompt)
-        summary = response.text.strip()
-        return summary
+        prompt, _ = pack_prompt("content_summary", [
+            section("instructions", f"Summarize the following content in approximately {SUMMARY_WORD_LIMIT} words:", required=True),
+            section("content", content, priority=1, fit=condense_content),  # Map-reduce long content
+        ])
+        return generate_text(prompt)
     except Exception as e:
         logging.error(f"Error summarizing content: {e}")
         raise RuntimeError("Failed to generate content summary.")
 
 # Dispatch function to handle different file types
-def process_file(file_path, file_extension):
+@time_stage("extraction")
+def process_file(file_path, file_extension, page_ranges=None):
     """
     Processes the given file based on its extension and extracts the text.
+    page_ranges (e.g. "1-5, 8") only applies to PDFs.
     """
     if file_extension == 'pdf':
-        return process_pdf_file(file_path)
+        return process_pdf_file(file_path, page_ranges)
     elif file_extension in ['doc', 'docx']:
         return process_doc_file(file_path)
     elif file_extension == 'txt':
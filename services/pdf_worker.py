@@ -0,0 +1,14 @@
+##############################################################################
+# Code that runs inside the PDF extraction worker processes.
+# Only imports PyPDF2 so spawning a worker stays cheap.
+##############################################################################
+import PyPDF2
+
+
+def extract_pages(pdf_file_path, start, end):
+    """
+    Extracts the text of pages [start, end) (0-based) and returns it as a list of strings.
+    """
+    with open(pdf_file_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        return [(reader.pages[i].extract_text() or "") for i in range(start, end)]
@@ -0,0 +1,114 @@
+import logging
+from config import PROMPT_TOKEN_BUDGETS, PROMPT_MIN_SECTION_TOKENS
+from utils.metrics import prompt_tokens, prompt_sections_reduced
+from utils.tokens import estimate_tokens, truncate_to_tokens
+from utils.tracing import span
+
+##############################################################################
+# Token-budgeted prompt assembly. A prompt is a list of sections in display
+# order; each has a priority (lower packs first) and may be required
+# (instructions, the question), which is always kept whole. Optional sections
+# are packed by priority into what is left of the call type's budget
+# (PROMPT_TOKEN_BUDGETS); a section that does not fit is reduced with its
+# fit(text, max_tokens) function - map-reduce summarization, passage
+# retrieval, plain truncation - or dropped when less than
+# PROMPT_MIN_SECTION_TOKENS remain. Token counts are local estimates
+# (utils.tokens), reported per call to the log, metrics and request trace.
+##############################################################################
+
+
+def section(name, text, heading=None, priority=0, required=False, fit=None):
+    """
+    Describes one prompt section. heading is rendered on the line above the
+    text and is never reduced. fit defaults to truncation.
+    """
+    return {
+        "name": name,
+        "text": text or "",
+        "heading": heading,
+        "priority": priority,
+        "required": required,
+        "fit": fit or truncate_to_tokens,
+    }
+
+
+def _render(heading, text):
+    return f"{heading}\n{text}" if heading else text
+
+
+def fair_share(texts, max_tokens):
+    """
+    Truncates texts so together they fit in max_tokens, giving short texts
+    all they need and splitting the rest evenly among the long ones.
+    """
+    sizes = [estimate_tokens(t) for t in texts]
+    remaining, pending = max_tokens, sorted(range(len(texts)), key=lambda i: sizes[i])
+    limits = {}
+    while pending:
+        share = remaining // len(pending)
+        i = pending[0]
+        if sizes[i] > share:
+            for j in pending:
+                limits[j] = share
+            break
+        limits[i] = sizes[i]
+        remaining -= sizes[i]
+        pending.pop(0)
+    return [t if limits[i] >= sizes[i] else truncate_to_tokens(t, limits[i]) for i, t in enumerate(texts)]
+
+
+def pack_prompt(call_type, sections, budget=None):
+    """
+    Renders the sections within the call type's token budget.
+    Returns (prompt, usage), where usage has the budget, the estimated total
+    and per-section tokens with "reduced"/"dropped" flags.
+    """
+    budget = budget or PROMPT_TOKEN_BUDGETS[call_type]
+    remaining = budget
+    rendered = {}
+    usage = {"call_type": call_type, "budget": budget, "sections": {}}
+
+    for s in sections:
+        if s["required"]:
+            rendered[s["name"]] = _render(s["heading"], s["text"])
+            tokens = estimate_tokens(rendered[s["name"]])
+            usage["sections"][s["name"]] = {"tokens": tokens}
+            remaining -= tokens
+
+    for s in sorted((s for s in sections if not s["required"] and s["text"]), key=lambda s: s["priority"]):
+        heading_tokens = estimate_tokens(s["heading"] or "")
+        text_tokens = estimate_tokens(s["text"])
+        entry = {}
+        if heading_tokens + text_tokens <= remaining:
+            text = s["text"]
+        elif remaining - heading_tokens >= PROMPT_MIN_SECTION_TOKENS:
+            text = s["fit"](s["text"], remaining - heading_tokens)
+            entry["reduced"] = True
+            entry["original_tokens"] = text_tokens
+        else:
+            usage["sections"][s["name"]] = {"tokens": 0, "dropped": True, "original_tokens": text_tokens}
+            continue
+        rendered[s["name"]] = _render(s["heading"], text)
+        entry["tokens"] = estimate_tokens(rendered[s["name"]])
+        usage["sections"][s["name"]] = entry
+        remaining -= entry["tokens"]
+
+    prompt = "\n\n".join(rendered[s["name"]] for s in sections if s["name"] in rendered)
+    usage["total_tokens"] = sum(entry["tokens"] for entry in usage["sections"].values())
+    report_usage(usage)
+    return prompt, usage
+
+
+def report_usage(usage):
+    call_type = usage["call_type"]
+    reduced = [name for name, entry in usage["sections"].items() if entry.get("reduced") or entry.get("dropped")]
+    logging.info(
+        f"Prompt {call_type}: ~{usage['total_tokens']}/{usage['budget']} tokens"
+        + (f", reduced: {', '.join(reduced)}" if reduced else "")
+    )
+    prompt_tokens.labels(call_type).observe(usage["total_tokens"])
+    for name in reduced:
+        prompt_sections_reduced.labels(call_type, name).inc()
+    # Zero-length span so the usage shows up in request traces
+    with span("prompt", call_type=call_type, tokens=usage["total_tokens"], budget=usage["budget"], reduced=reduced):
+        pass
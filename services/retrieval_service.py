@@ -0,0 +1,231 @@
+import re
+import math
+import hashlib
+import logging
+from collections import Counter
+from config import (
+    RETRIEVAL_CHUNK_SIZE,
+    RETRIEVAL_CHUNK_OVERLAP,
+    RETRIEVAL_TOP_K,
+    RETRIEVAL_INDEX_CACHE_MAX_BYTES,
+    MULTI_SOURCE_TOP_K
+)
+from utils.content_cache import ContentCache
+from utils.tokens import estimate_tokens, truncate_to_tokens
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "do", "does", "for", "from",
+    "how", "i", "in", "is", "it", "of", "on", "or", "that", "the", "this", "to", "was",
+    "what", "when", "where", "which", "who", "why", "with", "you", "about", "can", "me",
+}
+
+
+def tokenize(text):
+    """
+    Lowercases the text and splits it into word tokens, dropping stopwords.
+    """
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def chunk_text(text, chunk_size=RETRIEVAL_CHUNK_SIZE, overlap=RETRIEVAL_CHUNK_OVERLAP):
+    """
+    Splits text into overlapping chunks of roughly chunk_size characters,
+    preferring to break on whitespace.
+    Returns a list of (start, end) character offsets into text.
+    """
+    spans = []
+    length = len(text)
+    start = 0
+    while start < length:
+        end = min(start + chunk_size, length)
+        if end < length:
+            # Back up to the last whitespace so words are not cut in half
+            space = text.rfind(" ", start + chunk_size // 2, end)
+            if space != -1:
+                end = space
+        spans.append((start, end))
+        if end >= length:
+            break
+        start = max(end - overlap, start + 1)
+    return spans
+
+
+class BM25Index:
+    """
+    Okapi BM25 index over the chunks of a single document. Several indexes
+    can be searched as one corpus with search_across.
+    """
+
+    def __init__(self, text, k1=1.5, b=0.75):
+        self.spans = chunk_text(text)
+        self.k1 = k1
+        self.b = b
+        self.term_freqs = []
+        doc_freq = Counter()
+        for start, end in self.spans:
+            tf = Counter(tokenize(text[start:end]))
+            self.term_freqs.append(tf)
+            doc_freq.update(tf.keys())
+        self.doc_freq = doc_freq
+        self.doc_lengths = [sum(tf.values()) for tf in self.term_freqs]
+        self.avg_length = (sum(self.doc_lengths) / len(self.doc_lengths)) if self.doc_lengths else 0.0
+        self.idf = idf_table(doc_freq, len(self.spans))
+        self.size_estimate = len(text) * 2
+
+    def score(self, query_terms, chunk_index, idf=None, avg_length=None):
+        """
+        BM25 score of one chunk. idf and avg_length default to this document's;
+        search_across passes corpus-wide ones.
+        """
+        idf = self.idf if idf is None else idf
+        avg_length = self.avg_length if avg_length is None else avg_length
+        tf = self.term_freqs[chunk_index]
+        length_norm = 1 - self.b + self.b * (self.doc_lengths[chunk_index] / avg_length if avg_length else 0)
+        score = 0.0
+        for term in query_terms:
+            freq = tf.get(term)
+            if freq:
+                score += idf[term] * freq * (self.k1 + 1) / (freq + self.k1 * length_norm)
+        return score
+
+    def search(self, query, top_k=RETRIEVAL_TOP_K):
+        """
+        Returns up to top_k (chunk_index, score) pairs with a positive score, best first.
+        """
+        query_terms = set(tokenize(query))
+        scored = [(i, self.score(query_terms, i)) for i in range(len(self.spans))]
+        scored = [item for item in scored if item[1] > 0]
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:top_k]
+
+
+def idf_table(doc_freq, chunk_count):
+    return {
+        term: math.log(1 + (chunk_count - df + 0.5) / (df + 0.5))
+        for term, df in doc_freq.items()
+    }
+
+
+def search_across(indexes, query, top_k=MULTI_SOURCE_TOP_K):
+    """
+    Searches several indexes as one corpus, with IDF and average chunk length
+    computed over all of them so scores are comparable across documents.
+    Returns up to top_k (document_index, chunk_index, score) with a positive
+    score, best first.
+    """
+    query_terms = set(tokenize(query))
+    doc_freq = Counter()
+    for index in indexes:
+        doc_freq.update({term: index.doc_freq[term] for term in query_terms if term in index.doc_freq})
+    lengths = [length for index in indexes for length in index.doc_lengths]
+    idf = idf_table(doc_freq, len(lengths))
+    avg_length = sum(lengths) / len(lengths) if lengths else 0.0
+
+    scored = [
+        (doc, i, index.score(query_terms, i, idf, avg_length))
+        for doc, index in enumerate(indexes)
+        for i in range(len(index.spans))
+    ]
+    scored = [item for item in scored if item[2] > 0]
+    scored.sort(key=lambda item: item[2], reverse=True)
+    return scored[:top_k]
+
+
+# Indexes are built once per distinct content and shared by all users
+index_cache = ContentCache(
+    RETRIEVAL_INDEX_CACHE_MAX_BYTES,
+    name="retrieval_index",
+    sizeof=lambda index: index.size_estimate
+)
+
+
+def content_hash(content_text):
+    return hashlib.sha256(content_text.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def get_index(content_text):
+    """
+    Returns the (cached) BM25 index for the given content.
+    """
+    return index_cache.get_or_compute(content_hash(content_text), lambda: BM25Index(content_text))
+
+
+def select_relevant_content(content_text, question, max_tokens):
+    """
+    Returns the parts of content_text most relevant to the question, packed
+    into at most max_tokens tokens. Short content is returned unchanged.
+    Selected passages are kept in document order; gaps are marked with "...".
+    """
+    if estimate_tokens(content_text) <= max_tokens:
+        return content_text
+
+    index = get_index(content_text)
+    ranked = index.search(question)
+    if not ranked:
+        logging.info("No passage matched the question; using the start of the content.")
+        return truncate_to_tokens(content_text, max_tokens)
+
+    selected, used = [], 0
+    for chunk_index, _ in ranked:
+        start, end = index.spans[chunk_index]
+        # Counted without overlap and "..." separators, so stay a little under the budget
+        tokens = estimate_tokens(content_text[start:end]) + 2
+        if used + tokens > max_tokens:
+            continue
+        selected.append((start, end))
+        used += tokens
+
+    if not selected:
+        return truncate_to_tokens(content_text, max_tokens)
+
+    logging.info(f"Selected {len(selected)} of {len(index.spans)} passages for the question.")
+    return join_spans(content_text, selected)
+
+
+def join_spans(content_text, spans):
+    """
+    Joins the given (start, end) spans of content_text in document order,
+    merging overlapping ones and marking gaps with "...".
+    """
+    merged = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return "\n...\n".join(content_text[start:end] for start, end in merged)
+
+
+def select_passages_across(contents, question, max_tokens, top_k=MULTI_SOURCE_TOP_K):
+    """
+    Picks the passages most relevant to the question across several
+    documents, ranked as one corpus. Returns one excerpt per document ("" for
+    documents with nothing relevant), all documents whole if they fit in
+    max_tokens together, or None when the top_k passages do not fit in
+    max_tokens or nothing matches.
+    """
+    if sum(estimate_tokens(text) + 2 for text in contents) <= max_tokens:
+        return list(contents)
+
+    indexes = [get_index(text) for text in contents]
+    ranked = search_across(indexes, question, top_k)
+    if not ranked:
+        logging.info("No passage in any source matched the question.")
+        return None
+
+    selected = [[] for _ in contents]
+    used = 0
+    for doc, chunk_index, _ in ranked:
+        start, end = indexes[doc].spans[chunk_index]
+        used += estimate_tokens(contents[doc][start:end]) + 2
+        selected[doc].append((start, end))
+    if used > max_tokens:
+        logging.info(f"Top {len(ranked)} passages take ~{used} tokens, over the {max_tokens} available.")
+        return None
+
+    logging.info(
+        f"Selected {len(ranked)} passages from {sum(1 for spans in selected if spans)} of {len(contents)} sources."
+    )
+    return [join_spans(text, spans) if spans else "" for text, spans in zip(contents, selected)]
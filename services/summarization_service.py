@@ -0,0 +1,232 @@
+import re
+import asyncio
+import hashlib
+import logging
+from config import (
+    PROMPT_TOKEN_BUDGETS,
+    SUMMARY_CHUNK_SIZE,
+    CHUNK_SUMMARY_WORD_LIMIT,
+    SUMMARY_MAP_WORKERS,
+    CHUNK_SUMMARY_CACHE_MAX_BYTES,
+    MERGE_FANOUT,
+    MERGE_WORKERS
+)
+from services.llm_service import generate_text
+from services.prompt_service import section, pack_prompt
+from utils.content_cache import ContentCache
+from utils.concurrency import run_bounded
+from utils.metrics import time_stage
+from utils.tokens import estimate_tokens, truncate_to_tokens
+
+##############################################################################
+# Map-reduce summarization for content longer than a prompt's token budget.
+#
+# 1) The content is cut into chunks at content-defined boundaries: a chunk
+#    ends at a sentence whose hash hits a fixed pattern (within a min/max
+#    size window). A small edit therefore only changes the chunks around it,
+#    and the rest keep the same bytes and hash.
+# 2) Each chunk is summarized in parallel; summaries are cached by chunk hash
+#    and shared across documents and users.
+# 3) Partial summaries are grouped and re-summarized level by level until
+#    they fit in the requested number of tokens.
+#
+# Per-source results (summaries, answers) are merged the same way: see
+# tree_reduce.
+##############################################################################
+
+SENTENCE_PATTERN = re.compile(r"[^.!?\n]+(?:[.!?]+|\n+|$)\s*")
+
+# Roughly one boundary every 8 sentences once a chunk reaches its minimum size
+BOUNDARY_DIVISOR = 8
+
+chunk_summary_cache = ContentCache(CHUNK_SUMMARY_CACHE_MAX_BYTES, name="chunk_summary")
+
+
+def split_sentences(text):
+    return [m.group(0) for m in SENTENCE_PATTERN.finditer(text) if m.group(0)]
+
+
+def _is_boundary(sentence):
+    digest = hashlib.blake2b(sentence.strip().encode("utf-8", "surrogatepass"), digest_size=4).digest()
+    return int.from_bytes(digest, "big") % BOUNDARY_DIVISOR == 0
+
+
+def content_defined_chunks(text, target_size=SUMMARY_CHUNK_SIZE):
+    """
+    Splits text into chunks of roughly target_size characters whose boundaries
+    depend only on nearby content, so unchanged regions produce identical chunks.
+    """
+    min_size = target_size // 2
+    max_size = target_size * 3 // 2
+    chunks, current, current_len = [], [], 0
+    for sentence in split_sentences(text):
+        # Very long "sentences" (e.g. unpunctuated transcripts) are cut hard
+        while len(sentence) > max_size:
+            if current:
+                chunks.append("".join(current))
+                current, current_len = [], 0
+            chunks.append(sentence[:max_size])
+            sentence = sentence[max_size:]
+        current.append(sentence)
+        current_len += len(sentence)
+        if current_len >= max_size or (current_len >= min_size and _is_boundary(sentence)):
+            chunks.append("".join(current))
+            current, current_len = [], 0
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+
+def summarize_chunk(chunk, word_limit=CHUNK_SUMMARY_WORD_LIMIT):
+    """
+    Summarizes one chunk of a longer document, reusing cached summaries of identical chunks.
+    """
+    digest = hashlib.sha256(chunk.encode("utf-8", "surrogatepass")).hexdigest()
+
+    def compute():
+        prompt, _ = pack_prompt("chunk_summary", [
+            section("instructions", (
+                f"You are an expert summarizer. The following text is one part of a longer document. "
+                f"Summarize it in about {word_limit} words, keeping names, numbers and key facts."
+            ), required=True),
+            section("text", chunk, heading="Text:", priority=1),
+            section("answer_cue", "Summary:", required=True),
+        ])
+        with time_stage("gemini_chunk_summary"):
+            return generate_text(prompt)
+
+    return chunk_summary_cache.get_or_compute(("chunk", digest, word_limit), compute)
+
+
+def _summarize_all(chunks):
+    """
+    Summarizes chunks in parallel and returns the summaries in order.
+    Failed chunks are skipped; if every chunk fails, an error is raised.
+    """
+    outcomes = run_bounded(
+        [lambda chunk=chunk: summarize_chunk(chunk) for chunk in chunks],
+        max_workers=SUMMARY_MAP_WORKERS,
+    )
+    summaries = []
+    for i, (summary, error) in enumerate(outcomes):
+        if error:
+            logging.error(f"Error summarizing chunk {i + 1}/{len(chunks)}: {error}")
+        elif summary:
+            summaries.append(summary)
+    if not summaries:
+        raise RuntimeError("Failed to summarize any part of the content.")
+    return summaries
+
+
+def _group(summaries, max_tokens):
+    """
+    Packs consecutive summaries into groups of at most max_tokens tokens.
+    """
+    groups, current, current_len = [], [], 0
+    for summary in summaries:
+        tokens = estimate_tokens(summary)
+        if current and current_len + tokens > max_tokens:
+            groups.append(current)
+            current, current_len = [], 0
+        current.append(summary)
+        current_len += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+
+def condense_content(content_text, max_tokens, max_levels=4):
+    """
+    Returns content_text unchanged if it fits in max_tokens; otherwise returns
+    section summaries of the whole content (map-reduce) that fit in max_tokens.
+    """
+    content_tokens = estimate_tokens(content_text)
+    if content_tokens <= max_tokens:
+        return content_text
+
+    chunks = content_defined_chunks(content_text)
+    logging.info(f"Summarizing ~{content_tokens} tokens as {len(chunks)} chunks.")
+    summaries = _summarize_all(chunks)
+
+    # Each group must fit in one chunk_summary prompt with room to spare
+    group_tokens = min(max_tokens, PROMPT_TOKEN_BUDGETS["chunk_summary"] * 3 // 4)
+    level = 1
+    while sum(estimate_tokens(s) for s in summaries) > max_tokens and level <= max_levels:
+        groups = _group(summaries, group_tokens)
+        logging.info(f"Reduce level {level}: {len(summaries)} summaries in {len(groups)} groups.")
+        summaries = _summarize_all(["\n\n".join(group) for group in groups])
+        level += 1
+
+    combined = "\n\n".join(f"Section {i + 1}:\n{s}" for i, s in enumerate(summaries))
+    return truncate_to_tokens(combined, max_tokens)
+
+
+def merge_groups(items, max_tokens, fanout=MERGE_FANOUT):
+    """
+    Packs consecutive items into groups of at most fanout items and, unless a
+    group would hold a single item, at most max_tokens tokens.
+    """
+    groups, current, current_len = [], [], 0
+    for item in items:
+        tokens = estimate_tokens(item)
+        if len(current) == fanout or (len(current) > 1 and current_len + tokens > max_tokens):
+            groups.append(current)
+            current, current_len = [], 0
+        current.append(item)
+        current_len += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _fits_one_merge(items, max_tokens, fanout):
+    return len(items) <= fanout and sum(estimate_tokens(item) for item in items) <= max_tokens
+
+
+def tree_reduce(items, merge, max_tokens, fanout=MERGE_FANOUT):
+    """
+    Merges groups of items in parallel, level by level, until the rest fit in
+    one merge call of at most fanout items and max_tokens tokens, and returns
+    them in order; the caller makes that last call (possibly streamed).
+    merge(group) returns the merged text of a group of items.
+    """
+    items = [item for item in items if item and item.strip()]
+    level = 1
+    while len(items) > 1 and not _fits_one_merge(items, max_tokens, fanout):
+        groups = merge_groups(items, max_tokens, fanout)
+        logging.info(f"Merge level {level}: {len(items)} results in {len(groups)} groups.")
+        outcomes = run_bounded(
+            [lambda group=group: group[0] if len(group) == 1 else merge(group) for group in groups],
+            max_workers=MERGE_WORKERS,
+        )
+        items = []
+        for result, error in outcomes:
+            if error:
+                raise error
+            if result and result.strip():
+                items.append(result)
+        level += 1
+    return items
+
+
+async def async_tree_reduce(items, merge, max_tokens, fanout=MERGE_FANOUT):
+    """
+    asyncio version of tree_reduce; merge(group) is a coroutine function.
+    """
+    items = [item for item in items if item and item.strip()]
+    semaphore = asyncio.Semaphore(MERGE_WORKERS)
+
+    async def merge_group(group):
+        if len(group) == 1:
+            return group[0]
+        async with semaphore:
+            return await merge(group)
+
+    level = 1
+    while len(items) > 1 and not _fits_one_merge(items, max_tokens, fanout):
+        groups = merge_groups(items, max_tokens, fanout)
+        logging.info(f"Merge level {level}: {len(items)} results in {len(groups)} groups.")
+        merged = await asyncio.gather(*(merge_group(group) for group in groups))
+        items = [result for result in merged if result and result.strip()]
+        level += 1
+    return items
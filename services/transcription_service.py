@@ -0,0 +1,206 @@
+import os
+import heapq
+import logging
+import tempfile
+import itertools
+import threading
+import multiprocessing
+from collections import Counter
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from config import (
+    ASR_BACKEND,
+    ASR_MODEL_SIZE,
+    ASR_COMPUTE_TYPE,
+    ASR_BEAM_SIZE,
+    TRANSCRIPTION_WORKERS,
+    TRANSCRIPTION_QUEUE_SIZE,
+    TRANSCRIPTION_WINDOW_SECONDS,
+    TRANSCRIPTION_OVERLAP_SECONDS,
+    TRANSCRIPTION_SILENCE_SEARCH_SECONDS
+)
+from services import transcription_worker
+from utils.audio import decode_audio, plan_windows, stitch_segments
+
+##############################################################################
+# Segmented transcription. Media is decoded once to 16 kHz mono WAV, cut into
+# windows of about TRANSCRIPTION_WINDOW_SECONDS (at silences where possible,
+# see utils.audio) and the windows are transcribed in parallel on the worker
+# pool. Windows are stitched back by timestamp, and the transcript so far is
+# published as soon as the next window in order is done, so a long upload can
+# be used before all of it is transcribed.
+##############################################################################
+
+
+class TranscriptionQueueFull(RuntimeError):
+    pass
+
+
+class TranscriptionPool:
+    """
+    Runs speech recognition on a pool of worker processes, each loading the
+    model once at start-up. asr_options are the load_backend arguments
+    (services.asr_backends).
+
+    Work is submitted in batches (the windows of one file). Calls wait in a
+    priority queue (lowest priority value first, FIFO among equals) and are
+    handed to the workers only when one is free, so queued calls can still be
+    cancelled. submit() refuses new batches once max_pending batches are
+    waiting, so overload turns into fast errors instead of unbounded latency.
+    """
+
+    def __init__(self, workers, max_pending, asr_options):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.asr_options = asr_options
+        self._heap = []
+        self._counter = itertools.count()
+        self._batch_ids = itertools.count()
+        self._queued_batches = Counter()  # batch id -> calls still queued
+        self._cond = threading.Condition()
+        self._running = 0
+        self._executor = None
+        self._dispatcher = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            # spawn: forking a multi-threaded web worker is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=transcription_worker.init_worker,
+                initargs=(self.asr_options, max(1, (os.cpu_count() or 1) // self.workers)),
+            )
+        return self._executor
+
+    def submit(self, calls, priority=0):
+        """
+        Queues a batch of (function, args) calls to run in the workers and
+        returns one Future per call, in order.
+        Raises TranscriptionQueueFull when too many batches are already waiting.
+        """
+        futures = [Future() for _ in calls]
+        with self._cond:
+            if len(self._queued_batches) >= self.max_pending:
+                raise TranscriptionQueueFull("Transcription queue is full. Please try again later.")
+            batch_id = next(self._batch_ids)
+            for (function, args), future in zip(calls, futures):
+                heapq.heappush(self._heap, (priority, next(self._counter), batch_id, function, args, future))
+            self._queued_batches[batch_id] = len(calls)
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._dispatch_loop, name="transcription-dispatcher", daemon=True)
+                self._dispatcher.start()
+            self._cond.notify()
+        return futures
+
+    def _dispatch_loop(self):
+        while True:
+            with self._cond:
+                while not self._heap or self._running >= self.workers:
+                    self._cond.wait()
+                _, _, batch_id, function, args, future = heapq.heappop(self._heap)
+                self._queued_batches[batch_id] -= 1
+                if self._queued_batches[batch_id] <= 0:
+                    del self._queued_batches[batch_id]
+                if not future.set_running_or_notify_cancel():
+                    continue  # cancelled while waiting in the queue
+                self._running += 1
+                executor = self._get_executor()
+            try:
+                inner = executor.submit(function, *args)
+            except Exception as e:
+                self._finish(future, error=e)
+                continue
+            inner.add_done_callback(lambda done, future=future: self._on_done(done, future))
+
+    def _on_done(self, inner, future):
+        error = inner.exception()
+        if error is None:
+            self._finish(future, result=inner.result())
+        else:
+            self._finish(future, error=error)
+
+    def _finish(self, future, result=None, error=None):
+        with self._cond:
+            self._running -= 1
+            if isinstance(error, BrokenProcessPool):
+                # A worker died (e.g. OOM); start a fresh pool for the next jobs
+                logging.error("Transcription worker pool broke; it will be restarted.")
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False)
+                self._executor = None
+            self._cond.notify()
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "queued": len(self._heap),
+                "queued_batches": len(self._queued_batches),
+                "running": self._running,
+                "workers": self.workers,
+            }
+
+
+transcription_pool = TranscriptionPool(TRANSCRIPTION_WORKERS, TRANSCRIPTION_QUEUE_SIZE, {
+    "backend": ASR_BACKEND,
+    "model_size": ASR_MODEL_SIZE,
+    "compute_type": ASR_COMPUTE_TYPE,
+    "beam_size": ASR_BEAM_SIZE,
+})
+
+
+def transcribe_file(audio_file_path, priority=None, timeout=None, on_progress=None):
+    """
+    Transcribes a media file in parallel windows and returns the text.
+    By default shorter files go first (priority = file size), which keeps the
+    average wait low. on_progress(text_so_far, transcribed_seconds,
+    total_seconds) is called each time the transcribed prefix grows.
+    Raises TranscriptionQueueFull, or RuntimeError when a window fails or
+    timeout seconds pass.
+    """
+    if priority is None:
+        priority = os.path.getsize(audio_file_path)
+
+    fd, wav_path = tempfile.mkstemp(suffix=".wav")
+    os.close(fd)
+    futures = []
+    try:
+        duration, silences = decode_audio(audio_file_path, wav_path)
+        windows = plan_windows(
+            duration, silences,
+            TRANSCRIPTION_WINDOW_SECONDS, TRANSCRIPTION_OVERLAP_SECONDS, TRANSCRIPTION_SILENCE_SEARCH_SECONDS
+        )
+        logging.info(f"Transcribing {duration:.0f}s of audio in {len(windows)} windows.")
+        futures = transcription_pool.submit(
+            [(transcription_worker.transcribe_window, (wav_path, start, end)) for _, _, start, end in windows],
+            priority,
+        )
+
+        positions = {future: i for i, future in enumerate(futures)}
+        results = [None] * len(windows)
+        published = 0
+        try:
+            for future in as_completed(futures, timeout=timeout):
+                results[positions[future]] = future.result()
+                previous = published
+                while published < len(windows) and results[published] is not None:
+                    published += 1
+                # Windows finishing out of order are published once the ones before them are done
+                if on_progress is not None and previous < published < len(windows):
+                    texts = stitch_segments(windows[:published], results[:published])
+                    on_progress(" ".join(t for t in texts if t), windows[published - 1][1], duration)
+        except FutureTimeoutError:
+            raise RuntimeError(f"Transcription did not finish within {timeout} seconds.")
+
+        texts = stitch_segments(windows, results)
+        return " ".join(t for t in texts if t)
+    finally:
+        for future in futures:
+            future.cancel()
+        if os.path.exists(wav_path):
+            os.remove(wav_path)
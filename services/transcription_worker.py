@@ -0,0 +1,33 @@
+##############################################################################
+# Code that runs inside the transcription worker processes.
+# Kept separate from transcription_service so that spawning a worker only
+# imports the ASR backend, not the Flask app, config or Gemini setup.
+##############################################################################
+import logging
+
+# One model per worker process, loaded by init_worker when the process starts
+_asr_backend = None
+
+
+def init_worker(asr_options, threads=None):
+    """
+    asr_options are the load_backend arguments. threads caps the backend's
+    CPU threads: workers run side by side, and one thread per core each would
+    oversubscribe the CPU.
+    """
+    global _asr_backend
+    from services.asr_backends import load_backend
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    logging.info(f"Loading ASR backend {asr_options} in transcription worker.")
+    _asr_backend = load_backend(threads=threads, **asr_options)
+
+
+def transcribe_window(wav_path, start_seconds, end_seconds, sample_rate=16000):
+    """
+    Transcribes [start_seconds, end_seconds) of a 16 kHz mono 16-bit WAV file
+    with this worker's ASR backend. Returns its segments as
+    (start, end, text) with times in seconds from the start of the file.
+    """
+    from utils.audio import read_wav_window
+    audio, offset = read_wav_window(wav_path, start_seconds, end_seconds, sample_rate)
+    return [(offset + start, offset + end, text) for start, end, text in _asr_backend.transcribe(audio)]
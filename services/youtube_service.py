@@ -1,44 +1,85 @@
 import os
 import re
+import json
+import hashlib
 import logging
 import requests
 import urllib.error
+from urllib.parse import urlsplit, urlunsplit
 from pytube import YouTube
 from youtube_transcript_api import YouTubeTranscriptApi
-import google.generativeai as genai
-import whisper
 from config import (
     VIDEO_ID_PATTERN,
-    CONVERSATION_HISTORY_LIMIT,
     SUMMARY_WORD_LIMIT,
-    MAX_TRANSCRIPT_LENGTH
+    CONTENT_CACHE_MAX_BYTES,
+    CONTENT_CACHE_TTL_SECONDS,
+    TRANSCRIPTION_TIMEOUT_SECONDS,
+    ARTIFACT_STORE_DIR,
+    ARTIFACT_STORE_MAX_BYTES,
+    EXTRACTOR_VERSIONS,
+    HTTP_CONNECT_TIMEOUT,
+    TRANSCRIPT_SERVICE_READ_TIMEOUT,
+    ARTIFACT_MAX_AGE_SECONDS,
+    USER_DATA_MAX_BYTES,
+    USER_DATA_TOTAL_MAX_BYTES,
+    USER_IDLE_TTL_SECONDS,
+    USER_REAPER_INTERVAL_SECONDS,
+    PROMPT_TOKEN_BUDGETS,
+    QA_SINGLE_PASS
 )
 from bs4 import BeautifulSoup
 import wikipedia
 import wikipedia.exceptions
 from services.pdf_service import process_file
-
-# Initialize Whisper model for speech-to-text
-whisper_model = whisper.load_model("base")
-
-# Initialize Google Gemini model (already configured in config.py)
-genai.configure()
+from services.retrieval_service import select_relevant_content, select_passages_across
+from services.summarization_service import condense_content, tree_reduce
+from services.transcription_service import transcribe_file
+from services.llm_service import generate_text, stream_text
+from services.history_service import render_history, schedule_compaction
+from services.prompt_service import section, pack_prompt, fair_share
+from utils.content_cache import ContentCache
+from utils.artifact_store import ArtifactStore
+from utils.user_store import UserDataStore
+from utils import http_client
+from utils.progress import report_stage
+from utils.metrics import time_stage
+from utils.tokens import estimate_tokens
 
 ##############################################################################
-# In-memory structure for storing user data (no database).
-# user_data_cache will hold data for all users in a single dictionary:
+# Extracted content (transcripts, file text, website text, Wikipedia pages) is
+# stored once in content_cache, shared by all users and keyed by source
+# identity:
+#     ("transcript", video_id)
+#     ("file", sha256_of_file_bytes, extension)
+#     ("website", normalized_url)
+#     ("wikipedia", normalized_title)
+#
+# user_data_cache only holds per-user state and references (cache keys) into
+# content_cache, in a single dictionary:
 # {
 #     "username1": {
-#         "transcripts": { "video_id": "transcript text", ... },
-#         "file_contents": { "filename": "file text", ... },
-#         "website_contents": { "url": "website text", ... },
-#         "wikipedia_contents": { "title": "wiki content", ... },
-#         "conversation_history": [ { "question": "...", "answer": "..." }, ... ]
+#         "transcripts": { "video_id": cache_key, ... },
+#         "file_contents": { "filename": cache_key, ... },
+#         "website_contents": { "url": cache_key, ... },
+#         "wikipedia_contents": { "title": cache_key, ... },
+#         "conversation_history": [ { "question": "...", "answer": "..." }, ... ],
+#         "history_summary": "rolling summary of turns folded out of conversation_history"
 #     },
 #     "username2": { ... }
 # }
+#
+# Misses in content_cache fall back to the persistent artifact_store on disk
+# before re-extracting, so restarts and other workers reuse earlier work.
+#
+# user_data_cache is bounded (see utils.user_store): idle users expire and the
+# coldest users are dropped once the total size limit is reached. Update it
+# with add_reference() / append_history(), not by mutating the dicts.
 ##############################################################################
-user_data_cache = {}
+content_cache = ContentCache(CONTENT_CACHE_MAX_BYTES, CONTENT_CACHE_TTL_SECONDS, name="content")
+artifact_store = ArtifactStore(ARTIFACT_STORE_DIR, ARTIFACT_STORE_MAX_BYTES)
+user_data_cache = UserDataStore(
+    USER_DATA_MAX_BYTES, USER_DATA_TOTAL_MAX_BYTES, USER_IDLE_TTL_SECONDS, USER_REAPER_INTERVAL_SECONDS
+)
 
 
 def get_or_create_user_data(username: str) -> dict:
@@ -46,15 +87,7 @@ def get_or_create_user_data(username: str) -> dict:
     Retrieves the user data cache for the given username.
     If it doesn't exist, create an empty structure.
     """
-    if username not in user_data_cache:
-        user_data_cache[username] = {
-            "transcripts": {},
-            "file_contents": {},
-            "website_contents": {},
-            "wikipedia_contents": {},
-            "conversation_history": []
-        }
-    return user_data_cache[username]
+    return user_data_cache.get_or_create(username)
 
 
 def extract_video_id(youtube_video_url):
@@ -67,6 +100,7 @@ def extract_video_id(youtube_video_url):
     raise ValueError("Invalid YouTube URL format. Please ensure the URL is valid.")
 
 
+@time_stage("audio_download")
 def download_audio(video_id):
     """
     Downloads YouTube video audio by video_id using pytube.
@@ -92,25 +126,84 @@ def download_audio(video_id):
         raise RuntimeError("Failed to download audio from YouTube.")
 
 
-def transcribe_audio(audio_file_path, delete_after=True):
+# The transcript so far of content being transcribed is kept in the artifact
+# store (kind "partial", JSON with the text and the seconds covered) so that
+# allow_partial requests landing on any worker can use it
+PARTIAL_KIND = "partial"
+PARTIAL_VERSION = 1
+
+
+def partial_source_id(cache_key):
+    return "|".join(str(part) for part in cache_key)
+
+
+@time_stage("whisper")
+def transcribe_audio(audio_file_path, delete_after=True, priority=None, cache_key=None):
     """
-    Transcribes audio using Whisper.
+    Transcribes audio using Whisper on the transcription worker pool (in
+    parallel windows) and waits for the result. While it runs, the transcript
+    so far is reported as progress and, given the content's cache_key,
+    published for get_partial_content.
     """
+    def on_progress(text, transcribed_seconds, total_seconds):
+        report_stage("transcribing", transcribed_seconds=round(transcribed_seconds), total_seconds=round(total_seconds))
+        if cache_key is not None:
+            try:
+                artifact_store.put(PARTIAL_KIND, partial_source_id(cache_key), PARTIAL_VERSION, json.dumps({
+                    "text": text, "transcribed_seconds": transcribed_seconds, "total_seconds": total_seconds
+                }))
+            except Exception as e:
+                logging.error(f"Error publishing partial transcript: {e}")
+
     try:
-        logging.info("Transcribing audio with Whisper model...")
-        result = whisper_model.transcribe(audio_file_path)
-        transcript = result['text']
+        logging.info("Queueing audio for transcription with Whisper...")
+        transcript = transcribe_file(
+            audio_file_path, priority, timeout=TRANSCRIPTION_TIMEOUT_SECONDS, on_progress=on_progress
+        )
         logging.info("Audio transcription successful.")
         return transcript
+    except RuntimeError as e:
+        # Queue full, timed out, undecodable audio: the message says which
+        logging.error(f"Error transcribing audio: {e}")
+        raise
     except Exception as e:
         logging.error(f"Error transcribing audio: {e}")
         raise RuntimeError("Audio transcription failed.")
     finally:
+        if cache_key is not None:
+            try:
+                artifact_store.delete(PARTIAL_KIND, partial_source_id(cache_key), PARTIAL_VERSION)
+            except Exception as e:
+                logging.error(f"Error removing partial transcript: {e}")
         if delete_after and os.path.exists(audio_file_path):
             os.remove(audio_file_path)
             logging.info(f"Deleted the audio file: {audio_file_path}")
 
 
+def get_partial_content(cache_key):
+    """
+    Returns the transcript so far of content still being transcribed, with a
+    note saying how much of it is covered, or None.
+    """
+    try:
+        # Left behind by a worker that died mid-transcription once older than the timeout
+        stored = artifact_store.get(
+            PARTIAL_KIND, partial_source_id(cache_key), PARTIAL_VERSION, TRANSCRIPTION_TIMEOUT_SECONDS
+        )
+    except Exception as e:
+        logging.error(f"Error reading partial transcript: {e}")
+        return None
+    if stored is None:
+        return None
+    partial = json.loads(stored)
+    text, transcribed_seconds, total_seconds = partial["text"], partial["transcribed_seconds"], partial["total_seconds"]
+    return (
+        f"{text}\n\n[Transcript in progress: this covers the first {transcribed_seconds / 60:.0f} "
+        f"of {total_seconds / 60:.0f} minutes.]"
+    )
+
+
+@time_stage("transcript_service")
 def fetch_transcript_from_external_service(video_id):
     """
     Optionally fetch transcript from an external service.
@@ -121,7 +214,14 @@ def fetch_transcript_from_external_service(video_id):
 
     try:
         logging.info(f"Attempting to fetch transcript for video ID: {video_id} from external service.")
-        response = requests.post(transcript_url, json={"video_url": f"https://www.youtube.com/watch?v={video_id}"})
+        response = http_client.post(
+            transcript_url,
+            json={"video_url": f"https://www.youtube.com/watch?v={video_id}"},
+            timeout=(HTTP_CONNECT_TIMEOUT, TRANSCRIPT_SERVICE_READ_TIMEOUT),
+            # Not retried: the POST starts a remote transcription job, and one slow attempt
+            # already takes most of SOURCE_TIMEOUT_SECONDS
+            max_retries=0
+        )
         response.raise_for_status()
         data = response.json()
 
@@ -140,13 +240,14 @@ def fetch_transcript_from_external_service(video_id):
         return None
 
 
+@time_stage("metadata")
 def fetch_video_metadata(video_id):
     """
     Fetches YouTube video metadata using oEmbed.
     """
     try:
         metadata_url = f"https://www.youtube.com/oembed?url=http://www.youtube.com/watch?v={video_id}&format=json"
-        response = requests.get(metadata_url)
+        response = http_client.get(metadata_url)
         response.raise_for_status()
         metadata = response.json()
         logging.info(f"Fetched metadata for video ID {video_id}.")
@@ -156,96 +257,181 @@ def fetch_video_metadata(video_id):
         raise RuntimeError("Failed to fetch video metadata.")
 
 
-def get_transcript_text(username, video_id):
+def normalize_url(url):
     """
-    Retrieves or generates the transcript text for a given YouTube video.
-    Uses in-memory cache to avoid re-fetching or re-transcribing.
+    Normalizes a website URL so trivially different spellings share a cache entry.
     """
-    user_data = get_or_create_user_data(username)
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or "http"
+    netloc = parts.netloc.lower()
+    if (scheme == "http" and netloc.endswith(":80")) or (scheme == "https" and netloc.endswith(":443")):
+        netloc = netloc.rsplit(":", 1)[0]
+    path = parts.path or "/"
+    return urlunsplit((scheme, netloc, path, parts.query, ""))
 
-    # Check if we already have the transcript in memory
-    if video_id in user_data["transcripts"]:
-        logging.info("Transcript fetched from user's temporary cache.")
-        return user_data["transcripts"][video_id]
 
-    # Try fetching from an external transcript service
-    transcript_text = fetch_transcript_from_external_service(video_id)
-    if transcript_text:
-        # Cache it
-        user_data["transcripts"][video_id] = transcript_text
-        return transcript_text
+def normalize_wiki_title(wiki_title):
+    """
+    Normalizes a Wikipedia title (whitespace, underscores, first-letter case).
+    """
+    title = " ".join(wiki_title.replace("_", " ").split())
+    return title[:1].upper() + title[1:]
 
-    # If external transcript is not available, do local download + whisper
-    logging.info("Attempting to transcribe audio as no transcript is available from external service.")
-    audio_file_path = download_audio(video_id)
-    transcript_text = transcribe_audio(audio_file_path)
 
-    user_data["transcripts"][video_id] = transcript_text
-    return transcript_text
+def hash_file(file_path, chunk_size=1024 * 1024):
+    """
+    Returns the SHA-256 hex digest of the file's bytes.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_content(cache_key, loader):
+    """
+    Returns the content for cache_key from memory, then from the artifact
+    store on disk, and only then by calling loader() (persisting the result).
+    """
+    kind = cache_key[0]
+    source_id = "|".join(str(part) for part in cache_key[1:])
+    version = EXTRACTOR_VERSIONS[kind]
 
+    def load():
+        try:
+            stored = artifact_store.get(kind, source_id, version, ARTIFACT_MAX_AGE_SECONDS.get(kind))
+        except Exception as e:
+            logging.error(f"Error reading artifact {kind}/{source_id}: {e}")
+            stored = None
+        if stored is not None:
+            logging.info(f"Content for {kind} {source_id} served from the artifact store.")
+            return stored
+
+        content = loader()
+        try:
+            artifact_store.put(kind, source_id, version, content)
+        except Exception as e:
+            logging.error(f"Error storing artifact {kind}/{source_id}: {e}")
+        return content
 
-def get_file_content(username, file_name, file_extension, file_path):
+    return content_cache.get_or_compute(cache_key, load)
+
+
+def get_transcript_text(username, video_id, allow_partial=False):
     """
-    Process file if not processed before and store in memory.
+    Retrieves or generates the transcript text for a given YouTube video.
+    Uses the shared content cache to avoid re-fetching or re-transcribing.
+    With allow_partial, a transcription already under way is not waited for:
+    the transcript so far is returned (see get_partial_content).
     """
-    user_data = get_or_create_user_data(username)
+    cache_key = ("transcript", video_id)
+    partial = get_partial_content(cache_key) if allow_partial else None
+    if partial is not None:
+        user_data_cache.add_reference(username, "transcripts", video_id, cache_key)
+        return partial
+
+    def load_transcript():
+        # Try fetching from an external transcript service
+        report_stage("fetching_transcript")
+        transcript_text = fetch_transcript_from_external_service(video_id)
+        if transcript_text:
+            return transcript_text
+
+        # If external transcript is not available, do local download + whisper
+        logging.info("Attempting to transcribe audio as no transcript is available from external service.")
+        report_stage("downloading_audio")
+        audio_file_path = download_audio(video_id)
+        report_stage("transcribing")
+        return transcribe_audio(audio_file_path, cache_key=cache_key)
 
-    if file_name in user_data["file_contents"]:
-        logging.info(f"File content fetched from user's cache: {file_name}")
-        return user_data["file_contents"][file_name]
-    else:
+    transcript_text = load_content(cache_key, load_transcript)
+    user_data_cache.add_reference(username, "transcripts", video_id, cache_key)
+    return transcript_text
+
+
+# Uploaded file types that are transcribed rather than extracted
+MEDIA_EXTENSIONS = {'mp3', 'mp4', 'wav', 'avi', 'mkv', 'flv', 'mov'}
+
+
+def get_file_content(username, file_name, file_extension, file_path, content_hash=None, page_ranges=None,
+                     allow_partial=False):
+    """
+    Process file if its bytes were not processed before (by anyone) and cache the text.
+    Pass content_hash when it is already known (see utils.uploads.save_upload)
+    to avoid re-reading the file to hash it. page_ranges limits PDF extraction
+    to the given pages (e.g. "1-5, 8"). allow_partial returns the transcript so
+    far of audio/video still being transcribed, as in get_transcript_text.
+    """
+    file_extension = file_extension.lower()
+    page_ranges = "".join(page_ranges.split()) if page_ranges else None
+    cache_key = ("file", content_hash or hash_file(file_path), file_extension)
+    if page_ranges and file_extension == 'pdf':
+        cache_key += (page_ranges,)
+    partial = get_partial_content(cache_key) if allow_partial else None
+    if partial is not None:
+        user_data_cache.add_reference(username, "file_contents", file_name, cache_key)
+        return partial
+
+    def load_file():
         # If it's an audio/video extension, transcribe with Whisper
-        if file_extension.lower() in ['mp3', 'mp4', 'wav', 'avi', 'mkv', 'flv', 'mov']:
+        if file_extension in MEDIA_EXTENSIONS:
             logging.info(f"Processing audio/video file {file_name} for transcription.")
-            transcript_text = transcribe_audio(file_path, delete_after=False)
-            user_data["file_contents"][file_name] = transcript_text
-            return transcript_text
-        else:
-            # Otherwise, use PDF service's process_file
-            content_text = process_file(file_path, file_extension)
-            user_data["file_contents"][file_name] = content_text
-            return content_text
+            report_stage("transcribing")
+            return transcribe_audio(file_path, delete_after=False, cache_key=cache_key)
+        # Otherwise, use PDF service's process_file
+        report_stage("extracting")
+        return process_file(file_path, file_extension, page_ranges)
+
+    content_text = load_content(cache_key, load_file)
+    user_data_cache.add_reference(username, "file_contents", file_name, cache_key)
+    return content_text
+
+
+def extract_html_text(html):
+    """
+    Returns the visible text of an HTML page (scripts and styles removed).
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    for script in soup(["script", "style"]):
+        script.extract()
+    return soup.get_text(separator=' ', strip=True)
 
 
 def get_website_content(username, website_url):
     """
-    Fetches website text content (cached in memory).
+    Fetches website text content (cached in the shared content cache).
     """
-    user_data = get_or_create_user_data(username)
+    cache_key = ("website", normalize_url(website_url))
 
-    if website_url in user_data["website_contents"]:
-        logging.info(f"Website content from user's cache: {website_url}")
-        return user_data["website_contents"][website_url]
-    else:
+    @time_stage("website_fetch")
+    def load_website():
+        report_stage("fetching")
         try:
-            response = requests.get(website_url)
+            response = http_client.get(website_url)
             response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
-            for script in soup(["script", "style"]):
-                script.extract()
-            text = soup.get_text(separator=' ', strip=True)
-            user_data["website_contents"][website_url] = text
-            return text
+            return extract_html_text(response.text)
         except Exception as e:
             logging.error(f"Error fetching website content from {website_url}: {e}")
             raise RuntimeError(f"Failed to fetch website content from {website_url}")
 
+    text = load_content(cache_key, load_website)
+    user_data_cache.add_reference(username, "website_contents", website_url, cache_key)
+    return text
+
 
 def get_wikipedia_content(username, wiki_title):
     """
-    Fetches Wikipedia page content (cached in memory).
+    Fetches Wikipedia page content (cached in the shared content cache).
     """
-    user_data = get_or_create_user_data(username)
+    cache_key = ("wikipedia", normalize_wiki_title(wiki_title))
 
-    if wiki_title in user_data["wikipedia_contents"]:
-        logging.info(f"Wikipedia content from user's cache: {wiki_title}")
-        return user_data["wikipedia_contents"][wiki_title]
-    else:
+    @time_stage("wikipedia_fetch")
+    def load_wikipedia():
+        report_stage("fetching")
         try:
             page = wikipedia.page(wiki_title)
-            content = page.content
-            user_data["wikipedia_contents"][wiki_title] = content
-            return content
+            return page.content
         except wikipedia.exceptions.DisambiguationError as e:
             logging.error(f"Disambiguation error for '{wiki_title}': {e}")
             raise RuntimeError(f"The title '{wiki_title}' is ambiguous. Possible options: {e.options}")
@@ -256,132 +442,315 @@ def get_wikipedia_content(username, wiki_title):
             logging.error(f"Error fetching Wikipedia content for '{wiki_title}': {e}")
             raise RuntimeError(f"Failed to fetch Wikipedia content for '{wiki_title}'.")
 
+    content = load_content(cache_key, load_wikipedia)
+    user_data_cache.add_reference(username, "wikipedia_contents", wiki_title, cache_key)
+    return content
+
+
+def build_summary_prompt(content_text, metadata):
+    title = metadata.get("title", "")
+    description = metadata.get("author_name", "")
+
+    detailed_summary_word_limit = SUMMARY_WORD_LIMIT * 2
+
+    prompt, _ = pack_prompt("summary", [
+        section("instructions", (
+            f"You are an expert summarizer. Read the following content and generate a highly detailed summary of "
+            f"about {detailed_summary_word_limit} words."
+        ), required=True),
+        section("metadata", f"Title: {title}\nDescription: {description}", priority=1),
+        # Content over the budget is reduced to section summaries covering all of it
+        section("content", content_text, heading="Content:", priority=2, fit=condense_content),
+        section("answer_cue", "Detailed Summary:", required=True),
+    ])
+    return prompt
+
 
 def generate_summary(content_text, metadata, username):
     """
     Uses Google Gemini to generate a detailed summary of the content.
     """
     try:
-        model = genai.GenerativeModel("gemini-pro")
-        title = metadata.get("title", "")
-        description = metadata.get("author_name", "")
-
-        if len(content_text) > MAX_TRANSCRIPT_LENGTH:
-            content_text = content_text[:MAX_TRANSCRIPT_LENGTH]
-
-        detailed_summary_word_limit = SUMMARY_WORD_LIMIT * 2
+        prompt = build_summary_prompt(content_text, metadata)
+        with time_stage("gemini_summary"):
+            return generate_text(prompt)
+    except Exception as e:
+        logging.error(f"Error generating summary: {e}")
+        raise RuntimeError("Failed to generate summary.")
 
-        prompt = (
-            f"You are an expert summarizer. Read the following content and generate a highly detailed summary of "
-            f"about {detailed_summary_word_limit} words.\n\n"
-            f"Title: {title}\n"
-            f"Description: {description}\n\n"
-            f"Content:\n{content_text}\n\n"
-            f"Detailed Summary:"
-        )
 
-        response = model.generate_content(prompt)
-        summary = response.text.strip()
-        return summary
+def stream_summary(content_text, metadata, username):
+    """
+    Streaming variant of generate_summary: yields pieces of the summary as Gemini produces them.
+    """
+    try:
+        prompt = build_summary_prompt(content_text, metadata)
+        with time_stage("gemini_summary"):
+            yield from stream_text(prompt)
     except Exception as e:
         logging.error(f"Error generating summary: {e}")
         raise RuntimeError("Failed to generate summary.")
 
 
+def _numbered(label, texts):
+    return "\n\n".join(f"{label} {i+1}:\n{text}" for i, text in enumerate(texts))
+
+
+def build_merge_summaries_prompt(summaries):
+    summaries = list(summaries)
+    prompt, _ = pack_prompt("merge_summaries", [
+        section("instructions", (
+            "You are an expert in summarization. You have multiple summaries. "
+            "Merge them into one cohesive summary covering all key points."
+        ), required=True),
+        # Over the budget, every summary keeps an equal share
+        section("summaries", _numbered("Summary", summaries), priority=1,
+                fit=lambda _, max_tokens: _numbered("Summary", fair_share(summaries, max_tokens - 8 * len(summaries)))),
+        section("answer_cue", "Final Merged Summary:", required=True),
+    ])
+    return prompt
+
+
+def merge_group_tokens(call_type):
+    """
+    Tokens of results merged per call, leaving room for the rest of the prompt.
+    """
+    return PROMPT_TOKEN_BUDGETS[call_type] * 3 // 4
+
+
+def merge_summary_group(summaries):
+    with time_stage("gemini_merge"):
+        return generate_text(build_merge_summaries_prompt(summaries))
+
+
 def merge_summaries(*summaries):
     """
     Merges multiple summaries into one cohesive summary using Google Gemini.
+    Many summaries are merged in parallel groups first (tree_reduce); a single
+    non-empty summary is returned as is.
     """
     try:
-        model = genai.GenerativeModel("gemini-pro")
-        combined_summaries_text = "\n\n".join([f"Summary {i+1}:\n{summary}" for i, summary in enumerate(summaries)])
-
-        prompt = (
-            f"You are an expert in summarization. You have multiple summaries. "
-            f"Merge them into one cohesive summary covering all key points.\n\n"
-            f"{combined_summaries_text}\n\n"
-            f"Final Merged Summary:"
-        )
+        summaries = tree_reduce(summaries, merge_summary_group, merge_group_tokens("merge_summaries"))
+        if not summaries:
+            return "No valid content to summarize."
+        if len(summaries) == 1:
+            return summaries[0]
+        return merge_summary_group(summaries)
+    except Exception as e:
+        logging.error(f"Error merging summaries: {e}")
+        raise RuntimeError("Failed to merge summaries.")
+
 
-        response = model.generate_content(prompt)
-        combined_summary = response.text.strip()
-        return combined_summary
+def stream_merge_summaries(*summaries):
+    """
+    Streaming variant of merge_summaries: yields pieces of the merged summary as Gemini produces them.
+    Only the final merge is streamed.
+    """
+    try:
+        summaries = tree_reduce(summaries, merge_summary_group, merge_group_tokens("merge_summaries"))
+        if len(summaries) <= 1:
+            yield summaries[0] if summaries else "No valid content to summarize."
+            return
+        with time_stage("gemini_merge"):
+            yield from stream_text(build_merge_summaries_prompt(summaries))
     except Exception as e:
         logging.error(f"Error merging summaries: {e}")
         raise RuntimeError("Failed to merge summaries.")
 
 
-def answer_question(content_text, metadata, user_question, conversation_history, username):
+def build_answer_prompt(content_text, metadata, user_question, conversation_context):
+    """
+    conversation_context is the rendered history section (see get_conversation_context).
+    """
+    title = metadata.get("title", "Unknown Title")
+    description = metadata.get("author_name", "Unknown Author")
+
+    # Content over the budget is narrowed to the passages relevant to the question
+    def fit_content(text, max_tokens):
+        return select_relevant_content(text, user_question, max_tokens)
+
+    prompt, _ = pack_prompt("answer", [
+        section("instructions", (
+            "You are an intelligent assistant. Use the content and conversation history below to answer the user's question."
+        ), required=True),
+        section("metadata", f"Title: {title}\nDescription: {description}", priority=2),
+        section("content", content_text, heading="Content:", priority=3, fit=fit_content),
+        # Already capped at HISTORY_TOKEN_BUDGET
+        section("history", conversation_context, heading="Conversation History:", priority=1),
+        section("question", user_question, heading="User Question:", required=True),
+        section("answer_cue", "Answer in detail:", required=True),
+    ])
+    fallback_prompt, _ = pack_prompt("answer", [
+        section("instructions", "Try again. Based on the following content, answer the user's question.", required=True),
+        section("content", content_text, heading="Content:", priority=1, fit=fit_content),
+        section("question", user_question, heading="User Question:", required=True),
+        section("answer_cue", "Answer in as much detail as possible:", required=True),
+    ])
+    return prompt, fallback_prompt
+
+
+def answer_question(content_text, metadata, user_question, conversation_context, username):
     """
     Answers a question based on the content_text, conversation history, etc.
+    Long content is narrowed down to the passages most relevant to the question.
     """
     try:
-        model = genai.GenerativeModel("gemini-pro")
-        title = metadata.get("title", "Unknown Title")
-        description = metadata.get("author_name", "Unknown Author")
-
-        conversation_context = ""
-        if conversation_history:
-            conversation_context = "\n".join(
-                [
-                    f"User: {entry['question']}\nAssistant: {entry['answer']}"
-                    for entry in conversation_history[-CONVERSATION_HISTORY_LIMIT:]
-                ]
-            )
-
-        if len(content_text) > MAX_TRANSCRIPT_LENGTH:
-            content_text = content_text[:MAX_TRANSCRIPT_LENGTH]
-
-        prompt = (
-            f"You are an intelligent assistant. Use the content and conversation history below to answer the user's question.\n\n"
-            f"Title: {title}\n"
-            f"Description: {description}\n\n"
-            f"Content:\n{content_text}\n\n"
-            f"Conversation History:\n{conversation_context}\n\n"
-            f"User Question:\n{user_question}\n\n"
-            f"Answer in detail:"
-        )
+        prompt, fallback_prompt = build_answer_prompt(content_text, metadata, user_question, conversation_context)
+        with time_stage("gemini_answer"):
+            answer = generate_text(prompt)
 
-        response = model.generate_content(prompt)
-        answer = response.text.strip()
+            if not answer:
+                logging.info("No meaningful answer found, retrying with a fallback prompt.")
+                answer = generate_text(fallback_prompt)
+
+        return answer
+    except Exception as e:
+        logging.error(f"Error generating answer: {e}")
+        raise RuntimeError("Failed to generate answer.")
+
+
+def stream_answer_question(content_text, metadata, user_question, conversation_context, username):
+    """
+    Streaming variant of answer_question: yields pieces of the answer as Gemini produces them.
+    """
+    try:
+        prompt, fallback_prompt = build_answer_prompt(content_text, metadata, user_question, conversation_context)
+        with time_stage("gemini_answer"):
+            produced = False
+            for piece in stream_text(prompt):
+                if piece.strip():
+                    produced = True
+                yield piece
+
+            if not produced:
+                logging.info("No meaningful answer found, retrying with a fallback prompt.")
+                yield generate_text(fallback_prompt)
+    except Exception as e:
+        logging.error(f"Error generating answer: {e}")
+        raise RuntimeError("Failed to generate answer.")
+
+
+MULTI_SOURCE_INSTRUCTIONS = (
+    "You are an intelligent assistant. Use the numbered sources and the conversation history below to answer "
+    "the user's question. After each point, cite the sources it comes from as [Source N]. If the sources do "
+    "not contain the answer, say so."
+)
+
+
+def source_heading(number, metadata):
+    title = metadata.get("title", "Unknown Title")
+    author = metadata.get("author_name")
+    return f"[Source {number}] {title}" + (f" ({author})" if author else "")
+
+
+def build_multi_source_answer_prompt(documents, user_question, conversation_context):
+    """
+    Builds one answer prompt over several (content_text, metadata) documents
+    from the passages most relevant to the question across all of them, each
+    labelled [Source N] (N is the document's position, starting at 1).
+    Returns None when those passages do not fit in the "answer" budget.
+    """
+    headings = [source_heading(i + 1, metadata) for i, (_, metadata) in enumerate(documents)]
+    fixed_tokens = sum(estimate_tokens(text) for text in [
+        MULTI_SOURCE_INSTRUCTIONS, conversation_context, "Conversation History:",
+        user_question, "User Question:", "Answer in detail, citing sources:", *headings
+    ])
+    excerpts = select_passages_across(
+        [content_text for content_text, _ in documents], user_question,
+        PROMPT_TOKEN_BUDGETS["answer"] - fixed_tokens
+    )
+    if excerpts is None:
+        return None
+
+    sources_text = "\n\n".join(
+        f"{heading}\n{excerpt}" for heading, excerpt in zip(headings, excerpts) if excerpt
+    )
+    prompt, _ = pack_prompt("answer", [
+        section("instructions", MULTI_SOURCE_INSTRUCTIONS, required=True),
+        section("sources", sources_text, priority=2),
+        section("history", conversation_context, heading="Conversation History:", priority=1),
+        section("question", user_question, heading="User Question:", required=True),
+        section("answer_cue", "Answer in detail, citing sources:", required=True),
+    ])
+    return prompt
+
+
+def single_pass_answer_prompt(documents, user_question, conversation_context):
+    """
+    Returns the prompt to answer over all documents in one call, or None when
+    they should be answered one by one and merged: single-pass answering is
+    off (QA_SINGLE_PASS), there is only one document, or the relevant
+    passages exceed the budget.
+    """
+    if not QA_SINGLE_PASS or len(documents) < 2:
+        return None
+    prompt = build_multi_source_answer_prompt(documents, user_question, conversation_context)
+    if prompt is None:
+        logging.info(f"Relevant passages of {len(documents)} sources exceed the answer budget; answering per source.")
+    return prompt
 
-        if not answer:
-            logging.info("No meaningful answer found, retrying with a fallback prompt.")
-            fallback_prompt = (
-                f"Try again. Based on the following content, answer the user's question.\n\n"
-                f"Content:\n{content_text}\n\n"
-                f"User Question:\n{user_question}\n\n"
-                f"Answer in as much detail as possible:"
-            )
-            response = model.generate_content(fallback_prompt)
-            answer = response.text.strip()
 
+def answer_multi_source(prompt):
+    """
+    Answers a question in one call from a build_multi_source_answer_prompt prompt.
+    """
+    try:
+        with time_stage("gemini_answer"):
+            answer = generate_text(prompt)
+        if not answer:
+            raise RuntimeError("Empty answer.")
         return answer
     except Exception as e:
         logging.error(f"Error generating answer: {e}")
         raise RuntimeError("Failed to generate answer.")
 
 
+def stream_answer_multi_source(prompt):
+    """
+    Streaming variant of answer_multi_source.
+    """
+    try:
+        with time_stage("gemini_answer"):
+            yield from stream_text(prompt)
+    except Exception as e:
+        logging.error(f"Error generating answer: {e}")
+        raise RuntimeError("Failed to generate answer.")
+
+
+def build_merge_answers_prompt(valid_answers, question):
+    valid_answers = list(valid_answers)
+    prompt, _ = pack_prompt("merge_answers", [
+        section("instructions", "You are an intelligent assistant. You have multiple answers to the same question:", required=True),
+        section("question", f"Question: {question}", required=True),
+        section("answers", _numbered("Answer", valid_answers), priority=1,
+                fit=lambda _, max_tokens: _numbered("Answer", fair_share(valid_answers, max_tokens - 8 * len(valid_answers)))),
+        section("merge_instructions", (
+            "Merge them into one cohesive, comprehensive answer that addresses all points without referencing sources."
+        ), required=True),
+    ])
+    return prompt
+
+
+def merge_answer_group(answers, question):
+    with time_stage("gemini_merge"):
+        return generate_text(build_merge_answers_prompt(answers, question))
+
+
 def merge_answers(*answers, question):
     """
-    Merges multiple answers into a single, consolidated answer.
+    Merges multiple answers into a single, consolidated answer, tree-reducing
+    them like merge_summaries.
     """
     try:
-        model = genai.GenerativeModel("gemini-pro")
-        valid_answers = [a for a in answers if a.strip()]
+        valid_answers = tree_reduce(
+            answers, lambda group: merge_answer_group(group, question), merge_group_tokens("merge_answers")
+        )
         if not valid_answers:
             return "No valid information available to answer the question."
+        if len(valid_answers) == 1:
+            return valid_answers[0]
 
-        combined_answers_text = "\n\n".join([f"Answer {i+1}:\n{ans}" for i, ans in enumerate(valid_answers)])
-        prompt = (
-            f"You are an intelligent assistant. You have multiple answers to the same question:\n\n"
-            f"Question: {question}\n\n"
-            f"{combined_answers_text}\n\n"
-            f"Merge them into one cohesive, comprehensive answer that addresses all points without referencing sources."
-        )
-
-        response = model.generate_content(prompt)
-        combined_answer = response.text.strip()
+        combined_answer = merge_answer_group(valid_answers, question)
         if not combined_answer:
             raise RuntimeError("Empty combined answer.")
         return combined_answer
@@ -390,12 +759,49 @@ def merge_answers(*answers, question):
         raise RuntimeError("Failed to merge answers.")
 
 
+def stream_merge_answers(*answers, question):
+    """
+    Streaming variant of merge_answers: yields pieces of the merged answer as Gemini produces them.
+    """
+    try:
+        valid_answers = tree_reduce(
+            answers, lambda group: merge_answer_group(group, question), merge_group_tokens("merge_answers")
+        )
+        if len(valid_answers) <= 1:
+            yield valid_answers[0] if valid_answers else "No valid information available to answer the question."
+            return
+
+        with time_stage("gemini_merge"):
+            yield from stream_text(build_merge_answers_prompt(valid_answers, question))
+    except Exception as e:
+        logging.error(f"Error merging answers: {e}")
+        raise RuntimeError("Failed to merge answers.")
+
+
+def get_conversation_context(username):
+    """
+    Returns the user's conversation history rendered for a prompt: the rolling
+    summary of older turns plus the recent turns, within HISTORY_TOKEN_BUDGET.
+    """
+    summary, turns = user_data_cache.conversation(username)
+    return render_history(summary, turns)
+
+
+def record_conversation(username, question, answer):
+    """
+    Appends a question/answer pair to the user's conversation history and
+    folds older turns into the rolling summary in the background.
+    """
+    user_data_cache.append_history(username, question, answer)
+    schedule_compaction(user_data_cache, username)
+
+
 def end_conversation(username):
     """
     Clears all data from memory for this specific user.
+    Shared content stays in content_cache for other users until it is evicted.
     """
-    if username in user_data_cache:
-        del user_data_cache[username]
+    if user_data_cache.discard(username):
         logging.info(f"All data cleared from memory for user {username}.")
 
 
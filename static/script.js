@@ -5,6 +5,7 @@
  *  3) Bolding text between *...*
  *  4) Gathering resources & sending them to Flask (or any backend)
  *  5) UI logic for Summarize, Ask, End Conversation
+ *  6) Reading server-sent events from the /stream endpoints
  ***********************************************************/
 
 // DOM references
@@ -137,6 +138,31 @@ function processBoldSyntax(word) {
   }
 }
 
+/************************************************
+ * Helper: Render text immediately (no animation),
+ * line-by-line with *bold* segments. Used while
+ * streamed tokens arrive.
+ ***********************************************/
+function renderMessage(container, text) {
+  container.innerHTML = '';
+  const lines = text.split('\n');
+  lines.forEach((rawLine, l) => {
+    const line = rawLine.trim();
+    if (line) {
+      const words = line.split(' ');
+      words.forEach((word, w) => {
+        container.appendChild(processBoldSyntax(word));
+        if (w < words.length - 1) {
+          container.appendChild(document.createTextNode(' '));
+        }
+      });
+    }
+    if (l < lines.length - 1) {
+      container.appendChild(document.createElement('br'));
+    }
+  });
+}
+
 // Delay utility
 function delay(ms) {
   return new Promise((resolve) => setTimeout(resolve, ms));
@@ -199,6 +225,108 @@ function addLoadingMessage() {
   return bubbleEl;
 }
 
+/*****************************************************
+ * Show the current processing stage under the
+ * loading animation
+ *****************************************************/
+const STAGE_LABELS = {
+  loading: 'Loading',
+  fetching: 'Fetching',
+  fetching_transcript: 'Fetching transcript',
+  downloading_audio: 'Downloading audio',
+  transcribing: 'Transcribing',
+  extracting: 'Extracting text',
+  summarizing: 'Summarizing',
+  answering: 'Answering',
+  merging: 'Combining results'
+};
+
+function setLoadingStatus(bubbleEl, progress) {
+  let statusEl = bubbleEl.querySelector('.loading-status');
+  if (!statusEl) {
+    statusEl = document.createElement('div');
+    statusEl.classList.add('loading-status');
+    bubbleEl.appendChild(statusEl);
+  }
+  const label = STAGE_LABELS[progress.stage] || progress.stage;
+  statusEl.textContent = progress.source ? `${label}: ${progress.source}` : `${label}...`;
+}
+
+/*****************************************************
+ * POST a form and read the server-sent events reply.
+ * onEvent(name, data) is called for every event.
+ *****************************************************/
+async function postEventStream(url, formData, onEvent) {
+  const response = await fetch(url, {
+    method: 'POST',
+    body: formData
+  });
+  if (!response.ok) {
+    const errorData = await response.json();
+    throw new Error(errorData.error || 'Request failed.');
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // Events are separated by a blank line
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const rawEvent = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+
+      let eventName = 'message';
+      const dataLines = [];
+      rawEvent.split('\n').forEach((line) => {
+        if (line.startsWith('event:')) {
+          eventName = line.slice(6).trim();
+        } else if (line.startsWith('data:')) {
+          dataLines.push(line.slice(5).trim());
+        }
+      });
+      if (dataLines.length) {
+        onEvent(eventName, JSON.parse(dataLines.join('\n')));
+      }
+    }
+  }
+}
+
+/*****************************************************
+ * Stream a request into a loading bubble: progress
+ * updates the status line, tokens replace the
+ * animation as soon as the first one arrives.
+ * Resolves with the "done" payload.
+ *****************************************************/
+async function streamIntoBubble(url, formData, bubbleEl) {
+  let text = '';
+  let result = null;
+  let streamError = null;
+
+  await postEventStream(url, formData, (eventName, data) => {
+    if (eventName === 'progress') {
+      if (!text) setLoadingStatus(bubbleEl, data);
+    } else if (eventName === 'token') {
+      text += data.text;
+      renderMessage(bubbleEl, text);
+      chatMessages.scrollTop = chatMessages.scrollHeight;
+    } else if (eventName === 'done') {
+      result = data;
+    } else if (eventName === 'error') {
+      streamError = new Error(data.error || 'Request failed.');
+    }
+  });
+
+  if (streamError) throw streamError;
+  if (!result) throw new Error('The connection closed before the response was complete.');
+  return result;
+}
+
 /*****************************************************
  * Collect resources into FormData
  *****************************************************/
@@ -274,23 +402,12 @@ async function handleAsk() {
   formData.append('question', question);
 
   try {
-    // Example fetch to your backend
-    const response = await fetch('/api/ask_question', {
-      method: 'POST',
-      body: formData
-    });
-    if (!response.ok) {
-      const errorData = await response.json();
-      throw new Error(errorData.error || 'Failed to get an answer.');
-    }
-    const data = await response.json();
+    // Tokens are rendered into the bubble as the backend streams them
+    const data = await streamIntoBubble('/api/ask_question/stream', formData, loadingBubble);
     const { answer } = data;
 
-    // Remove the loading video
-    loadingBubble.innerHTML = ''; // Clear the bubble
-
-    // Type out the answer
-    await typeMessage(loadingBubble, answer);
+    // Final render of the complete answer
+    renderMessage(loadingBubble, answer);
 
     // Auto-scroll
     chatMessages.scrollTop = chatMessages.scrollHeight;
@@ -321,20 +438,13 @@ summarizeButton.addEventListener('click', async () => {
   const loadingBubble = addLoadingMessage();
   
   try {
-    // Example fetch to your backend
-    const response = await fetch('/api/summary', {
-      method: 'POST',
-      body: formData
-    });
-    if (!response.ok) {
-      const errorData = await response.json();
-      throw new Error(errorData.error || 'Failed to get summary.');
-    }
-    const data = await response.json();
+    // Tokens are rendered into the bubble as the backend streams them
+    const data = await streamIntoBubble('/api/summary/stream', formData, loadingBubble);
     const { summary } = data;
 
-    // Display the summary
-    await addMessageToChat('assistant', summary);
+    // Final render of the complete summary
+    renderMessage(loadingBubble, summary);
+    chatMessages.scrollTop = chatMessages.scrollHeight;
 
     // Check for unsupported resources
     const {
@@ -361,6 +471,7 @@ summarizeButton.addEventListener('click', async () => {
       await addMessageToChat('assistant', 'Some resources were not processed:\n' + errorMessage.join('\n'));
     }
   } catch (err) {
+    loadingBubble.innerHTML = '';
     await addMessageToChat('assistant', 'Error summarizing: ' + err.message);
   }
 });
@@ -0,0 +1,46 @@
+from utils.audio import plan_windows, stitch_segments
+
+
+def test_short_audio_is_one_window():
+    assert plan_windows(100.0, [], 120, 2, 15) == [(0.0, 100.0, 0.0, 100.0)]
+
+
+def test_cuts_move_to_nearest_silence_midpoint():
+    # Silences around 110s and 125s: the one whose midpoint is nearest 120s wins
+    windows = plan_windows(300.0, [(109.0, 111.0), (124.0, 126.0)], 120, 2, 15)
+    assert [(own_start, own_end) for own_start, own_end, _, _ in windows] == [(0.0, 125.0), (125.0, 245.0), (245.0, 300.0)]
+
+
+def test_cuts_stay_nominal_without_nearby_silence():
+    windows = plan_windows(300.0, [(50.0, 51.0)], 120, 2, 15)
+    assert [own_end for _, own_end, _, _ in windows] == [120.0, 240.0, 300.0]
+
+
+def test_windows_cover_audio_and_overlap_by_the_given_seconds():
+    windows = plan_windows(1000.0, [(237.0, 239.0), (490.0, 494.0)], 120, 2, 15)
+    assert windows[0][0] == 0.0 and windows[-1][1] == 1000.0
+    for (_, own_end, _, end), (own_start, _, start, _) in zip(windows, windows[1:]):
+        assert own_end == own_start
+        assert end == own_end + 2 and start == own_start - 2
+    assert windows[0][2] == 0.0 and windows[-1][3] == 1000.0
+
+
+def test_last_window_absorbs_a_short_tail():
+    windows = plan_windows(130.0, [], 120, 2, 15)
+    assert len(windows) == 1
+
+
+def test_stitch_drops_segments_heard_twice_in_the_overlap():
+    windows = [(0.0, 120.0, 0.0, 122.0), (120.0, 240.0, 118.0, 240.0)]
+    results = [
+        [(0.0, 60.0, "one"), (60.0, 119.0, "two"), (119.0, 122.0, "three")],
+        [(118.5, 121.5, "three"), (121.5, 240.0, "four")],
+    ]
+    # "three" (midpoint 120.0 / 120.5) belongs to the second window only
+    assert stitch_segments(windows, results) == ["one two", "three four"]
+
+
+def test_stitch_orders_segments_and_skips_empty_text():
+    windows = [(0.0, 60.0, 0.0, 60.0)]
+    results = [[(30.0, 40.0, "b"), (10.0, 20.0, "a"), (40.0, 50.0, "")]]
+    assert stitch_segments(windows, results) == ["a b"]
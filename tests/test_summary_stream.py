@@ -0,0 +1,42 @@
+import os
+import json
+import tempfile
+
+import pytest
+
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+os.environ.setdefault("ARTIFACT_STORE_DIR", tempfile.mkdtemp(prefix="poppy-test-"))
+os.environ["LLM_CACHE_ENABLED"] = "false"
+
+flask = pytest.importorskip("flask")
+youtube_routes = pytest.importorskip("routes.youtube_routes")
+youtube_service = pytest.importorskip("services.youtube_service")
+
+
+def sse_events(body):
+    events = []
+    for block in body.decode("utf-8").strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_single_source_summary_streams_gemini_tokens(monkeypatch):
+    source = {"type": "website", "label": "https://example.com", "load": lambda: ("Some content.", {"title": "Example"})}
+    monkeypatch.setattr(youtube_routes, "build_sources", lambda *args, **kwargs: ([source], []))
+
+    def no_blocking_summary(*args, **kwargs):
+        raise AssertionError("a single source must not be summarized before streaming")
+    monkeypatch.setattr(youtube_routes, "generate_summary", no_blocking_summary)
+    monkeypatch.setattr(youtube_service, "stream_text", lambda prompt: iter(["The ", "summary ", "so far."]))
+
+    app = flask.Flask(__name__)
+    app.register_blueprint(youtube_routes.youtube_bp)
+    response = app.test_client().post(
+        "/api/summary/stream", data={"username": "alice", "website_url1": "https://example.com"}
+    )
+
+    events = sse_events(response.data)
+    tokens = [data["text"] for event, data in events if event == "token"]
+    assert len(tokens) > 1
+    assert events[-1] == ("done", {**events[-1][1], "summary": "The summary so far."})
@@ -0,0 +1,162 @@
+import os
+import time
+import zlib
+import sqlite3
+import hashlib
+import logging
+import threading
+
+
+class ArtifactStore:
+    """
+    Persistent store for extracted text (transcripts, file text, pages).
+
+    An SQLite index maps (kind, source_id, version) to a zlib-compressed blob
+    on local disk. The index is shared safely between threads and gunicorn
+    workers (WAL mode, one connection per thread). When the blobs exceed
+    max_bytes, the least recently accessed artifacts are deleted until the
+    store is back under 90% of the budget.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS artifacts (
+            kind TEXT NOT NULL,
+            source_id TEXT NOT NULL,
+            version TEXT NOT NULL,
+            path TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            accessed_at REAL NOT NULL,
+            PRIMARY KEY (kind, source_id, version)
+        );
+        CREATE INDEX IF NOT EXISTS idx_artifacts_accessed_at ON artifacts (accessed_at);
+    """
+
+    def __init__(self, root_dir, max_bytes):
+        self.root_dir = root_dir
+        self.blob_dir = os.path.join(root_dir, "blobs")
+        self.db_path = os.path.join(root_dir, "index.sqlite3")
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._gc_lock = threading.Lock()
+        os.makedirs(self.blob_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(self.SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _blob_path(self, kind, source_id, version):
+        digest = hashlib.sha256(f"{kind}\0{source_id}\0{version}".encode("utf-8")).hexdigest()
+        return os.path.join(self.blob_dir, digest[:2], f"{digest}.zlib")
+
+    def get(self, kind, source_id, version, max_age=None):
+        """
+        Returns the stored text, or None if missing, older than max_age
+        seconds, or unreadable.
+        """
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT path, created_at FROM artifacts WHERE kind = ? AND source_id = ? AND version = ?",
+            (kind, source_id, str(version))
+        ).fetchone()
+        if row is None:
+            return None
+        path, created_at = row
+        if max_age is not None and time.time() - created_at > max_age:
+            return None
+        try:
+            with open(path, "rb") as f:
+                text = zlib.decompress(f.read()).decode("utf-8")
+        except (OSError, zlib.error, UnicodeDecodeError) as e:
+            logging.warning(f"Dropping unreadable artifact {kind}/{source_id}: {e}")
+            self.delete(kind, source_id, version)
+            return None
+        with conn:
+            conn.execute(
+                "UPDATE artifacts SET accessed_at = ? WHERE kind = ? AND source_id = ? AND version = ?",
+                (time.time(), kind, source_id, str(version))
+            )
+        return text
+
+    def put(self, kind, source_id, version, text):
+        path = self._blob_path(kind, source_id, version)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = zlib.compress(text.encode("utf-8", "surrogatepass"), 6)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO artifacts (kind, source_id, version, path, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (kind, source_id, str(version), path, len(data), now, now)
+            )
+        self.gc()
+
+    def delete(self, kind, source_id, version):
+        conn = self._connect()
+        with conn:
+            row = conn.execute(
+                "SELECT path FROM artifacts WHERE kind = ? AND source_id = ? AND version = ?",
+                (kind, source_id, str(version))
+            ).fetchone()
+            conn.execute(
+                "DELETE FROM artifacts WHERE kind = ? AND source_id = ? AND version = ?",
+                (kind, source_id, str(version))
+            )
+        if row and os.path.exists(row[0]):
+            os.remove(row[0])
+
+    def total_bytes(self):
+        return self._connect().execute("SELECT COALESCE(SUM(size), 0) FROM artifacts").fetchone()[0]
+
+    def gc(self):
+        """
+        Deletes least recently accessed artifacts while over the size budget.
+        """
+        if not self._gc_lock.acquire(blocking=False):
+            return  # another thread is already collecting
+        try:
+            total = self.total_bytes()
+            if total <= self.max_bytes:
+                return
+            target = int(self.max_bytes * 0.9)
+            conn = self._connect()
+            rows = conn.execute(
+                "SELECT kind, source_id, version, path, size FROM artifacts ORDER BY accessed_at"
+            ).fetchall()
+            removed = 0
+            for kind, source_id, version, path, size in rows:
+                if total <= target:
+                    break
+                with conn:
+                    conn.execute(
+                        "DELETE FROM artifacts WHERE kind = ? AND source_id = ? AND version = ?",
+                        (kind, source_id, version)
+                    )
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                total -= size
+                removed += 1
+            logging.info(f"Artifact store GC removed {removed} artifacts; {total} bytes remain.")
+        finally:
+            self._gc_lock.release()
+
+    def stats(self):
+        count, total = self._connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM artifacts"
+        ).fetchone()
+        return {"artifacts": count, "bytes": total, "max_bytes": self.max_bytes}
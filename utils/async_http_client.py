@@ -0,0 +1,103 @@
+import time
+import asyncio
+import logging
+from urllib.parse import urlsplit
+import httpx
+from config import (
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT,
+    HTTP_MAX_RETRIES,
+    HTTP_MAX_RESPONSE_BYTES,
+    HTTP_POOL_MAXSIZE
+)
+from utils.http_client import RETRY_STATUS_CODES, ResponseTooLarge, _backoff, _record
+
+##############################################################################
+# asyncio counterpart of utils.http_client for the ASGI endpoints: same
+# timeouts, retry/backoff policy, response size guard and per-host stats
+# (shared with the sync client), on a keep-alive httpx.AsyncClient.
+##############################################################################
+
+_client = None
+
+
+def get_client():
+    """
+    Returns the shared AsyncClient, creating it on first use inside the running event loop.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_keepalive_connections=HTTP_POOL_MAXSIZE * 4, max_connections=None),
+            headers={"User-Agent": "Mozilla/5.0 (compatible; PoppyAI/1.0)"},
+            follow_redirects=True,
+        )
+    return _client
+
+
+async def aclose():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def _read_body(response, max_bytes):
+    chunks, size = [], 0
+    async for chunk in response.aiter_bytes():
+        size += len(chunk)
+        if size > max_bytes:
+            raise ResponseTooLarge(f"Response exceeds the {max_bytes} byte limit.")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+async def request(method, url, timeout=None, max_retries=HTTP_MAX_RETRIES, max_bytes=HTTP_MAX_RESPONSE_BYTES, **kwargs):
+    """
+    Performs an HTTP request and returns an httpx.Response with its body read.
+    HTTP error statuses are returned, not raised (use raise_for_status()).
+    """
+    host = urlsplit(url).netloc
+    attempt = 0
+    while True:
+        start = time.monotonic()
+        try:
+            async with get_client().stream(method, url, timeout=timeout or httpx.USE_CLIENT_DEFAULT, **kwargs) as response:
+                if response.status_code in RETRY_STATUS_CODES and attempt < max_retries:
+                    raise httpx.HTTPStatusError(
+                        f"HTTP {response.status_code}", request=response.request, response=response
+                    )
+                content = await _read_body(response, max_bytes)
+            _record(host, time.monotonic() - start, error=response.status_code >= 400)
+            # The body is already decoded, so drop the headers describing the wire encoding
+            headers = [
+                (k, v) for k, v in response.headers.items()
+                if k.lower() not in ("content-encoding", "content-length", "transfer-encoding")
+            ]
+            return httpx.Response(
+                response.status_code,
+                headers=headers,
+                content=content,
+                request=response.request,
+            )
+        except (httpx.TransportError, httpx.HTTPStatusError) as e:
+            _record(host, time.monotonic() - start, error=True, retry=attempt < max_retries)
+            if attempt >= max_retries:
+                raise
+            response = getattr(e, "response", None)
+            delay = _backoff(attempt, response)
+            logging.warning(f"{method} {url} failed ({e}); retry {attempt + 1}/{max_retries} in {delay:.2f}s.")
+            await asyncio.sleep(delay)
+            attempt += 1
+        except ResponseTooLarge:
+            _record(host, time.monotonic() - start, error=True)
+            raise
+
+
+async def get(url, **kwargs):
+    return await request("GET", url, **kwargs)
+
+
+async def post(url, **kwargs):
+    return await request("POST", url, **kwargs)
@@ -0,0 +1,103 @@
+import re
+import wave
+import logging
+import subprocess
+
+##############################################################################
+# Audio preparation for segmented transcription. Media is decoded once with
+# ffmpeg into 16 kHz mono 16-bit WAV (what Whisper consumes), and the same
+# ffmpeg pass reports silences (silencedetect) so long audio can be cut
+# where nobody is speaking. Workers then read their window straight from the
+# WAV file instead of decoding the media again.
+##############################################################################
+
+SAMPLE_RATE = 16000
+
+SILENCE_START_PATTERN = re.compile(r"silence_start:\s*(-?[\d.]+)")
+SILENCE_END_PATTERN = re.compile(r"silence_end:\s*(-?[\d.]+)")
+
+
+def decode_audio(media_path, wav_path, silence_db=-35, silence_min_seconds=0.3):
+    """
+    Decodes media_path into a 16 kHz mono WAV at wav_path.
+    Returns (duration_seconds, silences) where silences are (start, end) pairs in seconds.
+    """
+    command = [
+        "ffmpeg", "-nostdin", "-hide_banner", "-nostats", "-y", "-i", media_path, "-vn",
+        "-af", f"silencedetect=noise={silence_db}dB:d={silence_min_seconds}",
+        "-ac", "1", "-ar", str(SAMPLE_RATE), "-c:a", "pcm_s16le", "-f", "wav", wav_path,
+    ]
+    result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, errors="replace")
+    if result.returncode != 0:
+        logging.error(f"ffmpeg failed on {media_path}: {result.stderr[-500:]}")
+        raise RuntimeError("Failed to decode audio.")
+
+    with wave.open(wav_path, "rb") as wav:
+        duration = wav.getnframes() / SAMPLE_RATE
+
+    silences, start = [], None
+    for line in result.stderr.splitlines():
+        match = SILENCE_START_PATTERN.search(line)
+        if match:
+            start = max(0.0, float(match.group(1)))
+            continue
+        match = SILENCE_END_PATTERN.search(line)
+        if match and start is not None:
+            silences.append((start, float(match.group(1))))
+            start = None
+    if start is not None:
+        silences.append((start, duration))
+    return duration, silences
+
+
+def read_wav_window(wav_path, start_seconds=0.0, end_seconds=None, sample_rate=SAMPLE_RATE):
+    """
+    Reads [start_seconds, end_seconds) of a 16-bit mono WAV file as float32
+    samples in [-1, 1]. Returns (samples, actual start in seconds).
+    """
+    import numpy as np
+    with wave.open(wav_path, "rb") as wav:
+        start_frame = int(start_seconds * sample_rate)
+        end_frame = wav.getnframes() if end_seconds is None else int(end_seconds * sample_rate)
+        wav.setpos(start_frame)
+        frames = wav.readframes(end_frame - start_frame)
+    return np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32768.0, start_frame / sample_rate
+
+
+def plan_windows(duration, silences, window_seconds, overlap_seconds, search_seconds):
+    """
+    Cuts [0, duration) into consecutive parts of about window_seconds, moving
+    each cut to the middle of the silence nearest to it within search_seconds.
+    Returns (own_start, own_end, start, end) per window: the part it owns and
+    the audio it is given, which extends overlap_seconds past both cuts so
+    words at a cut are heard whole by one side or the other.
+    """
+    midpoints = [(start + end) / 2 for start, end in silences]
+    cuts = [0.0]
+    while duration - cuts[-1] > window_seconds + search_seconds:
+        nominal = cuts[-1] + window_seconds
+        nearby = [m for m in midpoints if cuts[-1] < m and abs(m - nominal) <= search_seconds]
+        cuts.append(min(nearby, key=lambda m: abs(m - nominal)) if nearby else nominal)
+    cuts.append(duration)
+
+    return [
+        (own_start, own_end, max(0.0, own_start - overlap_seconds), min(duration, own_end + overlap_seconds))
+        for own_start, own_end in zip(cuts, cuts[1:])
+    ]
+
+
+def stitch_segments(windows, results):
+    """
+    Joins the timed segments transcribed for each window, (start, end, text)
+    in absolute seconds, keeping each segment only in the window owning its
+    midpoint, so audio heard twice in the overlaps is not repeated.
+    Returns one text per window.
+    """
+    texts = []
+    for (own_start, own_end, _, _), segments in zip(windows, results):
+        kept = [
+            text for start, end, text in sorted(segments)
+            if own_start <= (start + end) / 2 < own_end and text
+        ]
+        texts.append(" ".join(kept))
+    return texts
@@ -0,0 +1,98 @@
+import time
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class SourceTimeoutError(RuntimeError):
+    """
+    Raised (as a recorded error, never thrown) when a task exceeds its deadline.
+    """
+    pass
+
+
+def iter_bounded(tasks, max_workers, task_timeout=None, overall_timeout=None):
+    """
+    Runs the given zero-argument callables on a bounded thread pool and yields
+    (index, result, error) tuples as tasks finish.
+
+    - task_timeout is measured from the moment a task actually starts running,
+      so tasks waiting for a free worker are not penalised.
+    - overall_timeout bounds the whole batch; anything still pending when it
+      expires is reported with a SourceTimeoutError.
+    Threads cannot be killed, so a timed-out task keeps running in the
+    background but its result is discarded.
+    """
+    tasks = list(tasks)
+    if not tasks:
+        return
+
+    started_at = {}
+    lock = threading.Lock()
+
+    def run(index, task):
+        with lock:
+            started_at[index] = time.monotonic()
+        return task()
+
+    overall_deadline = time.monotonic() + overall_timeout if overall_timeout else None
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tasks))))
+    try:
+        pending = {}
+        for index, task in enumerate(tasks):
+            # Copy the caller's context so contextvars (tracing, metrics) follow the task.
+            ctx = contextvars.copy_context()
+            pending[executor.submit(ctx.run, run, index, task)] = index
+
+        while pending:
+            now = time.monotonic()
+            deadlines = []
+            if overall_deadline is not None:
+                deadlines.append(overall_deadline)
+            if task_timeout:
+                with lock:
+                    deadlines.extend(
+                        started_at[i] + task_timeout for i in pending.values() if i in started_at
+                    )
+            timeout = max(0.0, min(deadlines) - now) if deadlines else None
+
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                error = future.exception()
+                yield index, (None if error else future.result()), error
+
+            now = time.monotonic()
+            if overall_deadline is not None and now >= overall_deadline:
+                for future, index in list(pending.items()):
+                    future.cancel()
+                    del pending[future]
+                    logging.warning(f"Task {index} abandoned: overall request deadline exceeded.")
+                    yield index, None, SourceTimeoutError("Request deadline exceeded.")
+                break
+
+            if task_timeout:
+                with lock:
+                    expired = [
+                        (future, index) for future, index in pending.items()
+                        if index in started_at and now - started_at[index] >= task_timeout
+                    ]
+                for future, index in expired:
+                    del pending[future]
+                    logging.warning(f"Task {index} abandoned after {task_timeout}s.")
+                    yield index, None, SourceTimeoutError(f"Timed out after {task_timeout} seconds.")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def run_bounded(tasks, max_workers, task_timeout=None, overall_timeout=None):
+    """
+    Runs the given callables concurrently and returns a list of (result, error)
+    tuples in the same order as the input tasks.
+    """
+    tasks = list(tasks)
+    outcomes = [(None, None)] * len(tasks)
+    for index, result, error in iter_bounded(tasks, max_workers, task_timeout, overall_timeout):
+        outcomes[index] = (result, error)
+    return outcomes
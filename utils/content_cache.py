@@ -0,0 +1,132 @@
+import sys
+import time
+import logging
+import threading
+import weakref
+from collections import OrderedDict
+
+# Every live ContentCache, for reporting (see utils.metrics)
+_instances = weakref.WeakSet()
+
+
+def all_caches():
+    return list(_instances)
+
+
+class ContentCache:
+    """
+    Thread-safe, size-bounded LRU cache with optional TTL.
+
+    Entries are evicted least-recently-used first once the total size of the
+    cached values exceeds max_bytes, and expire ttl_seconds after they were
+    stored. get_or_compute() makes sure concurrent callers asking for the same
+    missing key only compute it once. Pass sizeof to account for values whose
+    memory footprint sys.getsizeof() does not capture (e.g. index objects).
+    """
+
+    def __init__(self, max_bytes, ttl_seconds=None, name="content", sizeof=None):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or sys.getsizeof
+        self.ttl_seconds = ttl_seconds
+        self.name = name
+        self._entries = OrderedDict()  # key -> (value, size, stored_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        _instances.add(self)
+
+    def _expired(self, stored_at):
+        return self.ttl_seconds is not None and time.monotonic() - stored_at > self.ttl_seconds
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _lookup(self, key):
+        """
+        Returns the cached value or None. Caller must hold the lock.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, _, stored_at = entry
+        if self._expired(stored_at):
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def get(self, key):
+        with self._lock:
+            value = self._lookup(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            logging.info(f"[{self.name} cache] Not caching {key!r}: {size} bytes exceeds the cache budget.")
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, time.monotonic())
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """
+        Returns the cached value for key, calling compute() to produce and
+        store it on a miss. Concurrent misses for the same key wait for the
+        first caller instead of computing it again.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            key_lock = self._inflight.setdefault(key, threading.Lock())
+        try:
+            with key_lock:
+                with self._lock:
+                    value = self._lookup(key)
+                if value is None:
+                    value = compute()
+                    self.put(key, value)
+                return value
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is key_lock:
+                    del self._inflight[key]
+
+    def discard(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
@@ -0,0 +1,60 @@
+from functools import wraps
+from flask import request, jsonify
+from utils.tracing import start_trace
+from utils.profiling import StackSampler, is_admin, save_profile
+
+TRUE_VALUES = ("1", "true", "yes")
+
+
+def _flag(name):
+    return (request.args.get(name, "").lower() in TRUE_VALUES
+            or request.headers.get(f"X-{name.capitalize()}", "").lower() in TRUE_VALUES)
+
+
+def with_diagnostics(f):
+    """
+    Opt-in request diagnostics for JSON views:
+    - ?trace=1 (or "X-Trace: 1") adds a "trace" key with the total time, the
+      time per stage of every source and the raw spans;
+    - ?profile=1 (or "X-Profile: 1") additionally samples the stacks of the
+      threads serving the request and adds a "profile" key with the hottest
+      functions and a download URL for the full profile. Requires the
+      X-Admin-Token header to match ADMIN_TOKEN.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        want_profile = _flag("profile")
+        want_trace = want_profile or _flag("trace")
+        if not want_trace:
+            return f(*args, **kwargs)
+        if want_profile and not is_admin(request.headers.get("X-Admin-Token")):
+            return jsonify({"error": "Profiling requires a valid admin token."}), 403
+
+        with start_trace() as trace:
+            sampler = StackSampler(trace.thread_ids) if want_profile else None
+            if sampler:
+                sampler.start()
+            try:
+                result = f(*args, **kwargs)
+            finally:
+                if sampler:
+                    sampler.stop()
+
+        response, status = (result[0], result[1]) if isinstance(result, tuple) else (result, None)
+        payload = response.get_json(silent=True) if response.is_json and not response.is_streamed else None
+        if not isinstance(payload, dict):
+            return result
+
+        payload["trace"] = trace.to_dict()
+        if sampler:
+            profile_id = save_profile(sampler)
+            payload["profile"] = {
+                "id": profile_id,
+                "samples": sampler.samples,
+                "seconds": round(sampler.elapsed, 3),
+                "top_functions": sampler.top_functions(),
+                "download_url": f"/api/admin/profiles/{profile_id}",
+            }
+        response = jsonify(payload)
+        return (response, status) if status is not None else response
+    return decorated_function
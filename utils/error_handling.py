@@ -2,15 +2,26 @@ import logging
 from functools import wraps
 from flask import jsonify
 
+
+def error_response(e, name):
+    """
+    Logs an error raised by the view called name and returns the
+    (payload, status) sent to the client: RuntimeError messages are meant
+    for users, anything else is reported generically.
+    """
+    if isinstance(e, RuntimeError):
+        logging.error(f"RuntimeError in {name}: {str(e)}")
+        return {"error": str(e)}, 500
+    logging.exception(f"Exception in {name}: {str(e)}")
+    return {"error": "An unexpected error occurred."}, 500
+
+
 def handle_errors(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         try:
             return f(*args, **kwargs)
-        except RuntimeError as e:
-            logging.error(f"RuntimeError in {f.__name__}: {str(e)}")
-            return jsonify({"error": str(e)}), 500
         except Exception as e:
-            logging.exception(f"Exception in {f.__name__}: {str(e)}")
-            return jsonify({"error": "An unexpected error occurred."}), 500
+            payload, status = error_response(e, f.__name__)
+            return jsonify(payload), status
     return decorated_function
@@ -0,0 +1,155 @@
+import time
+import random
+import logging
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from config import (
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT,
+    HTTP_MAX_RETRIES,
+    HTTP_BACKOFF_SECONDS,
+    HTTP_MAX_RESPONSE_BYTES,
+    HTTP_POOL_HOSTS,
+    HTTP_POOL_MAXSIZE
+)
+
+##############################################################################
+# Shared HTTP client for all outbound fetches.
+# - One requests.Session with keep-alive connection pools per host
+# - (connect, read) timeouts on every call
+# - Bounded retries with exponential backoff and full jitter on connection
+#   errors, timeouts and 429/5xx responses
+# - gzip/deflate accepted; decoded bodies larger than max_bytes are refused
+# - Per-host latency stats (see get_host_stats)
+##############################################################################
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+MAX_BACKOFF_SECONDS = 10.0
+
+
+class ResponseTooLarge(requests.RequestException):
+    pass
+
+
+class _RetryableStatus(Exception):
+    pass
+
+
+def _build_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_HOSTS, pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({
+        "Accept-Encoding": "gzip, deflate",
+        "User-Agent": "Mozilla/5.0 (compatible; PoppyAI/1.0)",
+    })
+    return session
+
+
+session = _build_session()
+
+host_stats = {}
+host_stats_lock = threading.Lock()
+
+
+def _record(host, seconds, error=False, retry=False):
+    with host_stats_lock:
+        stats = host_stats.setdefault(host, {
+            "requests": 0, "errors": 0, "retries": 0, "total_seconds": 0.0, "max_seconds": 0.0
+        })
+        stats["requests"] += 1
+        stats["total_seconds"] += seconds
+        stats["max_seconds"] = max(stats["max_seconds"], seconds)
+        if error:
+            stats["errors"] += 1
+        if retry:
+            stats["retries"] += 1
+
+
+def get_host_stats():
+    """
+    Returns {host: {requests, errors, retries, avg_seconds, max_seconds}}.
+    """
+    with host_stats_lock:
+        return {
+            host: {
+                "requests": s["requests"],
+                "errors": s["errors"],
+                "retries": s["retries"],
+                "avg_seconds": s["total_seconds"] / s["requests"] if s["requests"] else 0.0,
+                "max_seconds": s["max_seconds"],
+            }
+            for host, s in host_stats.items()
+        }
+
+
+def _read_body(response, max_bytes):
+    """
+    Reads the (decompressed) body into response.content, refusing bodies over max_bytes.
+    """
+    length = response.headers.get("Content-Length")
+    if length and length.isdigit() and int(length) > max_bytes and not response.headers.get("Content-Encoding"):
+        response.close()
+        raise ResponseTooLarge(f"Response of {length} bytes exceeds the {max_bytes} byte limit.")
+    chunks, size = [], 0
+    for chunk in response.iter_content(chunk_size=64 * 1024):
+        size += len(chunk)
+        if size > max_bytes:
+            response.close()
+            raise ResponseTooLarge(f"Response exceeds the {max_bytes} byte limit.")
+        chunks.append(chunk)
+    response._content = b"".join(chunks)
+    response._content_consumed = True
+
+
+def _backoff(attempt, response=None):
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), MAX_BACKOFF_SECONDS)
+    return random.uniform(0, min(MAX_BACKOFF_SECONDS, HTTP_BACKOFF_SECONDS * (2 ** attempt)))
+
+
+def request(method, url, timeout=None, max_retries=HTTP_MAX_RETRIES, max_bytes=HTTP_MAX_RESPONSE_BYTES, **kwargs):
+    """
+    Performs an HTTP request through the shared session and returns the
+    requests.Response with its body already read. Raises requests exceptions
+    (including ResponseTooLarge) like requests itself; HTTP error statuses are
+    returned, not raised, so callers keep using raise_for_status().
+    """
+    timeout = timeout or (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+    host = urlsplit(url).netloc
+    attempt = 0
+    while True:
+        start = time.monotonic()
+        response = None
+        try:
+            response = session.request(method, url, timeout=timeout, stream=True, **kwargs)
+            if response.status_code in RETRY_STATUS_CODES and attempt < max_retries:
+                raise _RetryableStatus(f"HTTP {response.status_code}")
+            _read_body(response, max_bytes)
+            _record(host, time.monotonic() - start, error=response.status_code >= 400)
+            return response
+        except (requests.ConnectionError, requests.Timeout, _RetryableStatus) as e:
+            if response is not None:
+                response.close()
+            _record(host, time.monotonic() - start, error=True, retry=attempt < max_retries)
+            if attempt >= max_retries:
+                raise
+            delay = _backoff(attempt, response)
+            logging.warning(f"{method} {url} failed ({e}); retry {attempt + 1}/{max_retries} in {delay:.2f}s.")
+            time.sleep(delay)
+            attempt += 1
+        except requests.RequestException:
+            _record(host, time.monotonic() - start, error=True)
+            raise
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
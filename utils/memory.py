@@ -0,0 +1,41 @@
+import sys
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+def max_rss_bytes():
+    """
+    Peak resident set size of this process so far, or None if unknown.
+    """
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+@contextmanager
+def measure_peak_memory(trace=False):
+    """
+    Measures memory while the block runs and fills the yielded dict with
+    "max_rss_bytes" (process-wide peak RSS) and, when trace is True and
+    nothing else is tracing, "peak_traced_bytes" (peak Python allocations
+    made during the block, via tracemalloc - slows the block down).
+    """
+    stats = {}
+    tracing = trace and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+    try:
+        yield stats
+    finally:
+        if tracing:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            stats["peak_traced_bytes"] = peak
+        stats["max_rss_bytes"] = max_rss_bytes()
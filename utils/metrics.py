@@ -0,0 +1,226 @@
+import os
+import time
+import logging
+from functools import wraps
+from contextlib import contextmanager
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    CONTENT_TYPE_LATEST
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from utils.content_cache import all_caches
+from utils.tracing import span
+
+##############################################################################
+# Prometheus metrics, served by GET /metrics (routes/metrics_routes.py).
+#
+#   poppy_stage_duration_seconds{stage, outcome}    pipeline stage latency
+#   poppy_request_duration_seconds{endpoint, status}
+#   poppy_requests_in_flight{endpoint}
+#   poppy_unsupported_sources_total{type}
+#   poppy_user_sessions, poppy_user_data_bytes, poppy_user_evictions_total{reason}
+#   poppy_prompt_tokens{call_type}, poppy_prompt_sections_reduced_total{call_type, section}
+#   poppy_llm_tokens_total{kind}
+#   poppy_cache_{hits,misses,evictions}_total{cache}, poppy_cache_{bytes,entries}{cache}
+#
+# Stages: metadata, transcript_service, audio_download, whisper, extraction,
+# website_fetch, wikipedia_fetch, gemini_summary, gemini_chunk_summary,
+# gemini_answer, gemini_merge.
+#
+# Under gunicorn (several worker processes) set PROMETHEUS_MULTIPROC_DIR to an
+# empty directory so every worker writes its samples there and a scrape sees
+# all of them. Cache figures are per process and carry a "pid" label then.
+##############################################################################
+
+# Seconds; Whisper and large extractions reach minutes
+STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600, 1800)
+
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+stage_duration = Histogram(
+    "poppy_stage_duration_seconds",
+    "Duration of pipeline stages.",
+    ["stage", "outcome"],
+    buckets=STAGE_BUCKETS,
+)
+request_duration = Histogram(
+    "poppy_request_duration_seconds",
+    "Duration of API requests, until the last byte for streamed responses.",
+    ["endpoint", "status"],
+    buckets=STAGE_BUCKETS,
+)
+requests_in_flight = Gauge(
+    "poppy_requests_in_flight",
+    "API requests currently being served.",
+    ["endpoint"],
+    multiprocess_mode="livesum",
+)
+unsupported_sources = Counter(
+    "poppy_unsupported_sources",
+    "Sources that were rejected or failed to load.",
+    ["type"],
+)
+user_sessions = Gauge(
+    "poppy_user_sessions",
+    "Users with in-memory session data.",
+    multiprocess_mode="livesum",
+)
+user_data_bytes = Gauge(
+    "poppy_user_data_bytes",
+    "Estimated bytes of in-memory session data.",
+    multiprocess_mode="livesum",
+)
+user_evictions = Counter(
+    "poppy_user_evictions",
+    "Users whose session data was evicted, by reason.",
+    ["reason"],
+)
+prompt_tokens = Histogram(
+    "poppy_prompt_tokens",
+    "Estimated tokens of each prompt, by call type.",
+    ["call_type"],
+    buckets=(250, 500, 1000, 2000, 4000, 8000, 12000, 16000, 32000),
+)
+prompt_sections_reduced = Counter(
+    "poppy_prompt_sections_reduced",
+    "Prompt sections shortened or dropped to fit the token budget.",
+    ["call_type", "section"],
+)
+llm_tokens = Counter(
+    "poppy_llm_tokens",
+    "Tokens reported by Gemini, by kind (prompt, completion).",
+    ["kind"],
+)
+
+
+@contextmanager
+def time_stage(stage):
+    """
+    Records the duration of the block in poppy_stage_duration_seconds,
+    labelled outcome="error" if it raises, and as a span of the current
+    request trace (utils.tracing) if there is one.
+    """
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        with span(stage):
+            yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        stage_duration.labels(stage, outcome).observe(time.perf_counter() - start)
+
+
+def track_request(endpoint):
+    """
+    Decorator for Flask views: counts the request as in flight and records
+    its duration. Streamed responses are tracked until they are closed.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            gauge = requests_in_flight.labels(endpoint)
+            gauge.inc()
+            start = time.perf_counter()
+            status = "500"
+            try:
+                result = f(*args, **kwargs)
+            except BaseException:
+                gauge.dec()
+                request_duration.labels(endpoint, status).observe(time.perf_counter() - start)
+                raise
+
+            response = result[0] if isinstance(result, tuple) else result
+            status = str(result[1]) if isinstance(result, tuple) and len(result) > 1 else str(getattr(response, "status_code", 200))
+
+            def finish():
+                gauge.dec()
+                request_duration.labels(endpoint, status).observe(time.perf_counter() - start)
+
+            if getattr(response, "is_streamed", False):
+                response.call_on_close(finish)
+            else:
+                finish()
+            return result
+        return decorated_function
+    return decorator
+
+
+def track_request_async(endpoint):
+    """
+    track_request for async (ASGI) views.
+    """
+    def decorator(f):
+        @wraps(f)
+        async def decorated_function(*args, **kwargs):
+            gauge = requests_in_flight.labels(endpoint)
+            gauge.inc()
+            start = time.perf_counter()
+            status = "500"
+            try:
+                response = await f(*args, **kwargs)
+                status = str(getattr(response, "status_code", 200))
+                return response
+            finally:
+                gauge.dec()
+                request_duration.labels(endpoint, status).observe(time.perf_counter() - start)
+        return decorated_function
+    return decorator
+
+
+def count_unsupported(source_type, count=1):
+    if count:
+        unsupported_sources.labels(source_type).inc(count)
+
+
+class CacheCollector:
+    """
+    Reports the counters of every ContentCache at scrape time.
+    """
+
+    def collect(self):
+        labels = ["cache", "pid"] if MULTIPROCESS else ["cache"]
+        extra = [str(os.getpid())] if MULTIPROCESS else []
+        hits = CounterMetricFamily("poppy_cache_hits", "Cache lookups that found a value.", labels=labels)
+        misses = CounterMetricFamily("poppy_cache_misses", "Cache lookups that found nothing.", labels=labels)
+        evictions = CounterMetricFamily("poppy_cache_evictions", "Entries evicted to stay within budget.", labels=labels)
+        size = GaugeMetricFamily("poppy_cache_bytes", "Bytes held by the cache.", labels=labels)
+        entries = GaugeMetricFamily("poppy_cache_entries", "Entries held by the cache.", labels=labels)
+        for cache in all_caches():
+            stats = cache.stats()
+            values = [cache.name] + extra
+            hits.add_metric(values, stats["hits"])
+            misses.add_metric(values, stats["misses"])
+            evictions.add_metric(values, stats["evictions"])
+            size.add_metric(values, stats["bytes"])
+            entries.add_metric(values, stats["entries"])
+        return [hits, misses, evictions, size, entries]
+
+
+cache_collector = CacheCollector()
+if not MULTIPROCESS:
+    REGISTRY.register(cache_collector)
+
+
+def render_metrics():
+    """
+    Returns (body, content_type) in the Prometheus text exposition format.
+    """
+    if MULTIPROCESS:
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(cache_collector)
+    else:
+        registry = REGISTRY
+    try:
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    except Exception as e:
+        logging.error(f"Error rendering metrics: {e}")
+        raise RuntimeError("Failed to render metrics.")
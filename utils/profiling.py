@@ -0,0 +1,147 @@
+import os
+import sys
+import time
+import uuid
+import hmac
+import logging
+import threading
+from collections import Counter
+from config import ADMIN_TOKEN, PROFILE_SAMPLE_INTERVAL_SECONDS, PROFILE_DIR, PROFILE_MAX_STORED
+
+##############################################################################
+# Sampling profiler for single requests. A background thread snapshots the
+# stacks of the threads working for the request (sys._current_frames) every
+# PROFILE_SAMPLE_INTERVAL_SECONDS; unlike cProfile it sees every worker
+# thread a request fans out to and costs nothing between samples. Work done
+# in other processes (Whisper, PDF pools) shows up as the waiting frame.
+#
+# Profiles are written to PROFILE_DIR in "folded stacks" format, one
+# "frame;frame;...;frame count" line per distinct stack, which speedscope,
+# flamegraph.pl and similar tools open directly. Only the newest
+# PROFILE_MAX_STORED profiles are kept.
+##############################################################################
+
+
+def is_admin(token):
+    return bool(ADMIN_TOKEN) and bool(token) and hmac.compare_digest(token, ADMIN_TOKEN)
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Samples the stacks of the threads returned by thread_ids() until stopped.
+    """
+
+    def __init__(self, thread_ids, interval=PROFILE_SAMPLE_INTERVAL_SECONDS):
+        self.thread_ids = thread_ids
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.elapsed = 0.0
+        self._started = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        names = {t.ident: t.name for t in threading.enumerate()}
+        wanted = self.thread_ids()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id not in wanted:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(names.get(thread_id, str(thread_id)))
+            self.stacks[tuple(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self._sample()
+            except Exception as e:
+                logging.error(f"Error sampling stacks: {e}")
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._started is not None:
+            self.elapsed = time.perf_counter() - self._started
+
+    def seconds_per_sample(self):
+        # Sampling falls behind the nominal interval under load (GIL, sleep granularity)
+        return self.elapsed / self.samples if self.samples else self.interval
+
+    def folded(self):
+        return "\n".join(f"{';'.join(stack)} {count}" for stack, count in self.stacks.most_common())
+
+    def top_functions(self, limit=15):
+        """
+        Returns the functions with the most samples, as self (innermost frame)
+        and total (anywhere on the stack) seconds.
+        """
+        scale = self.seconds_per_sample()
+        self_counts, total_counts = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            self_counts[stack[-1]] += count
+            for label in set(stack[1:]):
+                total_counts[label] += count
+        return [
+            {
+                "function": label,
+                "self_seconds": round(self_counts[label] * scale, 3),
+                "total_seconds": round(total * scale, 3),
+            }
+            for label, total in total_counts.most_common(limit)
+        ]
+
+
+def profile_path(profile_id):
+    return os.path.join(PROFILE_DIR, f"{profile_id}.folded")
+
+
+def save_profile(sampler):
+    """
+    Writes the sampler's folded stacks to PROFILE_DIR and returns the profile id.
+    """
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    profile_id = uuid.uuid4().hex
+    with open(profile_path(profile_id), "w", encoding="utf-8") as f:
+        f.write(sampler.folded())
+    _prune()
+    return profile_id
+
+
+def _prune():
+    try:
+        paths = [os.path.join(PROFILE_DIR, name) for name in os.listdir(PROFILE_DIR) if name.endswith(".folded")]
+        paths.sort(key=os.path.getmtime)
+        for path in paths[:-PROFILE_MAX_STORED]:
+            os.remove(path)
+    except OSError as e:
+        logging.error(f"Error pruning profiles: {e}")
+
+
+def load_profile(profile_id):
+    """
+    Returns the stored profile text, or None if it does not exist.
+    """
+    # Ids are uuid4 hex strings; anything else cannot name a stored profile
+    if len(profile_id) != 32 or not all(c in "0123456789abcdef" for c in profile_id):
+        return None
+    try:
+        with open(profile_path(profile_id), encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,29 @@
+import contextvars
+from contextlib import contextmanager
+
+# Callback receiving (stage, details) for the source currently being processed.
+# Stored in a ContextVar so it follows tasks into worker threads (see
+# utils.concurrency) without threading a parameter through every service call.
+_reporter = contextvars.ContextVar("progress_reporter", default=None)
+
+
+def report_stage(stage, **details):
+    """
+    Reports that the current source entered the given stage (e.g. "fetching",
+    "transcribing", "answering"). Does nothing when nobody is listening.
+    """
+    reporter = _reporter.get()
+    if reporter is not None:
+        reporter(stage, details)
+
+
+@contextmanager
+def progress_reporter(callback):
+    """
+    Routes report_stage() calls made inside the block to callback(stage, details).
+    """
+    token = _reporter.set(callback)
+    try:
+        yield
+    finally:
+        _reporter.reset(token)
@@ -0,0 +1,41 @@
+import re
+
+##############################################################################
+# Local token estimator used to size prompts without calling the model.
+# Gemini's tokenizer (SentencePiece) is not available offline; this counts
+# words and punctuation, splitting long words into ~4 character pieces, which
+# tracks subword tokenizers closely for English prose and errs on the high
+# side for code, URLs and numbers.
+##############################################################################
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def _token_count(piece):
+    return 1 + (len(piece) - 1) // 4
+
+
+def estimate_tokens(text):
+    if not text:
+        return 0
+    return sum(_token_count(m.group(0)) for m in TOKEN_PATTERN.finditer(text))
+
+
+def truncate_to_tokens(text, max_tokens, marker=" [...]"):
+    """
+    Returns text cut to at most max_tokens tokens, counting the marker
+    appended when something was cut, or text itself if it already fits.
+    """
+    if max_tokens <= 0:
+        return ""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    limit = max_tokens - estimate_tokens(marker)
+    if limit < 0:
+        return ""  # not even the marker fits
+    used = 0
+    for m in TOKEN_PATTERN.finditer(text):
+        used += _token_count(m.group(0))
+        if used > limit:
+            return text[:m.start()].rstrip() + marker
+    return text
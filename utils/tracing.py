@@ -0,0 +1,127 @@
+import time
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+
+##############################################################################
+# Per-request timing traces. A trace is started for the request (see
+# utils.diagnostics) and every span opened while it is active - sources,
+# pipeline stages via utils.metrics.time_stage - is recorded with its parent,
+# the source it belongs to and the thread it ran on. The current span lives in
+# a ContextVar, so spans opened in worker threads (utils.concurrency copies
+# the context) attach to the right source. With no active trace, span() only
+# costs a ContextVar lookup.
+##############################################################################
+
+# (Trace, current span id or None)
+_current = contextvars.ContextVar("trace_span", default=None)
+
+
+class Trace:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = []
+        self.threads = {threading.get_ident()}
+        self._sources = {}  # span id -> source label
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _ms(self, t):
+        return round((t - self.started) * 1000, 2)
+
+    def open(self, parent_id, source):
+        with self._lock:
+            span_id = next(self._ids)
+            if source is None:
+                source = self._sources.get(parent_id)
+            self._sources[span_id] = source
+            self.threads.add(threading.get_ident())
+        return span_id, source
+
+    def thread_ids(self):
+        with self._lock:
+            return set(self.threads)
+
+    def record(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def to_dict(self):
+        """
+        Returns the total time, a per-source breakdown of time per stage and
+        the raw spans ordered by start time. Stage time outside any source
+        (e.g. merging) is reported under "(request)".
+        """
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s["start_ms"])
+        sources = {}
+        for s in spans:
+            label = s["source"] or "(request)"
+            entry = sources.setdefault(label, {"total_ms": 0.0, "stages": {}})
+            if s["name"] == "source":
+                entry["total_ms"] = s["duration_ms"]
+                entry["type"] = s.get("type")
+                if s.get("error"):
+                    entry["error"] = s["error"]
+            else:
+                entry["stages"][s["name"]] = round(entry["stages"].get(s["name"], 0.0) + s["duration_ms"], 2)
+        return {
+            "total_ms": self._ms(time.perf_counter()),
+            "sources": sources,
+            "spans": spans,
+        }
+
+
+@contextmanager
+def start_trace():
+    """
+    Records the spans opened inside the block (and in tasks it starts) and yields the Trace.
+    """
+    trace = Trace()
+    token = _current.set((trace, None))
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def span(name, source=None, **attrs):
+    """
+    Times the block as a child of the current span. source names the source
+    the work belongs to; it is inherited from the parent when omitted.
+    """
+    current = _current.get()
+    if current is None:
+        yield
+        return
+
+    trace, parent_id = current
+    span_id, source = trace.open(parent_id, source)
+    token = _current.set((trace, span_id))
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        try:
+            _current.reset(token)
+        except ValueError:
+            # A generator resumed in another context; nothing left to restore
+            pass
+        trace.record({
+            "id": span_id,
+            "parent": parent_id,
+            "name": name,
+            "source": source,
+            "start_ms": trace._ms(start),
+            "duration_ms": round(duration * 1000, 2),
+            "thread": threading.current_thread().name,
+            **attrs,
+            **({"error": error} if error else {}),
+        })
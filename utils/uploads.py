@@ -0,0 +1,42 @@
+import os
+import hashlib
+import tempfile
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def save_upload(file_storage, upload_dir, extension):
+    """
+    Streams an uploaded file to a spool file in upload_dir while computing its
+    SHA-256, then stores it as <sha256>.<extension>.
+
+    Identical bytes always end up at the same path (an existing copy is kept
+    and the new spool file dropped), and different files can never overwrite
+    each other regardless of their original names.
+    Returns (file_path, content_hash, size_in_bytes).
+    """
+    os.makedirs(upload_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, spool_path = tempfile.mkstemp(dir=upload_dir, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as spool:
+            while True:
+                chunk = file_storage.stream.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                spool.write(chunk)
+                size += len(chunk)
+
+        content_hash = digest.hexdigest()
+        file_path = os.path.join(upload_dir, f"{content_hash}.{extension}")
+        if os.path.exists(file_path):
+            os.remove(spool_path)
+        else:
+            os.replace(spool_path, file_path)
+    except Exception:
+        if os.path.exists(spool_path):
+            os.remove(spool_path)
+        raise
+    return file_path, content_hash, size
@@ -0,0 +1,235 @@
+import sys
+import time
+import logging
+import threading
+from collections import OrderedDict
+from utils.metrics import user_sessions, user_data_bytes, user_evictions
+
+
+def _sizeof(value):
+    """
+    Rough deep size of the JSON-like values kept per user.
+    """
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_sizeof(k) + _sizeof(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_sizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+
+def _empty_user_data():
+    return {
+        "transcripts": {},
+        "file_contents": {},
+        "website_contents": {},
+        "wikipedia_contents": {},
+        "conversation_history": [],
+        "history_summary": ""
+    }
+
+
+class UserDataStore:
+    """
+    Thread-safe per-user state (source references and conversation history)
+    with size accounting and three limits:
+
+    - max_user_bytes: a user over it loses their oldest history entries,
+      then their oldest source references;
+    - max_total_bytes: past it, the least recently active users are evicted;
+    - idle_ttl_seconds: users idle for longer are evicted by a background
+      reaper thread, started on first use.
+
+    Evictions are counted per reason ("idle", "lru") in stats() and metrics.
+    The dicts handed out by get_or_create() must only be changed through
+    add_reference() / append_history() so their size stays accounted for.
+    """
+
+    def __init__(self, max_user_bytes, max_total_bytes, idle_ttl_seconds, reap_interval_seconds=60):
+        self.max_user_bytes = max_user_bytes
+        self.max_total_bytes = max_total_bytes
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.reap_interval_seconds = reap_interval_seconds
+        self._users = OrderedDict()  # username -> (data, size, last_access); least recent first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._reaper = None
+        self.evictions = {"idle": 0, "lru": 0}
+
+    def __contains__(self, username):
+        with self._lock:
+            return username in self._users
+
+    def _start_reaper(self):
+        # Caller must hold the lock
+        if self._reaper is None and self.idle_ttl_seconds:
+            self._reaper = threading.Thread(target=self._reap_forever, name="user-data-reaper", daemon=True)
+            self._reaper.start()
+
+    def _reap_forever(self):
+        while True:
+            time.sleep(self.reap_interval_seconds)
+            try:
+                self.reap()
+            except Exception as e:
+                logging.error(f"Error reaping idle users: {e}")
+
+    def _set(self, username, data, size):
+        # Caller must hold the lock
+        old = self._users.pop(username, None)
+        if old is not None:
+            self._bytes -= old[1]
+        self._users[username] = (data, size, time.monotonic())
+        self._bytes += size
+
+    def _evict(self, username, reason):
+        # Caller must hold the lock
+        _, size, _ = self._users.pop(username)
+        self._bytes -= size
+        self.evictions[reason] += 1
+        user_evictions.labels(reason).inc()
+        logging.info(f"Evicted user data for {username} ({reason}, {size} bytes).")
+
+    def _update_gauges(self):
+        user_sessions.set(len(self._users))
+        user_data_bytes.set(self._bytes)
+
+    def _enforce(self, username):
+        """
+        Applies the per-user limit to username, then the global limit to everyone else.
+        Caller must hold the lock.
+        """
+        data, size, _ = self._users[username]
+        if size > self.max_user_bytes:
+            history = data["conversation_history"]
+            # Estimates while trimming; the exact size is recomputed below
+            while size > self.max_user_bytes and history:
+                size -= _sizeof(history.pop(0))
+            for kind in ("transcripts", "file_contents", "website_contents", "wikipedia_contents"):
+                refs = data[kind]
+                while size > self.max_user_bytes and refs:
+                    name = next(iter(refs))
+                    size -= _sizeof(name) + _sizeof(refs.pop(name))
+            self._set(username, data, _sizeof(data))
+
+        # username was just touched, so it is the last one to go
+        while self._bytes > self.max_total_bytes and len(self._users) > 1:
+            self._evict(next(iter(self._users)), "lru")
+        self._update_gauges()
+
+    def _data(self, username):
+        """
+        Returns the data dict of username; a fresh one if it was evicted meanwhile.
+        Caller must hold the lock.
+        """
+        entry = self._users.get(username)
+        return entry[0] if entry else _empty_user_data()
+
+    def get_or_create(self, username):
+        """
+        Returns the user's data dict, creating it if needed, and marks the user active.
+        """
+        with self._lock:
+            self._start_reaper()
+            entry = self._users.get(username)
+            if entry is None:
+                data = _empty_user_data()
+                self._set(username, data, _sizeof(data))
+                self._enforce(username)
+            else:
+                data, size, _ = entry
+                self._set(username, data, size)
+            return data
+
+    def add_reference(self, username, kind, name, cache_key):
+        """
+        Records that the user loaded a source (kind is e.g. "transcripts") stored under cache_key.
+        """
+        with self._lock:
+            data = self._data(username)
+            data[kind].pop(name, None)
+            data[kind][name] = cache_key
+            self._set(username, data, _sizeof(data))
+            self._enforce(username)
+
+    def append_history(self, username, question, answer):
+        with self._lock:
+            data = self._data(username)
+            data["conversation_history"].append({"question": question, "answer": answer})
+            self._set(username, data, _sizeof(data))
+            self._enforce(username)
+
+    def conversation(self, username):
+        """
+        Returns (history_summary, copy of the conversation history).
+        """
+        _, summary, history = self.conversation_session(username)
+        return summary, history
+
+    def conversation_session(self, username):
+        """
+        Like conversation(), with the user's current session first: an opaque
+        token that changes when the conversation is ended (or the user evicted)
+        and a new one starts. None if the user has no data.
+        """
+        with self._lock:
+            entry = self._users.get(username)
+            if entry is None:
+                return None, "", []
+            return entry[0], entry[0]["history_summary"], list(entry[0]["conversation_history"])
+
+    def fold_history(self, username, folded, summary, session):
+        """
+        Replaces the folded turns (the oldest ones, as returned by
+        conversation_session()) with summary. Turns already dropped meanwhile
+        are skipped; nothing changes if the user is gone or session is no
+        longer their current one, so an ended conversation never leaks into
+        the next.
+        """
+        with self._lock:
+            entry = self._users.get(username)
+            if entry is None or entry[0] is not session:
+                return
+            data = entry[0]
+            history = data["conversation_history"]
+            folded_ids = {id(turn) for turn in folded}
+            while history and id(history[0]) in folded_ids:
+                history.pop(0)
+            data["history_summary"] = summary
+            self._set(username, data, _sizeof(data))
+            self._enforce(username)
+
+    def discard(self, username):
+        with self._lock:
+            entry = self._users.pop(username, None)
+            if entry is not None:
+                self._bytes -= entry[1]
+            self._update_gauges()
+            return entry is not None
+
+    def reap(self):
+        """
+        Evicts users idle for longer than idle_ttl_seconds. Returns how many were evicted.
+        """
+        if not self.idle_ttl_seconds:
+            return 0
+        cutoff = time.monotonic() - self.idle_ttl_seconds
+        evicted = 0
+        with self._lock:
+            # Ordered least recently active first
+            while self._users:
+                username, (_, _, last_access) = next(iter(self._users.items()))
+                if last_access > cutoff:
+                    break
+                self._evict(username, "idle")
+                evicted += 1
+            self._update_gauges()
+        return evicted
+
+    def stats(self):
+        with self._lock:
+            return {
+                "users": len(self._users),
+                "bytes": self._bytes,
+                "max_total_bytes": self.max_total_bytes,
+                "evictions": dict(self.evictions),
+            }